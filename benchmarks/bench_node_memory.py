@@ -0,0 +1,91 @@
+"""
+Measure the memory used per node by the HTML and text node classes.
+
+Run with ``python -m benchmarks.bench_node_memory``. The slotted classes are
+compared against equivalent dict-backed classes with the previous layout: a
+per-instance ``__dict__`` and a fresh ``{}`` for every node without props.
+"""
+
+import tracemalloc
+from collections.abc import Callable
+
+from src.htmlnode import FrozenProps, LeafNode, ParentNode
+from src.textnode import TextNode, TextType
+
+NODE_COUNT = 50_000
+
+
+# Plain records with the previous layout; they only need their attributes.
+class _DictHTMLNode:  # pylint: disable=too-few-public-methods
+    def __init__(
+        self,
+        tag: str,
+        value: str | None = None,
+        children: list["_DictHTMLNode"] | None = None,
+        props: dict[str, str] | None = None,
+    ):
+        self.tag = tag
+        self.value = value
+        self.children = children if children else []
+        self.props = props if props else {}
+
+
+class _DictTextNode:  # pylint: disable=too-few-public-methods
+    def __init__(
+        self, text: str, text_type: TextType | None = None, url: str | None = None
+    ):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def _dict_nodes() -> list[object]:
+    nodes: list[object] = []
+    for _ in range(NODE_COUNT):
+        text = _DictHTMLNode("", value="text")
+        link = _DictHTMLNode("a", value="link", props={"href": "/", "title": "t"})
+        nodes.append(_DictHTMLNode("p", children=[text, link]))
+        nodes.append(_DictTextNode("text", TextType.TEXT))
+    return nodes
+
+
+def _slotted_nodes() -> list[object]:
+    nodes: list[object] = []
+    for _ in range(NODE_COUNT):
+        text = LeafNode("", "text")
+        link = LeafNode("a", "link", props=FrozenProps({"href": "/", "title": "t"}))
+        nodes.append(ParentNode("p", [text, link]))
+        nodes.append(TextNode("text", TextType.TEXT))
+    return nodes
+
+
+def measure(build: Callable[[], list[object]]) -> int:
+    """
+    Return the bytes still allocated by the objects a builder returns.
+
+    :param build: A function creating the objects to measure.
+    :return: The number of bytes allocated and kept alive.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        nodes = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del nodes
+    return after - before
+
+
+def main() -> None:
+    # Each iteration creates four nodes: a paragraph, two leaves and a text node.
+    node_count = NODE_COUNT * 4
+    dict_bytes = measure(_dict_nodes)
+    slotted_bytes = measure(_slotted_nodes)
+    print(f"dict-backed: {dict_bytes / node_count:8.1f} bytes/node")
+    print(f"slotted:     {slotted_bytes / node_count:8.1f} bytes/node")
+    print(f"saved:       {1 - slotted_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
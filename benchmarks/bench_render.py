@@ -0,0 +1,92 @@
+"""
+Compare the stack-based HTML renderer against the previous recursive one.
+
+Run with ``python -m benchmarks.bench_render``. The recursive reference below
+is the ParentNode.to_html implementation the iterative renderer replaced.
+"""
+
+import sys
+import timeit
+from collections.abc import Callable
+
+from src.htmlnode import HTMLNode, LeafNode, ParentNode
+
+REPEAT = 5
+
+
+def recursive_to_html(node: HTMLNode) -> str:
+    """
+    Render a tree the way ParentNode.to_html used to: one string per subtree.
+
+    :param node: The root of the tree.
+    :return: The rendered HTML.
+    """
+    if isinstance(node, ParentNode):
+        children_html = "".join(recursive_to_html(child) for child in node.children)
+        return f"<{node.tag}{node.props_to_html()}>{children_html}</{node.tag}>"
+    return node.to_html()
+
+
+def iterative_to_html(node: HTMLNode) -> str:
+    """
+    Render a tree with the current stack-based renderer.
+    """
+    return node.to_html()
+
+
+def wide_tree(width: int = 20_000) -> ParentNode:
+    """
+    Build a document of many short paragraphs, like a long post.
+    """
+    return ParentNode(
+        "div",
+        [
+            ParentNode(
+                "p", [LeafNode("", "Some "), LeafNode("b", "bold"), LeafNode("", ".")]
+            )
+            for _ in range(width)
+        ],
+    )
+
+
+def deep_tree(depth: int) -> ParentNode:
+    """
+    Build a chain of nested blockquotes, like machine-generated markdown.
+    """
+    node = ParentNode("blockquote", [LeafNode("", "innermost")])
+    for _ in range(depth - 1):
+        node = ParentNode("blockquote", [LeafNode("", "level"), node])
+    return node
+
+
+def best_of(render: Callable[[HTMLNode], str], tree: HTMLNode) -> float:
+    """
+    Return the fastest of several timed renders of a tree, in seconds.
+    """
+    timer = timeit.Timer(lambda: render(tree))
+    return min(timer.repeat(repeat=REPEAT, number=1))
+
+
+def main() -> None:
+    # Keep the deep tree within reach of the recursive reference.
+    deep_depth = sys.getrecursionlimit() // 4
+    cases = {
+        "wide (20000 paragraphs)": wide_tree(),
+        f"deep ({deep_depth} levels)": deep_tree(deep_depth),
+    }
+    for name, tree in cases.items():
+        assert recursive_to_html(tree) == tree.to_html()
+        recursive = best_of(recursive_to_html, tree)
+        iterative = best_of(iterative_to_html, tree)
+        print(
+            f"{name:26} recursive {recursive * 1000:8.2f} ms  "
+            f"iterative {iterative * 1000:8.2f} ms  "
+            f"speedup {recursive / iterative:5.2f}x"
+        )
+
+    iterative = best_of(iterative_to_html, deep_tree(100_000))
+    print(f"{'deep (100000 levels)':26} iterative {iterative * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
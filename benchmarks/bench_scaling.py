@@ -0,0 +1,156 @@
+"""
+Build synthetic sites of growing size and fit how build time scales.
+
+Run with ``python -m benchmarks.bench_scaling --pages 100 1000 10000``. For
+each size a synthetic site is generated (see benchmarks.synthetic_corpus) and
+built from scratch in a fresh process with main.build, as ``python -m
+src.main`` builds it: static files, pages, the publish delta and the swap
+into docs/. The wall time, pages per second, files written per second and
+peak RSS of each build are reported.
+
+Finally the build times are fitted to ``time = c * pages ** k``. A k close
+to 1 means linear scaling; a k well above 1 means some stage grows faster
+than the site, which will hurt long before the site gets that big.
+"""
+
+import argparse
+import contextlib
+import math
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from benchmarks.synthetic_corpus import (
+    DEFAULT_ASSET_SIZE,
+    DEFAULT_DEPTH,
+    DEFAULT_PAGE_SIZE,
+    Corpus,
+    generate_corpus,
+)
+from src.generate_content import RenderOptions
+from src.live_reload import add_write_listener
+from src.main import build, parse_args
+
+# Exponent above which the fit is reported as superlinear.
+SUPERLINEAR = 1.15
+
+
+class BuildStats(NamedTuple):
+    """
+    Measurements of one full build.
+
+    :param pages: Number of pages in the site.
+    :param seconds: Wall time of the build.
+    :param files: Number of files the build wrote.
+    :param peak_rss_kib: Peak resident memory of the build, in KiB.
+    """
+
+    pages: int
+    seconds: float
+    files: int
+    peak_rss_kib: int
+
+
+def build_site(root: str, jobs: int) -> tuple[float, int, int]:
+    """
+    Build a site the way main does, in the current process.
+
+    Meant to run in a fresh process, so the peak RSS is this build's own.
+
+    :param root: The directory holding content/, static/ and template.html.
+    :param jobs: Number of worker processes.
+    :return: Wall time, files written, and peak RSS in KiB.
+    """
+    os.chdir(root)
+    args = parse_args([])
+    written: list[str] = []
+    add_write_listener(written.append)
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            build(args, RenderOptions(basepath=args.basepath), jobs)
+            finished = time.perf_counter()
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return finished - start, len(written), peak_rss
+
+
+def measure(corpus: Corpus, jobs: int) -> BuildStats:
+    """
+    Generate a synthetic site and build it in a fresh process.
+
+    :param corpus: The shape of the site.
+    :param jobs: Number of worker processes.
+    :return: The measurements of the build.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        generate_corpus(root, corpus)
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            result = executor.submit(build_site, root, jobs).result()
+    return BuildStats(corpus.pages, *result)
+
+
+def fit_exponent(stats: list[BuildStats]) -> float:
+    """
+    Fit build times to time = c * pages ** k by least squares on logs.
+
+    :param stats: Builds of at least two different sizes.
+    :return: The exponent k.
+    """
+    slope, _ = statistics.linear_regression(
+        [math.log(run.pages) for run in stats],
+        [math.log(run.seconds) for run in stats],
+    )
+    return slope
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0].strip()
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument(
+        "--assets",
+        type=int,
+        help="Number of static files (default: one per ten pages).",
+    )
+    parser.add_argument("--asset-size", type=int, default=DEFAULT_ASSET_SIZE)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    print(
+        f"{'pages':>8} {'build s':>9} {'pages/s':>9} {'files/s':>9} "
+        f"{'peak RSS':>10}"
+    )
+    results = []
+    for pages in sorted(args.pages):
+        assets = args.assets if args.assets is not None else max(1, pages // 10)
+        corpus = Corpus(pages, args.depth, args.page_size, assets, args.asset_size)
+        stats = measure(corpus, args.jobs)
+        results.append(stats)
+        print(
+            f"{stats.pages:8} {stats.seconds:9.2f} "
+            f"{stats.pages / stats.seconds:9.0f} "
+            f"{stats.files / stats.seconds:9.0f} "
+            f"{stats.peak_rss_kib / 1024:7.1f} MiB"
+        )
+
+    if len(results) > 1:
+        exponent = fit_exponent(results)
+        shape = "superlinear" if exponent > SUPERLINEAR else "linear"
+        print(f"Build time grows as pages^{exponent:.2f} ({shape})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Time the parsing and rendering hot paths, and compare against a baseline.
+
+Run with ``python -m benchmarks.hot_paths``. Every case runs on fixed inputs
+built below: representative ones shaped like the site's content, and
+adversarial ones shaped to hit the worst case of each function. Each case is
+calibrated once, then timed over several rounds with garbage collection off,
+and the per-call minimum, median and standard deviation are reported.
+
+``--save PATH`` stores the results as a JSON baseline. ``--compare PATH``
+exits with status 1 when a case's fastest call is slower than the baseline's
+by more than ``--threshold``, even after timing it again; the minimum is
+compared because it is the statistic least affected by a noisy machine.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from src.block_markdown import block_to_block_type
+from src.generate_content import generate_page
+from src.htmlnode import LeafNode, ParentNode
+from src.inline_markdown import (
+    markdown_to_blocks,
+    split_nodes_delimiter,
+    text_to_textnodes,
+)
+from src.markdown_html import markdown_to_html_node
+from src.textnode import TextNode, TextType
+
+ROUNDS = 7
+# Seconds each round should take; sets the number of calls per round.
+ROUND_TIME = 0.1
+THRESHOLD = 0.25
+
+PARAGRAPH = (
+    "A **bold** claim with _emphasis_, some `inline code`, a "
+    "[link](/blog/post) and an ![image](/images/photo.png) in one sentence."
+)
+
+
+def representative_markdown(sections: int = 50) -> str:
+    """
+    Build a long post mixing every block type, like the pages in content/.
+    """
+    section = "\n\n".join(
+        [
+            "## A section heading",
+            "\n".join([PARAGRAPH] * 3),
+            "> A quoted line\n> and another **one**",
+            "- first item\n- second [item](/x)\n- third item",
+            "1. one\n2. two\n3. three",
+            "```\ndef code():\n    return 1\n```",
+        ]
+    )
+    return "# Title\n\n" + "\n\n".join([section] * sections)
+
+
+def deep_tree(depth: int = 10_000) -> ParentNode:
+    """
+    Build a chain of nested blockquotes, like machine-generated markdown.
+    """
+    node = ParentNode("blockquote", [LeafNode("", "innermost")])
+    for _ in range(depth - 1):
+        node = ParentNode("blockquote", [LeafNode("", "level"), node])
+    return node
+
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """
+    Discard what the timed code prints.
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            yield
+
+
+def cases(workdir: str) -> dict[str, Callable[[], object]]:
+    """
+    Build the benchmark cases, keyed by "function/input".
+
+    :param workdir: A directory for the end-to-end case's files.
+    :return: Functions to time, each making one call on fixed input.
+    """
+    document = representative_markdown()
+    html_tree = markdown_to_html_node(document)
+    deep = deep_tree()
+    blocks = markdown_to_blocks(document)
+    code_text = [TextNode(" `code` text" * 2_000, TextType.TEXT)]
+
+    source = os.path.join(workdir, "index.md")
+    template = os.path.join(workdir, "template.html")
+    dest = os.path.join(workdir, "docs", "index.html")
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(document)
+    with open(template, "w", encoding="utf-8") as f:
+        f.write('<a href="/">{{ Title }}</a><main>{{ Content }}</main>')
+
+    return {
+        "markdown_to_blocks/representative": lambda: markdown_to_blocks(document),
+        "markdown_to_blocks/blank_lines": partial_call(
+            markdown_to_blocks, "x\n\n\n" * 20_000
+        ),
+        "markdown_to_blocks/one_block": partial_call(
+            markdown_to_blocks, "line\n" * 50_000
+        ),
+        "block_to_block_type/representative": lambda: [
+            block_to_block_type(block) for block in blocks
+        ],
+        "block_to_block_type/digits": partial_call(
+            block_to_block_type, "1" * 50_000 + " not a list"
+        ),
+        "block_to_block_type/hashes": partial_call(block_to_block_type, "#" * 50_000),
+        "text_to_textnodes/representative": partial_call(text_to_textnodes, PARAGRAPH),
+        "text_to_textnodes/unclosed_bold": partial_call(
+            text_to_textnodes, "**a " * 5_000
+        ),
+        "text_to_textnodes/open_brackets": partial_call(
+            text_to_textnodes, "[a](" * 5_000
+        ),
+        "text_to_textnodes/nested_images": partial_call(
+            text_to_textnodes, "![" * 5_000 + "x" + "](" * 5_000
+        ),
+        "split_nodes_delimiter/code": lambda: split_nodes_delimiter(
+            code_text, "`", TextType.CODE
+        ),
+        "markdown_to_html_node/representative": partial_call(
+            markdown_to_html_node, document
+        ),
+        "to_html/representative": html_tree.to_html,
+        "to_html/deep": deep.to_html,
+        "generate_page/representative": lambda: generate_page(source, template, dest),
+    }
+
+
+def partial_call(function: Callable[[str], object], text: str) -> Callable[[], object]:
+    """
+    Bind a function to its input, so building the input is not timed.
+    """
+    return lambda: function(text)
+
+
+def measure(function: Callable[[], object], rounds: int) -> dict[str, float]:
+    """
+    Time a function over several rounds of the same number of calls.
+
+    :param function: The function to time.
+    :param rounds: The number of rounds.
+    :return: Per-call statistics in seconds, and the calls per round.
+    """
+    timer = timeit.Timer(function)
+    loops, elapsed = timer.autorange()
+    loops = max(1, int(loops * ROUND_TIME / elapsed)) if elapsed else loops
+    per_call = [total / loops for total in timer.repeat(repeat=rounds, number=loops)]
+    return {
+        "min": min(per_call),
+        "median": statistics.median(per_call),
+        "stdev": statistics.stdev(per_call) if rounds > 1 else 0.0,
+        "loops": loops,
+    }
+
+
+def run(rounds: int, selected: Callable[[str], bool]) -> dict[str, dict[str, float]]:
+    """
+    Run the selected cases.
+
+    :param rounds: The number of timed rounds per case.
+    :param selected: Whether to run the case with the given name.
+    :return: Statistics keyed by case name.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, quiet():
+        for name, function in cases(workdir).items():
+            if selected(name):
+                results[name] = measure(function, rounds)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """
+    Find the cases that got slower than the baseline.
+
+    :param results: The statistics of this run.
+    :param baseline: The statistics of the baseline run.
+    :param threshold: The allowed slowdown, as a fraction of the baseline.
+    :return: The names of the cases that regressed.
+    """
+    return [
+        name
+        for name, stats in results.items()
+        if name in baseline and stats["min"] > baseline[name]["min"] * (1 + threshold)
+    ]
+
+
+def report(
+    results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]
+) -> None:
+    """
+    Print a table of the results, with the change against the baseline.
+    """
+    print(f"{'case':40} {'min':>11} {'median':>11} {'stdev':>9} {'change':>8}")
+    for name, stats in results.items():
+        change = (
+            f"{stats['min'] / baseline[name]['min'] - 1:+8.1%}"
+            if name in baseline
+            else f"{'new':>8}"
+        )
+        print(
+            f"{name:40} {stats['min'] * 1e6:8.1f} us {stats['median'] * 1e6:8.1f} us "
+            f"{stats['stdev'] / stats['median']:8.1%} {change}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0].strip()
+    )
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--filter", default="", help="Only run matching cases.")
+    parser.add_argument("--save", metavar="PATH", help="Write a JSON baseline.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare to a baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="Allowed slowdown against the baseline, as a fraction "
+        "(default: %(default)s).",
+    )
+    args = parser.parse_args(argv)
+
+    baseline: dict[str, Any] = {"results": {}}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = run(args.rounds, lambda name: args.filter in name)
+    regressed = compare(results, baseline["results"], args.threshold)
+    if regressed:
+        # Time the slow cases again and keep their faster run, so a burst of
+        # load on the machine is not reported as a regression.
+        retried = run(args.rounds, lambda name: name in regressed)
+        for name, stats in retried.items():
+            results[name] = min(results[name], stats, key=lambda s: s["min"])
+        regressed = compare(results, baseline["results"], args.threshold)
+    report(results, baseline["results"])
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": sys.version.split()[0],
+                    "machine": platform.machine(),
+                    "rounds": args.rounds,
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+    for name in regressed:
+        print(f"Regression: {name} is more than {args.threshold:.0%} slower")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
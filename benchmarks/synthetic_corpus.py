@@ -0,0 +1,185 @@
+"""
+Generate a deterministic synthetic site to build at scale.
+
+Run with ``python -m benchmarks.synthetic_corpus DIR --pages 1000`` to write
+``DIR/content``, ``DIR/static`` and ``DIR/template.html``. The same arguments
+always produce the same files. Pages use every block type and every inline
+type, link to each other and to the generated images, and are spread over a
+directory tree of the requested depth.
+"""
+
+import argparse
+import math
+import os
+import random
+from typing import NamedTuple
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<title>{{ Title }}</title>
+<link href="/index.css" rel="stylesheet">
+</head>
+<body>
+<nav><a href="/">Home</a></nav>
+<article>{{ Content }}</article>
+</body>
+</html>
+"""
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while elves sing in the "
+    "valley of rivendell and hobbits walk the long road east"
+).split()
+
+
+# Default shape of a corpus, shared with the command line defaults.
+DEFAULT_DEPTH = 2
+DEFAULT_PAGE_SIZE = 4_000
+DEFAULT_ASSETS = 100
+DEFAULT_ASSET_SIZE = 16_384
+DEFAULT_SEED = 0
+
+
+class Corpus(NamedTuple):
+    """
+    The shape of a synthetic site.
+
+    :param pages: Number of markdown pages.
+    :param depth: Number of directory levels the pages are spread over.
+    :param page_size: Approximate size of each page in bytes.
+    :param assets: Number of static files besides the stylesheet.
+    :param asset_size: Size of each static file in bytes.
+    :param seed: Seed of the generator; the same seed gives the same files.
+    """
+
+    pages: int
+    depth: int = DEFAULT_DEPTH
+    page_size: int = DEFAULT_PAGE_SIZE
+    assets: int = DEFAULT_ASSETS
+    asset_size: int = DEFAULT_ASSET_SIZE
+    seed: int = DEFAULT_SEED
+
+
+def page_path(corpus: Corpus, index: int) -> str:
+    """
+    Return the path of a page relative to content/.
+
+    Pages are numbered into a tree with the same fanout at every level, so
+    each directory holds about the same number of pages and subdirectories.
+    """
+    fanout = max(2, math.ceil(corpus.pages ** (1 / (corpus.depth + 1))))
+    directories = []
+    remaining = index
+    for _ in range(corpus.depth):
+        remaining, digit = divmod(remaining, fanout)
+        directories.append(f"section-{digit}")
+    return os.path.join(*directories, f"page-{index}.md")
+
+
+def asset_path(index: int) -> str:
+    """
+    Return the path of a generated image relative to static/.
+    """
+    return os.path.join("images", f"set-{index % 10}", f"image-{index}.png")
+
+
+def _sentence(rng: random.Random, corpus: Corpus) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 14))
+    other = page_path(corpus, rng.randrange(corpus.pages))
+    inline = [
+        f"**{words[0]}**",
+        f"_{words[1]}_",
+        f"`{words[2]}`",
+        f"[{words[3]}](/{other[:-3].replace(os.sep, '/')})",
+    ]
+    if corpus.assets:
+        image = asset_path(rng.randrange(corpus.assets))
+        inline.append(f"![{words[4]}](/{image.replace(os.sep, '/')})")
+    return " ".join(words[5:] + inline).capitalize() + "."
+
+
+def _section(rng: random.Random, corpus: Corpus) -> str:
+    return "\n\n".join(
+        [
+            f"## {' '.join(rng.choices(WORDS, k=3)).title()}",
+            "\n".join(_sentence(rng, corpus) for _ in range(3)),
+            "\n".join(f"> {_sentence(rng, corpus)}" for _ in range(2)),
+            "\n".join(f"- {_sentence(rng, corpus)}" for _ in range(3)),
+            "\n".join(f"{n}. {_sentence(rng, corpus)}" for n in range(1, 4)),
+            "```\nfor word in words:\n    print(word)\n```",
+        ]
+    )
+
+
+def page_markdown(corpus: Corpus, index: int) -> str:
+    """
+    Generate the markdown of one page.
+
+    Each page has its own random stream, so a page does not depend on how
+    many pages were generated before it.
+    """
+    rng = random.Random(f"{corpus.seed}:{index}")
+    parts = [f"# Page {index}"]
+    size = len(parts[0])
+    while size < corpus.page_size:
+        parts.append(_section(rng, corpus))
+        size += len(parts[-1]) + 2
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(root: str, corpus: Corpus) -> None:
+    """
+    Write a synthetic site into a directory.
+
+    :param root: The directory to write content/, static/ and the template to.
+    :param corpus: The shape of the site.
+    """
+    for index in range(corpus.pages):
+        _write(
+            os.path.join(root, "content", page_path(corpus, index)),
+            page_markdown(corpus, index).encode(),
+        )
+    rng = random.Random(corpus.seed)
+    for index in range(corpus.assets):
+        _write(
+            os.path.join(root, "static", asset_path(index)),
+            rng.randbytes(corpus.asset_size),
+        )
+    _write(os.path.join(root, "static", "index.css"), b"body { margin: 0 }\n")
+    _write(os.path.join(root, "template.html"), TEMPLATE.encode())
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0].strip()
+    )
+    parser.add_argument("root", help="Directory to write the site to.")
+    parser.add_argument("--pages", type=int, default=1_000)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--assets", type=int, default=DEFAULT_ASSETS)
+    parser.add_argument("--asset-size", type=int, default=DEFAULT_ASSET_SIZE)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+    generate_corpus(
+        args.root,
+        Corpus(
+            args.pages,
+            args.depth,
+            args.page_size,
+            args.assets,
+            args.asset_size,
+            args.seed,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
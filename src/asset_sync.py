@@ -0,0 +1,247 @@
+import fcntl
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from src.build_manifest import BuildManifest, hash_file
+from src.build_trace import span
+from src.fingerprint import fingerprinted_path, is_fingerprinted
+from src.image_size import is_image, read_image_size
+from src.live_reload import notify_written
+
+# Record of the assets synced into an output directory, kept next to the
+# page manifest so stale assets can be told apart from generated pages.
+ASSET_MANIFEST_NAME = ".assets.json"
+
+# ioctl request cloning one file's extents into another (Linux FICLONE).
+_FICLONE = 0x40049409
+
+# Bytes requested per copy_file_range call.
+_COPY_CHUNK = 1 << 30
+
+
+class SyncResult(NamedTuple):
+    """The output paths a sync copied, left alone and removed."""
+
+    copied: list[str]
+    unchanged: list[str]
+    removed: list[str]
+
+
+class _SyncPlan(NamedTuple):
+    """What a sync does with each file of the source directory."""
+
+    # (source path, output path, manifest entry) of every file to copy.
+    pending: list[tuple[str, str, dict[str, str]]]
+    unchanged: list[str]
+    keep: set[str]
+
+
+# The settings are keyword-only, so calls name each of them.
+def sync_directory(  # pylint: disable=too-many-arguments
+    src: str,
+    dst: str,
+    *,
+    checksum: bool = False,
+    link: bool = False,
+    jobs: int = 8,
+    fingerprint: bool = False,
+) -> SyncResult:
+    """
+    Make dst hold a copy of every file in src, copying only what changed.
+
+    A file is unchanged when its size and mtime match what was recorded at
+    the last sync. With checksum, a file whose mtime changed but whose
+    contents did not is not copied again either. Assets synced earlier whose
+    source is gone are removed; other files in dst are never touched.
+
+    With fingerprint, assets such as stylesheets and images are copied to
+    names carrying their content hash, e.g. index.0123456789.css, and each
+    one's manifest entry records its source. A recorded hash is reused while
+    the source's size and mtime are unchanged, so only new or touched assets
+    are hashed.
+
+    The manifest also records the width and height of every image, read
+    from its header when it is copied.
+
+    :param src: The directory to copy from.
+    :param dst: The directory to copy to.
+    :param checksum: Compare content hashes when the mtime differs.
+    :param link: Hardlink files instead of copying them where possible.
+    :param jobs: Number of threads copying files.
+    :param fingerprint: Copy assets to names carrying their content hash.
+    :return: The output paths copied, unchanged and removed.
+    """
+    with span("static", path=src):
+        manifest = BuildManifest.load(dst, ASSET_MANIFEST_NAME)
+        plan = _plan_sync(src, dst, manifest, checksum, fingerprint)
+        try:
+            copied = _copy_pending(plan.pending, manifest, link, jobs)
+            removed = manifest.prune(plan.keep)
+            for path in removed:
+                print(f"Removed stale asset {path}")
+        finally:
+            manifest.save()
+        return SyncResult(copied, plan.unchanged, removed)
+
+
+def _copy_pending(
+    pending: list[tuple[str, str, dict[str, str]]],
+    manifest: BuildManifest,
+    link: bool,
+    jobs: int,
+) -> list[str]:
+    # Copy each file on a thread pool and record it once it is in place.
+    copied = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            (executor.submit(copy_file, src_path, dest_path, link), dest_path, entry)
+            for src_path, dest_path, entry in pending
+        ]
+        for future, dest_path, entry in futures:
+            future.result()
+            manifest.record(dest_path, entry)
+            copied.append(dest_path)
+            notify_written(dest_path)
+    return copied
+
+
+def _plan_sync(
+    src: str, dst: str, manifest: BuildManifest, checksum: bool, fingerprint: bool
+) -> _SyncPlan:
+    plan = _SyncPlan(pending=[], unchanged=[], keep=set())
+    # Where each fingerprinted asset was copied to, by source.
+    fingerprinted = {
+        entry["source"]: os.path.join(dst, key)
+        for key, entry in manifest.pages.items()
+        if "source" in entry
+    }
+    for src_path, relative_path in _source_files(src):
+        dest_path = os.path.join(dst, relative_path)
+        if fingerprint and is_fingerprinted(src_path):
+            source = relative_path.replace(os.sep, "/")
+            recorded_path = fingerprinted.get(source, dest_path)
+            entry, fresh = _compare(
+                src_path, recorded_path, manifest.get(recorded_path), True
+            )
+            entry["source"] = source
+            dest_path = fingerprinted_path(dest_path, entry["sha256"])
+            fresh = fresh and dest_path == recorded_path
+        else:
+            recorded_path = dest_path
+            entry, fresh = _compare(
+                src_path, dest_path, manifest.get(dest_path), checksum
+            )
+        if is_image(src_path):
+            entry |= _image_size(
+                src_path, manifest.get(recorded_path) if fresh else None
+            )
+        plan.keep.add(dest_path)
+        if fresh:
+            manifest.record(dest_path, entry)
+            plan.unchanged.append(dest_path)
+        else:
+            plan.pending.append((src_path, dest_path, entry))
+    return plan
+
+
+def _source_files(src: str) -> list[tuple[str, str]]:
+    # (path, path relative to src) of every file below src
+    return [
+        (
+            os.path.join(directory, file),
+            os.path.relpath(os.path.join(directory, file), src),
+        )
+        for directory, _, files in os.walk(src)
+        for file in sorted(files)
+    ]
+
+
+def copy_file(src_path: str, dest_path: str, link: bool = False) -> None:
+    """
+    Copy a file with its metadata, as cheaply as the filesystem allows.
+
+    A hardlink is tried first when link is set. Otherwise the data is cloned
+    with a reflink, then copied in the kernel with copy_file_range, then
+    copied through userspace. The copy replaces dest_path atomically, so a
+    hardlinked destination never writes through to its source.
+
+    :param src_path: The file to copy.
+    :param dest_path: Where to put the copy.
+    :param link: Hardlink the file instead of copying it where possible.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with span("copy", path=dest_path):
+            if link and _try_link(src_path, tmp_path):
+                os.replace(tmp_path, dest_path)
+            else:
+                _copy_data(src_path, tmp_path)
+                shutil.copystat(src_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _compare(
+    src_path: str, dest_path: str, recorded: dict[str, str] | None, checksum: bool
+) -> tuple[dict[str, str], bool]:
+    stat = os.stat(src_path)
+    entry = {"size": str(stat.st_size), "mtime_ns": str(stat.st_mtime_ns)}
+    digest = None
+    if (
+        recorded is None
+        or recorded.get("size") != entry["size"]
+        or not os.path.isfile(dest_path)
+    ):
+        fresh = False
+    elif recorded.get("mtime_ns") == entry["mtime_ns"]:
+        fresh = True
+        digest = recorded.get("sha256")
+    elif checksum:
+        digest = hash_file(src_path)
+        fresh = recorded.get("sha256") == digest
+    else:
+        fresh = False
+    if checksum:
+        entry["sha256"] = digest or hash_file(src_path)
+    return entry, fresh
+
+
+def _image_size(src_path: str, recorded: dict[str, str] | None) -> dict[str, str]:
+    # An unchanged image keeps its recorded size; others get their header
+    # read. An unreadable header is recorded as an empty size, so it is not
+    # read again either.
+    if recorded is not None and "width" in recorded and "height" in recorded:
+        return {"width": recorded["width"], "height": recorded["height"]}
+    width, height = read_image_size(src_path) or ("", "")
+    return {"width": str(width), "height": str(height)}
+
+
+def _try_link(src_path: str, tmp_path: str) -> bool:
+    try:
+        os.link(src_path, tmp_path)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_data(src_path: str, tmp_path: str) -> None:
+    with open(src_path, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+        try:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), _COPY_CHUNK):
+                pass
+            return
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst)
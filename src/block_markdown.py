@@ -1,6 +1,10 @@
 import re
+from collections.abc import Iterable, Iterator
 from enum import Enum
 
+_HEADING_PATTERN = re.compile(r"#{1,6} ")
+_ORDERED_LIST_PATTERN = re.compile(r"\d+\.\s")
+
 
 class BlockType(Enum):
     """
@@ -19,17 +23,62 @@ def block_to_block_type(block: str) -> BlockType:
     """
     Convert a block string to a BlockType.
 
+    Only the first character decides which, if any, pattern is tried, so
+    ordinary paragraphs never reach a regex.
+
     :param block: The block string to convert.
     :return: A BlockType corresponding to the block string.
     """
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
-    if block.startswith("```"):
-        return BlockType.CODE
-    if block.startswith(">"):
-        return BlockType.QUOTE
-    if re.match(r"^\d+\.\s", block):
-        return BlockType.ORDERED_LIST
-    if block.startswith("- "):
-        return BlockType.UNORDERED_LIST
+    match block[:1]:
+        case "#" if _HEADING_PATTERN.match(block):
+            return BlockType.HEADING
+        case "`" if block.startswith("```"):
+            return BlockType.CODE
+        case ">":
+            return BlockType.QUOTE
+        case first if first.isdecimal() and _ORDERED_LIST_PATTERN.match(block):
+            return BlockType.ORDERED_LIST
+        case "-" if block.startswith("- "):
+            return BlockType.UNORDERED_LIST
     return BlockType.PARAGRAPH
+
+
+def iter_block_lines(lines: Iterable[str]) -> Iterator[list[str]]:
+    """
+    Group lines into blocks separated by blank lines.
+
+    Lines are stripped, so lines read from a file can be passed as-is. Only the
+    block being read is held in memory.
+
+    :param lines: The markdown lines, e.g. an open file.
+    :return: An iterator over the stripped lines of each block.
+    """
+    current_block: list[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped:
+            current_block.append(stripped)
+        elif current_block:
+            yield current_block
+            current_block = []
+    if current_block:
+        yield current_block
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[tuple[BlockType, list[str]]]:
+    """
+    Parse markdown lines into typed blocks as they are read.
+
+    Each block is classified from the start of its first line, the same way
+    block_to_block_type classifies the joined block string.
+
+    :param lines: The markdown lines, e.g. an open file.
+    :return: An iterator of (BlockType, stripped block lines) records.
+    """
+    for block_lines in iter_block_lines(lines):
+        first_line = block_lines[0]
+        if len(block_lines) > 1:
+            # The line break is part of the block string and counts as the
+            # whitespace after an ordered list marker such as "1."
+            first_line += "\n"
+        yield block_to_block_type(first_line), block_lines
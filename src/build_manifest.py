@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def hash_file(path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it all at once.
+
+    :param path: Path to the file to hash.
+    :return: The hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Record of the inputs each generated output was built from.
+
+    Entries are keyed by the output path relative to the output directory, so
+    the manifest can live inside the directory it describes.
+
+    :param path: Path of the JSON file backing the manifest.
+    :param pages: Mapping of relative output path to the recorded page inputs.
+    """
+
+    def __init__(self, path: str, pages: dict[str, dict[str, str]] | None = None):
+        self.path = path
+        self.pages = pages if pages else {}
+
+    @classmethod
+    def load(cls, dest_dir_path: str, name: str = MANIFEST_NAME) -> "BuildManifest":
+        """
+        Load the manifest stored in an output directory.
+
+        A missing or unreadable manifest yields an empty one, which makes the
+        next build a full build.
+
+        :param dest_dir_path: The output directory holding the manifest.
+        :param name: The file name of the manifest in that directory.
+        :return: The loaded BuildManifest.
+        """
+        path = os.path.join(dest_dir_path, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        pages = data.get("pages") if isinstance(data, dict) else None
+        return cls(path, pages if isinstance(pages, dict) else None)
+
+    def is_fresh(self, dest_path: str, entry: dict[str, str]) -> bool:
+        """
+        Check whether an output was built from exactly these inputs.
+
+        :param dest_path: The output path of the page.
+        :param entry: The inputs the page would be built from now.
+        :return: True if the page can be reused as-is.
+        """
+        key = self._key(dest_path)
+        return self.pages.get(key) == entry and os.path.isfile(dest_path)
+
+    def get(self, dest_path: str) -> dict[str, str] | None:
+        """
+        Return the inputs recorded for an output, if any.
+
+        :param dest_path: The output path.
+        :return: The recorded inputs, or None.
+        """
+        return self.pages.get(self._key(dest_path))
+
+    def record(self, dest_path: str, entry: dict[str, str]) -> None:
+        """
+        Record the inputs a page was just built from.
+
+        :param dest_path: The output path of the page.
+        :param entry: The inputs the page was built from.
+        """
+        self.pages[self._key(dest_path)] = entry
+
+    def prune(self, keep: set[str]) -> list[str]:
+        """
+        Delete outputs recorded in the manifest whose source no longer exists.
+
+        Only files the manifest knows about are touched, so static assets and
+        anything else in the output directory are left alone.
+
+        :param keep: Output paths produced by the current build.
+        :return: The output paths that were removed.
+        """
+        keep_keys = {self._key(path) for path in keep}
+        removed = []
+        for key in sorted(set(self.pages) - keep_keys):
+            del self.pages[key]
+            dest_path = os.path.join(self._root, key)
+            if os.path.isfile(dest_path):
+                os.unlink(dest_path)
+                _remove_empty_parents(os.path.dirname(dest_path), self._root)
+            removed.append(dest_path)
+        return removed
+
+    def save(self) -> None:
+        """
+        Write the manifest back to disk.
+        """
+        os.makedirs(self._root, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pages": self.pages}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def _root(self) -> str:
+        return os.path.dirname(self.path)
+
+    def _key(self, dest_path: str) -> str:
+        return os.path.relpath(dest_path, self._root).replace(os.sep, "/")
+
+
+def _remove_empty_parents(directory: str, root: str) -> None:
+    root = os.path.abspath(root)
+    directory = os.path.abspath(directory)
+    while directory != root and directory.startswith(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
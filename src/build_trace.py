@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from contextlib import AbstractContextManager, nullcontext
+from types import TracebackType
+from typing import Any
+
+# One event in Chrome's trace event format, as loaded by chrome://tracing and
+# Perfetto.
+TraceEvent = dict[str, Any]
+
+# Name of the span covering one page, used to find the slowest pages.
+PAGE_SPAN = "page"
+
+
+# The events recorded so far, or None while tracing is off. Starting and
+# stopping tracing rebind it, so it is not a constant.
+_events: list[TraceEvent] | None = None  # pylint: disable=invalid-name
+
+_DISABLED = nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict[str, str]):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        end = time.perf_counter_ns()
+        events = _events
+        if events is not None:
+            events.append(
+                {
+                    "name": self.name,
+                    "ph": "X",
+                    "ts": self.start / 1000,
+                    "dur": (end - self.start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                    "args": self.args,
+                }
+            )
+
+
+def start_tracing() -> None:
+    """
+    Start recording spans, dropping any recorded earlier.
+    """
+    global _events  # pylint: disable=global-statement
+    _events = []
+
+
+def stop_tracing() -> list[TraceEvent]:
+    """
+    Stop recording spans.
+
+    :return: The events recorded since tracing started.
+    """
+    global _events  # pylint: disable=global-statement
+    events, _events = _events or [], None
+    return events
+
+
+def is_tracing() -> bool:
+    """
+    :return: Whether spans are being recorded.
+    """
+    return _events is not None
+
+
+def take_events() -> list[TraceEvent]:
+    """
+    Hand over the events recorded so far and keep tracing, e.g. to send a
+    worker process's events back to the parent.
+
+    :return: The events recorded since tracing started or the last call.
+    """
+    global _events  # pylint: disable=global-statement
+    events = _events
+    if events is None:
+        return []
+    _events = []
+    return events
+
+
+def add_events(events: Iterable[TraceEvent]) -> None:
+    """
+    Record events taken from another process, if tracing.
+
+    :param events: The events to record.
+    """
+    if _events is not None:
+        _events.extend(events)
+
+
+def span(name: str, **args: str) -> AbstractContextManager[None]:
+    """
+    Time a stage of the build as a span in the trace.
+
+    While tracing is off this returns a shared no-op context manager, so an
+    untraced build pays one function call per span.
+
+    :param name: The name of the stage.
+    :param args: Details shown with the span, such as the page path.
+    :return: A context manager timing its body.
+    """
+    if _events is None:
+        return _DISABLED
+    return _Span(name, args)
+
+
+def write_trace(path: str, events: list[TraceEvent]) -> None:
+    """
+    Write events to a JSON file in Chrome's trace event format.
+
+    :param path: The file to write.
+    :param events: The events to write.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def slowest_pages(events: list[TraceEvent], limit: int = 10) -> list[tuple[str, float]]:
+    """
+    Find the pages that took longest to generate.
+
+    :param events: The events recorded by a build.
+    :param limit: The number of pages to return.
+    :return: (page path, milliseconds) pairs, slowest first.
+    """
+    pages = [
+        (event["args"]["path"], event["dur"] / 1000)
+        for event in events
+        if event["name"] == PAGE_SPAN
+    ]
+    return sorted(pages, key=lambda page: page[1], reverse=True)[:limit]
@@ -0,0 +1,377 @@
+import hashlib
+import mimetypes
+import os
+import queue
+import re
+from collections.abc import Iterator, Mapping
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.generate_content import RenderOptions, render_page
+from src.image_size import ImageSize, is_image, read_image_size
+from src.live_reload import EVENTS_PATH, ChangeBroker, inject_client
+from src.template import find_template, load_template
+
+_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class Response(NamedTuple):
+    """An HTTP response: status, headers and body."""
+
+    status: HTTPStatus
+    headers: dict[str, str]
+    body: bytes
+
+
+class _CachedPage(NamedTuple):
+    signature: tuple[int, int]
+    template_path: str
+    template_digest: str
+    images: dict[str, tuple[int, int] | None]
+    body: bytes
+    etag: str
+
+
+class StaticImageSizes(Mapping[str, ImageSize]):
+    """
+    The sizes of static images, read as a page looks them up.
+
+    Every file looked up is remembered with its signature, or None if it does
+    not exist, so a cached page can tell when one of its images changed.
+
+    :param static_dir: Path to the directory containing static assets.
+    """
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self.signatures: dict[str, tuple[int, int] | None] = {}
+        self._sizes: dict[str, ImageSize] = {}
+
+    def __getitem__(self, url: str) -> ImageSize:
+        relative_path = os.path.normpath(url.lstrip("/"))
+        if relative_path.startswith("..") or not is_image(relative_path):
+            raise KeyError(url)
+        path = os.path.join(self.static_dir, relative_path)
+        self.signatures[path] = _signature(path)
+        try:
+            size = read_image_size(path)
+        except OSError:
+            size = None
+        if size is None:
+            raise KeyError(url)
+        self._sizes[url] = size
+        return size
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sizes)
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+
+# Its one entry point is all a request handler needs.
+class DevSite:  # pylint: disable=too-few-public-methods
+    """
+    Serve a site straight from its sources, rendering pages on request.
+
+    Rendered pages are kept in memory until their markdown file, template or
+    one of their images changes, so nothing has to be built before the first
+    request. Images are given the sizes of the static files they point to.
+    Static files are read from disk with a validator derived from their
+    metadata.
+
+    :param content_dir: Path to the directory containing markdown files.
+    :param static_dir: Path to the directory containing static assets.
+    :param template_path: Path to the default HTML template file.
+    :param basepath: The base path the site is served from.
+    :param events: Broker for live reload; when given, pages include the
+        live-reload client and the event stream is served.
+    """
+
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        basepath: str = "/",
+        events: ChangeBroker | None = None,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.basepath = basepath
+        self.events = events
+        self._pages: dict[str, _CachedPage] = {}
+
+    def respond(self, target: str, headers: Mapping[str, str]) -> Response:
+        """
+        Build the response to a GET request.
+
+        :param target: The request target, possibly with a query string.
+        :param headers: The request headers.
+        :return: The response to send.
+        """
+        url = urlsplit(target)
+        relative_path = self._relative_path(unquote(url.path))
+        if relative_path is None:
+            return _not_found()
+        directory = os.path.join(self.content_dir, relative_path)
+        if os.path.isfile(os.path.join(directory, "index.md")):
+            if not url.path.endswith("/"):
+                # Redirect with the path as requested, still percent-encoded.
+                location = url.path + "/" + (f"?{url.query}" if url.query else "")
+                return Response(
+                    HTTPStatus.MOVED_PERMANENTLY, {"Location": location}, b""
+                )
+            return self._page(os.path.join(directory, "index.md"), headers)
+        return self._file(relative_path, headers)
+
+    def _relative_path(self, path: str) -> str | None:
+        # The path below the base path, or None if it is outside the site
+        if not path.startswith(self.basepath):
+            return None
+        relative_path = os.path.normpath(path[len(self.basepath) :]).lstrip("/")
+        if relative_path.startswith(".."):
+            return None
+        return "" if relative_path == "." else relative_path
+
+    def _file(self, relative_path: str, headers: Mapping[str, str]) -> Response:
+        root, extension = os.path.splitext(relative_path)
+        if extension == ".html":
+            page_path = os.path.join(self.content_dir, root + ".md")
+            if os.path.isfile(page_path):
+                return self._page(page_path, headers)
+        static_path = os.path.join(self.static_dir, relative_path)
+        if relative_path and os.path.isfile(static_path):
+            return _static(static_path, headers)
+        return _not_found()
+
+    def _page(self, page_path: str, headers: Mapping[str, str]) -> Response:
+        stat = os.stat(page_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        template_path = find_template(page_path, self.content_dir, self.template_path)
+        template = load_template(template_path)
+        cached = self._pages.get(page_path)
+        if (
+            cached is None
+            or cached.signature != signature
+            or cached.template_path != template_path
+            or cached.template_digest != template.digest
+            or any(
+                _signature(path) != image_signature
+                for path, image_signature in cached.images.items()
+            )
+        ):
+            sizes = StaticImageSizes(self.static_dir)
+            with open(page_path, encoding="utf-8") as f:
+                html = render_page(
+                    f.read(),
+                    template,
+                    RenderOptions(basepath=self.basepath, image_sizes=sizes),
+                )
+            body = html.encode("utf-8")
+            if self.events is not None:
+                body = inject_client(body, self.basepath)
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            cached = _CachedPage(
+                signature, template_path, template.digest, sizes.signatures, body, etag
+            )
+            self._pages[page_path] = cached
+        return _conditional(
+            cached.body, cached.etag, "text/html; charset=utf-8", headers
+        )
+
+
+def _signature(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _static(path: str, headers: Mapping[str, str]) -> Response:
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if _matches(headers, etag):
+        return _not_modified(etag)
+    byte_range = _parse_range(headers.get("Range"), stat.st_size)
+    if byte_range is None:
+        with open(path, "rb") as f:
+            body = f.read()
+        return _ok(body, etag, content_type)
+    return _partial(path, byte_range, stat.st_size, etag, content_type)
+
+
+def _conditional(
+    body: bytes, etag: str, content_type: str, headers: Mapping[str, str]
+) -> Response:
+    if _matches(headers, etag):
+        return _not_modified(etag)
+    return _ok(body, etag, content_type)
+
+
+def _matches(headers: Mapping[str, str], etag: str) -> bool:
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is None:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single byte range into an inclusive (start, end) pair.
+
+    Anything other than one range is ignored, which serves the whole body as
+    HTTP allows. A range that cannot be satisfied gives (size, size - 1).
+    """
+    match = _RANGE_PATTERN.fullmatch(header.strip()) if header else None
+    if match is None or not (match.group(1) or match.group(2)):
+        return None
+    if not match.group(1):
+        return max(size - int(match.group(2)), 0), size - 1
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    if start >= size or end < start:
+        return size, size - 1
+    return start, min(end, size - 1)
+
+
+def _ok(body: bytes, etag: str, content_type: str) -> Response:
+    return Response(
+        HTTPStatus.OK,
+        {
+            "Content-Type": content_type,
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "no-cache",
+        },
+        body,
+    )
+
+
+def _partial(
+    path: str, byte_range: tuple[int, int], size: int, etag: str, content_type: str
+) -> Response:
+    start, end = byte_range
+    if start >= size:
+        return Response(
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+            {"Content-Range": f"bytes */{size}"},
+            b"",
+        )
+    with open(path, "rb") as f:
+        f.seek(start)
+        body = f.read(end - start + 1)
+    return Response(
+        HTTPStatus.PARTIAL_CONTENT,
+        {
+            "Content-Type": content_type,
+            "ETag": etag,
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Cache-Control": "no-cache",
+        },
+        body,
+    )
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        HTTPStatus.NOT_MODIFIED, {"ETag": etag, "Cache-Control": "no-cache"}, b""
+    )
+
+
+def _not_found() -> Response:
+    return Response(
+        HTTPStatus.NOT_FOUND,
+        {"Content-Type": "text/plain; charset=utf-8"},
+        b"Not Found",
+    )
+
+
+def make_handler(site: DevSite) -> type[BaseHTTPRequestHandler]:
+    """
+    Create a request handler class serving a DevSite.
+
+    :param site: The site to serve.
+    :return: A handler class for http.server.
+    """
+
+    class DevRequestHandler(BaseHTTPRequestHandler):
+        """Answer GET and HEAD requests from the site and its event stream."""
+
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:  # pylint: disable=invalid-name
+            self._send(head=False)
+
+        def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+            self._send(head=True)
+
+        def _send(self, head: bool) -> None:
+            url = urlsplit(self.path)
+            if site.events is not None and url.path == site.basepath + EVENTS_PATH:
+                page = parse_qs(url.query).get("page", [site.basepath])[0]
+                self._stream_events(site.events, page)
+                return
+            headers = {name.title(): value for name, value in self.headers.items()}
+            try:
+                response = site.respond(self.path, headers)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Show build errors in the browser instead of dropping the request.
+                response = Response(
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    {"Content-Type": "text/plain; charset=utf-8"},
+                    repr(e).encode("utf-8"),
+                )
+            self.send_response(response.status)
+            for name, value in response.headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(response.body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(response.body)
+
+        def _stream_events(self, events: ChangeBroker, page: str) -> None:
+            self.close_connection = True
+            changes = events.subscribe(page)
+            try:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                while True:
+                    try:
+                        chunk = f"data: {changes.get(timeout=events.keepalive)}\n\n"
+                    except queue.Empty:
+                        chunk = ": keepalive\n\n"
+                    self.wfile.write(chunk.encode("utf-8"))
+            except OSError:
+                # The browser navigated away or was closed.
+                pass
+            finally:
+                events.unsubscribe(changes)
+
+    return DevRequestHandler
+
+
+def serve(
+    site: DevSite, host: str = "localhost", port: int = 8888
+) -> None:  # pragma: no cover
+    """
+    Serve a site until interrupted, handling each request on its own thread.
+
+    :param site: The site to serve.
+    :param host: The interface to listen on.
+    :param port: The TCP port to listen on.
+    """
+    with ThreadingHTTPServer((host, port), make_handler(site)) as server:
+        print(f"Serving on http://{host}:{port}{site.basepath}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,94 @@
+import os
+
+from src.build_manifest import BuildManifest
+
+# Assets renamed after their content: what pages load by URL and browsers
+# cache. Other static files, e.g. robots.txt or favicon.ico, keep their names.
+FINGERPRINT_SUFFIXES = frozenset(
+    {
+        ".avif",
+        ".css",
+        ".gif",
+        ".jpeg",
+        ".jpg",
+        ".js",
+        ".png",
+        ".svg",
+        ".webp",
+        ".woff",
+        ".woff2",
+    }
+)
+
+# Hex digits of the content hash put into a fingerprinted name.
+HASH_LENGTH = 10
+
+# Cache rules for servers that read them from the site, e.g. Netlify and
+# Cloudflare Pages.
+HEADERS_NAME = "_headers"
+
+IMMUTABLE = "Cache-Control: public, max-age=31536000, immutable"
+
+
+def is_fingerprinted(path: str) -> bool:
+    """
+    Check whether a static file is renamed after its content.
+
+    :param path: The path of the static file.
+    :return: True if the file gets a fingerprinted name.
+    """
+    return os.path.splitext(path)[1].lower() in FINGERPRINT_SUFFIXES
+
+
+def fingerprinted_path(path: str, digest: str) -> str:
+    """
+    Insert a content hash into a file name, before its extension.
+
+    "images/a.png" becomes "images/a.0123456789.png".
+
+    :param path: The path of the file.
+    :param digest: The hex digest of the file contents.
+    :return: The fingerprinted path.
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.{digest[:HASH_LENGTH]}{extension}"
+
+
+def asset_urls(manifest: BuildManifest) -> dict[str, str]:
+    """
+    Map the URL of every fingerprinted asset to its fingerprinted URL.
+
+    :param manifest: The asset manifest of an output directory, whose entries
+        record the source of each fingerprinted asset.
+    :return: Mapping of root-relative URL to fingerprinted root-relative URL.
+    """
+    return {
+        f"/{entry['source']}": f"/{key}"
+        for key, entry in sorted(manifest.pages.items())
+        if "source" in entry
+    }
+
+
+def write_headers(dest_dir: str, urls: dict[str, str], base: str) -> None:
+    """
+    Write a headers file marking every fingerprinted asset immutable.
+
+    The rules of base, e.g. a headers file among the static files, come
+    first. The file is replaced rather than overwritten, so a hardlinked
+    copy of base is left alone.
+
+    :param dest_dir: The output directory.
+    :param urls: Mapping of asset URL to fingerprinted asset URL.
+    :param base: A headers file to start from, if it exists.
+    """
+    lines = []
+    if os.path.isfile(base):
+        with open(base, encoding="utf-8") as f:
+            lines.append(f.read().rstrip("\n"))
+    for url in sorted(urls.values()):
+        lines.append(f"{url}\n  {IMMUTABLE}")
+    path = os.path.join(dest_dir, HEADERS_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{line}\n" for line in lines)
+    os.replace(tmp_path, path)
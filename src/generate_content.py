@@ -1,6 +1,67 @@
+import hashlib
+import itertools
+import json
 import os
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import BinaryIO
 
-from src.markdown_html import markdown_to_html_node
+from src.asset_sync import copy_file
+from src.build_manifest import BuildManifest, hash_file
+from src.build_trace import (
+    PAGE_SPAN,
+    TraceEvent,
+    add_events,
+    is_tracing,
+    span,
+    start_tracing,
+    take_events,
+)
+from src.htmlnode import HTMLNode
+from src.image_optimize import add_srcsets
+from src.image_size import ImageSize, add_image_sizes
+from src.live_reload import (
+    add_write_listener,
+    clear_write_listeners,
+    notify_written,
+    remove_write_listener,
+)
+from src.markdown_html import markdown_lines_to_html_node, markdown_to_html_node
+from src.parse_cache import ParseCache
+from src.template import Template, find_template, load_template
+from src.urls import basepath_resolver
+
+# Bump whenever a change to the parser or renderer alters the generated HTML,
+# so incremental builds know every recorded page is stale.
+RENDERER_VERSION = "4"
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """
+    Settings that apply to every page of a build.
+
+    :param basepath: The base path prepended to root-relative URLs.
+    :param parse_cache: Reuse the parsed trees of unchanged sources from here.
+    :param asset_urls: Mapping of asset URL to fingerprinted asset URL, applied
+        to root-relative URLs as pages are rendered.
+    :param image_sizes: Mapping of image URL to (width, height), given to the
+        images of every page.
+    :param image_srcsets: Mapping of image URL to the srcset of its variants,
+        given to the images of every page.
+    :param previous_builds: Mapping of output directory to a directory holding
+        an earlier build of it, e.g. the live site of a staging directory.
+        Pages missing from the output are linked from there if unchanged.
+    """
+
+    basepath: str = "/"
+    parse_cache: ParseCache | None = None
+    asset_urls: Mapping[str, str] | None = None
+    image_sizes: Mapping[str, ImageSize] | None = None
+    image_srcsets: Mapping[str, str] | None = None
+    previous_builds: Mapping[str, str] | None = None
 
 
 def extract_title(markdown: str) -> str:
@@ -10,59 +71,261 @@ def extract_title(markdown: str) -> str:
     Raises ValueError if no H1 header is found.
     """
     for line in markdown.splitlines():
-        if line.lstrip().startswith("# "):
-            return line.lstrip()[2:].strip()
-        if line.lstrip().startswith("#") and not line.lstrip().startswith("##"):
-            # Handles cases like "#Title" (no space after #)
-            return line.lstrip()[1:].strip()
+        title = _line_title(line)
+        if title is not None:
+            return title
     raise ValueError("No H1 header found in markdown.")
 
 
+def _line_title(line: str) -> str | None:
+    stripped = line.lstrip()
+    if stripped.startswith("# "):
+        return stripped[2:].strip()
+    if stripped.startswith("#") and not stripped.startswith("##"):
+        # Handles cases like "#Title" (no space after #)
+        return stripped[1:].strip()
+    return None
+
+
+def _collect_titles(lines: Iterable[str], titles: list[str]) -> Iterator[str]:
+    # Pass the lines through, noting the first title extract_title would find
+    for line in lines:
+        if not titles:
+            title = _line_title(line)
+            if title is not None:
+                titles.append(title)
+        yield line
+
+
 def generate_page(
-    from_path: str, template_path: str, dest_path: str, basepath: str = "/"
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    options: RenderOptions | None = None,
+    variants: Mapping[str, str] | None = None,
 ) -> None:
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    """
+    Generate an HTML page from a markdown file.
+
+    :param from_path: Path to the markdown file.
+    :param template_path: Path to the HTML template file.
+    :param dest_path: Path of the HTML file to write, for options.basepath.
+    :param options: The settings of the build the page belongs to.
+    :param variants: Further basepath -> output path pairs to write from the
+        same parse; only URL resolution differs between them.
+    """
+    options = options or RenderOptions()
+    outputs = [(options.basepath, dest_path), *(variants or {}).items()]
+    for _, output_path in outputs:
+        print(
+            f"Generating page from {from_path} to {output_path} using {template_path}"
+        )
+
+    with span(PAGE_SPAN, path=from_path):
+        # Load the compiled template
+        with span("template"):
+            template = load_template(template_path)
+
+        # Convert markdown to HTML and extract the title
+        with span("parse"):
+            html_node, title = _parse_page(from_path, options.parse_cache)
+
+        if options.image_sizes:
+            add_image_sizes(html_node, options.image_sizes)
+        if options.image_srcsets:
+            add_srcsets(html_node, options.image_srcsets)
+
+        for output_basepath, output_path in outputs:
+            # Ensure destination directory exists
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+            # Stream the final HTML page, resolving URLs as they are emitted,
+            # and leave the file alone if it already holds exactly that page
+            with span("render", path=output_path):
+                written = write_if_changed(
+                    output_path,
+                    _iter_page(
+                        template, title, html_node, output_basepath, options.asset_urls
+                    ),
+                    previous=_previous_output(output_path, options.previous_builds),
+                )
+            if written:
+                notify_written(output_path)
+
+
+def _parse_page(from_path: str, parse_cache: ParseCache | None) -> tuple[HTMLNode, str]:
+    """
+    Parse a markdown file and find its title.
 
-    # Read markdown content
+    Without a parse cache the file is parsed as its lines are read, so a large
+    page is never held in memory as a single string. The cache is keyed by the
+    whole source, so with one the file is read in one go.
+
+    :param from_path: Path to the markdown file.
+    :param parse_cache: Reuse the parsed tree of an unchanged source from here.
+    :return: The parsed tree and the title of the page.
+    """
     with open(from_path, encoding="utf-8") as f:
-        markdown_content = f.read()
+        if parse_cache is not None:
+            with span("read"):
+                markdown_content = f.read()
+            return parse_cache.parse(markdown_content), extract_title(markdown_content)
+        titles: list[str] = []
+        html_node = markdown_lines_to_html_node(_collect_titles(f, titles))
+    if not titles:
+        raise ValueError("No H1 header found in markdown.")
+    return html_node, titles[0]
 
-    # Read template content
-    with open(template_path, encoding="utf-8") as f:
-        template_content = f.read()
 
-    # Convert markdown to HTML
-    html_content = markdown_to_html_node(markdown_content).to_html()
+def _previous_output(
+    output_path: str, previous_builds: Mapping[str, str] | None
+) -> str | None:
+    # The same output in an earlier build of its directory, if one is known
+    for output_dir, previous_dir in (previous_builds or {}).items():
+        relative_path = os.path.relpath(output_path, output_dir)
+        if relative_path.split(os.sep)[0] != os.pardir:
+            return os.path.join(previous_dir, relative_path)
+    return None
 
-    # Extract title
-    title = extract_title(markdown_content)
 
-    # Replace placeholders
-    page_content = (
-        template_content.replace("{{ Title }}", title)
-        .replace("{{ Content }}", html_content)
-        .replace('src="/', f'src="{basepath}')
-        .replace('href="/', f'href="{basepath}')
-    )
+def write_if_changed(
+    path: str, chunks: Iterable[str], previous: str | None = None
+) -> bool:
+    """
+    Write text to a file unless the file already holds exactly that text.
+
+    The chunks are compared with the existing file as they are produced, so
+    the text is never held in memory as a whole. Only the part from the first
+    difference on is written, and an unchanged file keeps its mtime, so sync
+    tools and live reload skip it. A file hardlinked elsewhere is replaced
+    rather than written through.
 
-    # Ensure destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    A file that does not exist yet is compared with previous instead, e.g.
+    the same page in the live site when building into an empty staging tree,
+    and linked from it if it already holds the text.
 
-    # Write the final HTML page
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(page_content)
+    :param path: The file to write.
+    :param chunks: The text to write, encoded as UTF-8.
+    :param previous: A file to link path from if it holds the same text.
+    :return: True if the file was written, False if it was already up to date.
+    """
+    encoded = _encode_blocks(chunks)
+    base = path if previous is None or os.path.lexists(path) else previous
+    try:
+        f = open(base, "r+b" if base == path else "rb")
+    except FileNotFoundError:
+        with open(path, "wb") as new:
+            new.writelines(encoded)
+        return True
+    with f:
+        difference = _first_difference(f, encoded)
+        if difference is None:
+            if base != path:
+                copy_file(base, path, link=True)
+            return False
+        offset, data = difference
+        if base == path and os.fstat(f.fileno()).st_nlink == 1:
+            f.seek(offset)
+            f.write(data)
+            f.writelines(encoded)
+            f.truncate()
+        else:
+            _write_replacement(path, f, offset, itertools.chain([data], encoded))
+    return True
+
+
+def _first_difference(
+    f: BinaryIO, encoded: Iterator[bytes]
+) -> tuple[int, bytes] | None:
+    # Read the file along the blocks, returning the offset and block where
+    # they first differ, or None if the file holds exactly the blocks
+    offset = 0
+    for data in encoded:
+        if f.read(len(data)) != data:
+            return offset, data
+        offset += len(data)
+    if f.read(1):
+        return offset, b""
+    return None
 
 
-def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str = "/"
+def _write_replacement(
+    path: str, f: BinaryIO, length: int, rest: Iterable[bytes]
 ) -> None:
+    # Write the first length bytes of f and then the rest to a new file, and
+    # put it in place of path, so no other link to f's file sees the change
+    tmp_path = f"{path}.tmp"
+    f.seek(0)
+    with open(tmp_path, "wb") as new:
+        while length:
+            block = f.read(min(length, 1 << 16))
+            new.write(block)
+            length -= len(block)
+        new.writelines(rest)
+    os.replace(tmp_path, path)
+
+
+def _encode_blocks(chunks: Iterable[str], size: int = 1 << 16) -> Iterator[bytes]:
+    # Compare and write in blocks: rendering yields many tiny chunks, and a
+    # read per chunk would cost more than writing the page outright.
+    block: list[str] = []
+    length = 0
+    for chunk in chunks:
+        block.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(block).encode("utf-8")
+            block.clear()
+            length = 0
+    if block:
+        yield "".join(block).encode("utf-8")
+
+
+def render_page(
+    markdown_content: str, template: Template, options: RenderOptions | None = None
+) -> str:
     """
-    Recursively generate pages from markdown files in a directory.
+    Render a markdown document into a complete HTML page in memory.
+
+    :param markdown_content: The markdown source of the page.
+    :param template: The compiled template to render the page with.
+    :param options: The settings to render the page with. Its image sizes are
+        looked up even when empty, so they may be read as they are asked for.
+    :return: The HTML page.
+    """
+    options = options or RenderOptions()
+    html_node = markdown_to_html_node(markdown_content)
+    if options.image_sizes is not None:
+        add_image_sizes(html_node, options.image_sizes)
+    title = extract_title(markdown_content)
+    return "".join(
+        _iter_page(template, title, html_node, options.basepath, options.asset_urls)
+    )
+
+
+def _iter_page(
+    template: Template,
+    title: str,
+    html_node: HTMLNode,
+    basepath: str,
+    asset_urls: Mapping[str, str] | None = None,
+) -> Iterator[str]:
+    resolve_url = basepath_resolver(basepath, asset_urls)
+    return template.iter_render(
+        {"Title": title, "Content": partial(html_node.iter_html, resolve_url)},
+        resolve_url,
+    )
+
+
+def find_pages(dir_path_content: str, dest_dir_path: str) -> list[tuple[str, str]]:
+    """
+    Find every markdown file under a directory and its output path.
 
     :param dir_path_content: Path to the directory containing markdown files.
-    :param template_path: Path to the HTML template file.
     :param dest_dir_path: Path to the destination directory for generated HTML files.
+    :return: (source path, destination path) pairs, sorted by source path.
     """
+    pages = []
     for root, _, files in os.walk(dir_path_content):
         for file in files:
             if file.endswith(".md"):
@@ -71,4 +334,269 @@ def generate_pages_recursive(
                 dest_path = os.path.join(
                     dest_dir_path, relative_path.replace(".md", ".html")
                 )
-                generate_page(from_path, template_path, dest_path, basepath=basepath)
+                pages.append((from_path, dest_path))
+    return sorted(pages)
+
+
+# The settings beyond options are keyword-only, so calls name each of them.
+def generate_pages_recursive(  # pylint: disable=too-many-arguments
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    options: RenderOptions | None = None,
+    *,
+    incremental: bool = False,
+    jobs: int = 1,
+    targets: Mapping[str, str] | None = None,
+) -> None:
+    """
+    Recursively generate pages from markdown files in a directory.
+
+    :param dir_path_content: Path to the directory containing markdown files.
+    :param template_path: Path to the default HTML template file. A
+        template.html inside the content tree overrides it for its directory.
+    :param dest_dir_path: Path to the destination directory for generated HTML
+        files, for options.basepath.
+    :param options: The settings every page is rendered with. The least
+        recently used entries of its parse cache are evicted after the build.
+    :param incremental: Only rebuild pages whose inputs changed since the last
+        build, as recorded in the build manifest, and delete orphaned outputs.
+    :param jobs: Number of worker processes to generate pages with.
+    :param targets: Further basepath -> destination directory pairs. Each page
+        is parsed once and written to every target.
+    :raises ExceptionGroup: If any page fails to generate with several jobs.
+    """
+    options = options or RenderOptions()
+    outputs = _Outputs(
+        [(options.basepath, dest_dir_path), *(targets or {}).items()], incremental
+    )
+    pages = _plan_pages(
+        dir_path_content,
+        template_path,
+        dest_dir_path,
+        outputs,
+        _build_inputs(options) if incremental else None,
+    )
+
+    errors: list[BaseException] = []
+    try:
+        for page_outputs, error in _generate_pages(pages, jobs, options):
+            if error is None:
+                outputs.record(page_outputs)
+            else:
+                errors.append(error)
+        outputs.prune()
+    finally:
+        outputs.save()
+        if options.parse_cache is not None:
+            options.parse_cache.prune()
+    if errors:
+        raise BaseExceptionGroup(f"Failed to generate {len(errors)} page(s)", errors)
+
+
+PageOutputs = list[tuple[str, str]]
+
+
+class _Outputs:
+    """
+    The output paths of a build's pages in every target directory.
+
+    In an incremental build, outputs whose inputs match the build manifest of
+    their target are skipped, and the inputs of the rest are recorded there
+    once they are written.
+
+    :param targets: (basepath, target directory) pairs.
+    :param incremental: Whether to check and update the build manifests.
+    """
+
+    def __init__(self, targets: list[tuple[str, str]], incremental: bool):
+        self.targets = targets
+        self.manifests = (
+            {target_dir: BuildManifest.load(target_dir) for _, target_dir in targets}
+            if incremental
+            else {}
+        )
+        self.entries: dict[str, tuple[str, dict[str, str]]] = {}
+
+    def stale(
+        self, relative_dest: str, inputs: Mapping[str, str] | None
+    ) -> PageOutputs:
+        """
+        Find the outputs of a page that need writing.
+
+        :param relative_dest: The output path of the page within a target.
+        :param inputs: The inputs of the page, in an incremental build.
+        :return: (basepath, output path) pairs; every target's without inputs.
+        """
+        outputs = []
+        for basepath, target_dir in self.targets:
+            dest_path = os.path.join(target_dir, relative_dest)
+            if inputs is not None:
+                entry = {**inputs, "basepath": basepath}
+                self.entries[dest_path] = (target_dir, entry)
+                if self.manifests[target_dir].is_fresh(dest_path, entry):
+                    continue
+            outputs.append((basepath, dest_path))
+        return outputs
+
+    def record(self, outputs: PageOutputs) -> None:
+        """
+        Record that outputs were written from the inputs they were found with.
+
+        :param outputs: (basepath, output path) pairs returned by stale.
+        """
+        for _, dest_path in outputs:
+            if dest_path in self.entries:
+                target_dir, entry = self.entries[dest_path]
+                self.manifests[target_dir].record(dest_path, entry)
+
+    def prune(self) -> None:
+        """
+        Delete the outputs of pages that no longer have a source.
+        """
+        for target_dir, manifest in self.manifests.items():
+            keep = {
+                path for path, (root, _) in self.entries.items() if root == target_dir
+            }
+            for removed in manifest.prune(keep):
+                print(f"Removed orphaned page {removed}")
+
+    def save(self) -> None:
+        """
+        Write the build manifests back to their target directories.
+        """
+        for manifest in self.manifests.values():
+            manifest.save()
+
+
+def _plan_pages(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    outputs: _Outputs,
+    build_inputs: Mapping[str, str] | None,
+) -> list[tuple[str, str, PageOutputs]]:
+    # Find each page's template and the outputs of it that need writing
+    directory_templates: dict[str, str] = {}
+    pages = []
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        directory = os.path.dirname(from_path)
+        if directory not in directory_templates:
+            directory_templates[directory] = find_template(
+                from_path, dir_path_content, template_path
+            )
+        page_template_path = directory_templates[directory]
+        inputs = (
+            {
+                "source": os.path.relpath(from_path, dir_path_content).replace(
+                    os.sep, "/"
+                ),
+                "source_hash": hash_file(from_path),
+                "template_hash": load_template(page_template_path).digest,
+                **build_inputs,
+            }
+            if build_inputs is not None
+            else None
+        )
+        page_outputs = outputs.stale(os.path.relpath(dest_path, dest_dir_path), inputs)
+        if page_outputs:
+            pages.append((from_path, page_template_path, page_outputs))
+    return pages
+
+
+def _build_inputs(options: RenderOptions) -> dict[str, str]:
+    # Pages link fingerprinted assets by hash and give images their sizes and
+    # variants, so a change to any of them is an input of every page.
+    inputs = {"renderer": RENDERER_VERSION}
+    for name, value in (
+        ("assets_hash", options.asset_urls),
+        ("image_sizes_hash", options.image_sizes),
+        ("image_srcsets_hash", options.image_srcsets),
+    ):
+        if value:
+            inputs[name] = hashlib.sha256(
+                json.dumps(dict(value), sort_keys=True).encode("utf-8")
+            ).hexdigest()
+    return inputs
+
+
+# The settings of the build a worker process generates pages for.
+_worker_options = RenderOptions()
+
+
+def _generate_page_outputs(
+    from_path: str, template_path: str, outputs: PageOutputs, options: RenderOptions
+) -> None:
+    (basepath, dest_path), *variants = outputs
+    generate_page(
+        from_path,
+        template_path,
+        dest_path,
+        options=replace(options, basepath=basepath),
+        variants=dict(variants),
+    )
+
+
+def _generate_page_in_worker(
+    from_path: str, template_path: str, outputs: PageOutputs
+) -> tuple[list[str], list[TraceEvent]]:
+    written: list[str] = []
+    add_write_listener(written.append)
+    try:
+        _generate_page_outputs(from_path, template_path, outputs, _worker_options)
+    finally:
+        remove_write_listener(written.append)
+    # Send the outputs actually written and the page's spans back to the
+    # parent, which notifies its own listeners.
+    return written, take_events()
+
+
+def _init_worker(tracing: bool, options: RenderOptions) -> None:
+    # The settings are the same for every page, so they are sent to each
+    # worker once rather than with every page.
+    global _worker_options  # pylint: disable=global-statement
+    _worker_options = options
+    clear_write_listeners()
+    if tracing:
+        start_tracing()
+
+
+def _generate_pages(
+    pages: list[tuple[str, str, PageOutputs]], jobs: int, options: RenderOptions
+) -> Iterator[tuple[PageOutputs, BaseException | None]]:
+    """
+    Generate pages and report each outcome in the order the pages were given.
+
+    With a single job, pages are generated in this process and the first
+    failure propagates. Otherwise they are handed to a process pool largest
+    first, so the biggest pages do not start last and hold up the end of the
+    build; failures are reported alongside their page instead of raised.
+    """
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, template_path, outputs in pages:
+            _generate_page_outputs(from_path, template_path, outputs, options)
+            yield outputs, None
+        return
+
+    schedule = sorted(pages, key=lambda page: os.path.getsize(page[0]), reverse=True)
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(pages)),
+        initializer=_init_worker,
+        initargs=(is_tracing(), options),
+    ) as executor:
+        futures = {
+            from_path: executor.submit(
+                _generate_page_in_worker, from_path, template_path, outputs
+            )
+            for from_path, template_path, outputs in schedule
+        }
+    for from_path, _, outputs in pages:
+        error = futures[from_path].exception()
+        if error is not None:
+            error.add_note(f"while generating {from_path}")
+        else:
+            written, events = futures[from_path].result()
+            add_events(events)
+            for dest_path in written:
+                notify_written(dest_path)
+        yield outputs, error
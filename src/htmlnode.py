@@ -1,3 +1,49 @@
+from collections.abc import Iterable, Iterator, Mapping
+from typing import TextIO
+
+from src.urls import SRCSET_ATTRIBUTES, URL_ATTRIBUTES, UrlResolver, resolve_srcset
+
+
+class FrozenProps(Mapping[str, str]):
+    """
+    An immutable attribute mapping backed by a single flat tuple.
+
+    Nodes carry only a handful of attributes, so a linear scan is as fast as
+    hashing and the tuple is a fraction of the size of a dict.
+
+    :param props: A mapping or iterable of (name, value) pairs.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, props: Mapping[str, str] | Iterable[tuple[str, str]] = ()):
+        pairs = props.items() if isinstance(props, Mapping) else props
+        self._items: tuple[str, ...] = tuple(item for pair in pairs for item in pair)
+
+    def __getitem__(self, key: str) -> str:
+        items = self._items
+        for i in range(0, len(items), 2):
+            if items[i] == key:
+                return items[i + 1]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items[::2])
+
+    def __len__(self) -> int:
+        return len(self._items) // 2
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self.items()))
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+# Shared by every node created without attributes.
+EMPTY_PROPS = FrozenProps()
+
+
 class HTMLNode:
     """
     Create a simple HTML node representation.
@@ -5,34 +51,65 @@ class HTMLNode:
     :param tag: The HTML tag (e.g., 'div', 'span').
     :param value: A string value representing the value of the html tag.
     :param children: A list of child nodes or strings.
-    :param props: A dictionary of attributes for the HTML tag.
+    :param props: A dictionary of attributes for the HTML tag. Pass a
+        FrozenProps for a compact, immutable mapping.
     :return: A dictionary representing the HTML node.
     """
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
         value: str | None = None,
         children: list["HTMLNode"] | None = None,
-        props: dict[str, str] | None = None,
+        props: Mapping[str, str] | None = None,
     ):
         self.tag = tag
         self.value = value
         self.children = children if children else []
-        self.props = props if props else {}
+        self.props: Mapping[str, str] = props if props else EMPTY_PROPS
 
-    def to_html(self) -> str:
+    def to_html(self, resolve_url: UrlResolver | None = None) -> str:
         raise NotImplementedError
 
-    def props_to_html(self) -> str:
+    def iter_html(self, resolve_url: UrlResolver | None = None) -> Iterator[str]:
+        """
+        Yield the HTML for this node as a sequence of string chunks.
+
+        :param resolve_url: Optional function applied to href and src values.
+        :return: An iterator over chunks that join to the output of to_html.
+        """
+        yield self.to_html(resolve_url)
+
+    def write_html(self, fp: TextIO, resolve_url: UrlResolver | None = None) -> None:
+        """
+        Stream the HTML for this node to a file-like object.
+
+        :param fp: A writable text file.
+        :param resolve_url: Optional function applied to href and src values.
+        """
+        fp.writelines(self.iter_html(resolve_url))
+
+    def props_to_html(self, resolve_url: UrlResolver | None = None) -> str:
         """
         Convert the properties dictionary to an HTML attribute string.
 
+        :param resolve_url: Optional function applied to href and src values.
         :return: A string of HTML attributes.
         """
         if not self.props:
             return ""
-        return " ".join(f'{key}="{value}"' for key, value in self.props.items())
+        if resolve_url is None:
+            return " ".join(f'{key}="{value}"' for key, value in self.props.items())
+        attributes = []
+        for key, value in self.props.items():
+            if key in URL_ATTRIBUTES:
+                value = resolve_url(value)
+            elif key in SRCSET_ATTRIBUTES:
+                value = resolve_srcset(value, resolve_url)
+            attributes.append(f'{key}="{value}"')
+        return " ".join(attributes)
 
     def __repr__(self) -> str:
         return (
@@ -53,13 +130,16 @@ class LeafNode(HTMLNode):
     :param props: A dictionary of attributes for the HTML tag.
     """
 
-    def __init__(self, tag: str, value: str, props: dict[str, str] | None = None):
+    __slots__ = ()
+
+    def __init__(self, tag: str, value: str, props: Mapping[str, str] | None = None):
         super().__init__(tag=tag, value=value, props=props)
 
-    def to_html(self) -> str:
+    def to_html(self, resolve_url: UrlResolver | None = None) -> str:
         """
         Convert the leaf node to an HTML string.
 
+        :param resolve_url: Optional function applied to href and src values.
         :return: An HTML string representation of the node.
         """
         if not self.value and self.tag not in ["img", "a"]:
@@ -69,11 +149,14 @@ class LeafNode(HTMLNode):
         if self.tag == "img":
             if not self.props.get("src"):
                 raise ValueError("LeafNode with tag 'img' must have a 'src' attribute.")
-            return f"<{self.tag} {self.props_to_html()}/>"
+            return f"<{self.tag} {self.props_to_html(resolve_url)}/>"
         if self.tag == "a":
             if not self.props.get("href"):
                 raise ValueError("LeafNode with tag 'a' must have an 'href' attribute.")
-            return f"<{self.tag} {self.props_to_html()}>{self.value}</{self.tag}>"
+            return (
+                f"<{self.tag} {self.props_to_html(resolve_url)}>"
+                f"{self.value}</{self.tag}>"
+            )
         return f"<{self.tag}>{self.value}</{self.tag}>"
 
 
@@ -86,23 +169,63 @@ class ParentNode(HTMLNode):
     :param props: A dictionary of attributes for the HTML tag.
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
         children: list["HTMLNode"],
-        props: dict[str, str] | None = None,
+        props: Mapping[str, str] | None = None,
     ):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self) -> str:
+    def to_html(self, resolve_url: UrlResolver | None = None) -> str:
         """
         Convert the parent node and its children to an HTML string.
 
+        :param resolve_url: Optional function applied to href and src values.
         :return: An HTML string representation of the node and its children.
         """
-        if not self.tag:
-            raise ValueError("ParentNode must have a tag.")
-        if not self.children:
-            raise ValueError("ParentNode must have children.")
-        children_html = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+        return "".join(self.iter_html(resolve_url))
+
+    def iter_html(self, resolve_url: UrlResolver | None = None) -> Iterator[str]:
+        """
+        Yield the HTML for this node and its children as string chunks.
+
+        The tree is walked with an explicit stack of open elements rather than
+        by recursion, so nesting depth is not bounded by the recursion limit
+        and no intermediate string is built for any subtree.
+
+        :param resolve_url: Optional function applied to href and src values.
+        :return: An iterator over the chunks of the HTML string.
+        """
+        _check_parent(self)
+        yield f"<{self.tag}{self.props_to_html(resolve_url)}>"
+        stack: list[tuple[str, Iterator[HTMLNode]]] = [
+            (f"</{self.tag}>", iter(self.children))
+        ]
+        while stack:
+            closing_tag, children = stack[-1]
+            for child in children:
+                # Exact types on purpose: this is the hot path, and a subclass
+                # may render itself differently, so it goes through its own
+                # iter_html below.
+                if type(child) is LeafNode:  # pylint: disable=unidiomatic-typecheck
+                    yield child.to_html(resolve_url)
+                elif type(child) is ParentNode:  # pylint: disable=unidiomatic-typecheck
+                    _check_parent(child)
+                    yield f"<{child.tag}{child.props_to_html(resolve_url)}>"
+                    stack.append((f"</{child.tag}>", iter(child.children)))
+                    break
+                else:
+                    yield from child.iter_html(resolve_url)
+            else:
+                stack.pop()
+                yield closing_tag
+
+
+def _check_parent(node: ParentNode) -> None:
+    if not node.tag:
+        raise ValueError("ParentNode must have a tag.")
+    if not node.children:
+        raise ValueError("ParentNode must have children.")
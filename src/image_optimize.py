@@ -0,0 +1,412 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
+from typing import Any, NamedTuple
+
+from src.asset_sync import ASSET_MANIFEST_NAME, copy_file
+from src.build_manifest import BuildManifest, hash_file
+from src.build_trace import span
+from src.htmlnode import FrozenProps, HTMLNode
+
+# Record of the optimized image and variants in each output image's place,
+# keyed by the image's path.
+IMAGE_MANIFEST_NAME = ".images.json"
+
+# Where optimized images are cached between builds by default.
+DEFAULT_CACHE_DIR = ".image-cache"
+
+# Images re-encoded and given responsive variants. GIFs may be animated and
+# are left alone.
+OPTIMIZABLE_SUFFIXES = frozenset({".jpeg", ".jpg", ".png", ".webp"})
+
+# Widths of the downscaled variants, for images wider than each.
+VARIANT_WIDTHS = (480, 960, 1440)
+
+# Encoder quality of JPEG and WebP variants.
+VARIANT_QUALITY = 82
+
+# Bump whenever a change here alters the encoded images, so cached results
+# are not reused.
+OPTIMIZER_VERSION = "1"
+
+# The format each kind of image and its variants are encoded in.
+_SAVE_FORMATS = {".jpeg": "JPEG", ".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+
+_VARIANT_OPTIONS: dict[str, dict[str, object]] = {
+    "JPEG": {"quality": VARIANT_QUALITY, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": VARIANT_QUALITY, "method": 6},
+}
+
+# The file in a cache entry describing what the entry holds.
+_RESULT_NAME = "result.json"
+
+
+class OptimizeResult(NamedTuple):
+    """The output images an optimize run encoded, reused and dropped."""
+
+    optimized: list[str]
+    reused: list[str]
+    removed: list[str]
+
+
+def load_pillow() -> ModuleType | None:
+    """
+    Import the optional PIL.Image module of Pillow.
+
+    :return: The module, or None if Pillow is not installed.
+    """
+    try:
+        return importlib.import_module("PIL.Image")
+    except ImportError:
+        return None
+
+
+def load_image_ops() -> ModuleType:
+    """
+    Import the PIL.ImageOps module of Pillow, once Pillow is known to be there.
+
+    :return: The module.
+    """
+    return importlib.import_module("PIL.ImageOps")
+
+
+def is_optimizable(path: str) -> bool:
+    """
+    Check whether an image is re-encoded and given responsive variants.
+
+    :param path: The path of the image.
+    :return: True for PNG, JPEG and WebP files.
+    """
+    return os.path.splitext(path)[1].lower() in OPTIMIZABLE_SUFFIXES
+
+
+def variant_path(path: str, width: int) -> str:
+    """
+    Return the path of an image's variant of a given width.
+
+    "images/a.png" becomes "images/a-480w.png".
+
+    :param path: The path of the image.
+    :param width: The width of the variant in pixels.
+    :return: The path of the variant.
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}-{width}w{extension}"
+
+
+def optimize_images(
+    directory: str,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    jobs: int = 1,
+    widths: tuple[int, ...] = VARIANT_WIDTHS,
+) -> OptimizeResult:
+    """
+    Re-encode the images synced into an output directory and add variants.
+
+    Every PNG is re-encoded losslessly and replaced if that makes it
+    smaller; JPEG and WebP files keep their bytes, since Pillow cannot
+    re-encode them without loss. Every image also gets a downscaled variant,
+    e.g. images/a-480w.png, for each width it is wider than.
+
+    Results are cached in cache_dir by the hash of the image and the
+    settings, and hardlinked into the directory, so an image that was
+    optimized before, by any build, is not encoded again. Images whose
+    size, mtime and inode match what was recorded are not even hashed.
+    Cache misses are encoded in a process pool. Variants of images that are
+    gone are removed.
+
+    :param directory: The output directory the static files were synced to.
+    :param cache_dir: The directory holding optimized images between builds.
+    :param jobs: Number of worker processes encoding images.
+    :param widths: Widths of the variants to write.
+    :return: The image paths encoded, reused and dropped.
+    """
+    with span("images", path=directory):
+        return _optimize_images(directory, cache_dir, jobs, widths)
+
+
+class _ImagePlan(NamedTuple):
+    """What an optimize run does with each image of an output directory."""
+
+    # (key, cache entry) of every image placed from the cache.
+    placed: list[tuple[str, str]]
+    # Cache entry -> image encoded into it.
+    pending: dict[str, str]
+    reused: list[str]
+    keep: set[str]
+
+
+def _optimize_images(
+    directory: str, cache_dir: str, jobs: int, widths: tuple[int, ...]
+) -> OptimizeResult:
+    manifest = BuildManifest.load(directory, IMAGE_MANIFEST_NAME)
+    settings = json.dumps(
+        {"version": OPTIMIZER_VERSION, "widths": widths, "quality": VARIANT_QUALITY}
+    )
+    plan = _plan_images(directory, cache_dir, manifest, settings)
+    optimized = []
+    removed = []
+    try:
+        _encode_pending(plan.pending, jobs, widths)
+        for key, entry_dir in plan.placed:
+            path = os.path.join(directory, key)
+            if entry_dir in plan.pending:
+                optimized.append(path)
+            entry, stale = _place(path, entry_dir, manifest.pages.get(key))
+            manifest.pages[key] = entry | {"settings": settings}
+            removed.extend(stale)
+        # Drop the variants of images that are gone.
+        for key in sorted(set(manifest.pages) - plan.keep):
+            removed.extend(
+                _remove_variants(
+                    os.path.join(directory, key), manifest.pages.pop(key), keep=[]
+                )
+            )
+    finally:
+        manifest.save()
+    return OptimizeResult(optimized, plan.reused, removed)
+
+
+def _plan_images(
+    directory: str, cache_dir: str, manifest: BuildManifest, settings: str
+) -> _ImagePlan:
+    plan = _ImagePlan(placed=[], pending={}, reused=[], keep=set())
+    assets = BuildManifest.load(directory, ASSET_MANIFEST_NAME)
+    for key in sorted(assets.pages):
+        path = os.path.join(directory, key)
+        if not is_optimizable(key) or not os.path.isfile(path):
+            continue
+        plan.keep.add(key)
+        if _is_unchanged(manifest.pages.get(key), path, settings):
+            plan.reused.append(path)
+            continue
+        entry_dir = _entry_dir(cache_dir, hash_file(path), settings, key)
+        if os.path.isdir(entry_dir):
+            plan.reused.append(path)
+        else:
+            # Copies of the same image share one encode.
+            plan.pending.setdefault(entry_dir, path)
+        plan.placed.append((key, entry_dir))
+    return plan
+
+
+def _encode_pending(
+    pending: dict[str, str], jobs: int, widths: tuple[int, ...]
+) -> None:
+    # Encode each image into its cache entry, in a process pool if several
+    if jobs <= 1 or len(pending) <= 1:
+        for entry_dir, path in pending.items():
+            _optimize_image(path, entry_dir, widths)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+        futures = [
+            executor.submit(_optimize_image, path, entry_dir, widths)
+            for entry_dir, path in pending.items()
+        ]
+    for future in futures:
+        future.result()
+
+
+def _is_unchanged(recorded: dict[str, str] | None, path: str, settings: str) -> bool:
+    # The image is still the file placed by the last run with the same
+    # settings, and its variants are still there.
+    if recorded is None or recorded.get("settings") != settings:
+        return False
+    stat = os.stat(path)
+    return (
+        recorded.get("size") == str(stat.st_size)
+        and recorded.get("mtime_ns") == str(stat.st_mtime_ns)
+        and recorded.get("inode") == str(stat.st_ino)
+        and all(os.path.isfile(variant) for variant in _variants(recorded, path))
+    )
+
+
+def _entry_dir(cache_dir: str, digest: str, settings: str, key: str) -> str:
+    # The extension is part of the key: it decides what variants are encoded as.
+    extension = os.path.splitext(key)[1].lower()
+    cache_key = hashlib.sha256(
+        f"{digest}\0{settings}\0{extension}".encode("utf-8")
+    ).hexdigest()
+    return os.path.join(cache_dir, cache_key[:2], cache_key)
+
+
+def _variants(recorded: dict[str, str] | None, path: str) -> list[str]:
+    widths = (recorded or {}).get("variants", "")
+    return [variant_path(path, int(width)) for width in widths.split(",") if width]
+
+
+def _place(
+    path: str, entry_dir: str, recorded: dict[str, str] | None
+) -> tuple[dict[str, str], list[str]]:
+    # Link the cached image and variants into place, replacing rather than
+    # overwriting, so neither the cache nor a static file linked into the
+    # output is written through.
+    with open(os.path.join(entry_dir, _RESULT_NAME), encoding="utf-8") as f:
+        result = json.load(f)
+    extension = os.path.splitext(path)[1]
+    if result["image"]:
+        copy_file(os.path.join(entry_dir, f"image{extension}"), path, link=True)
+    variants = [variant_path(path, width) for width in result["variants"]]
+    for width, variant in zip(result["variants"], variants, strict=True):
+        copy_file(os.path.join(entry_dir, f"{width}w{extension}"), variant, link=True)
+    stale = _remove_variants(path, recorded, keep=variants)
+    stat = os.stat(path)
+    entry = {
+        "size": str(stat.st_size),
+        "mtime_ns": str(stat.st_mtime_ns),
+        "inode": str(stat.st_ino),
+        "width": str(result["width"] or ""),
+        "variants": ",".join(str(width) for width in result["variants"]),
+    }
+    return entry, stale
+
+
+def _remove_variants(
+    path: str, recorded: dict[str, str] | None, keep: list[str]
+) -> list[str]:
+    removed = []
+    for variant in _variants(recorded, path):
+        if variant not in keep and os.path.isfile(variant):
+            os.unlink(variant)
+            removed.append(variant)
+    return removed
+
+
+def _optimize_image(source: str, entry_dir: str, widths: tuple[int, ...]) -> None:
+    # Runs in a worker process: encode one image into a new cache entry.
+    image_module = load_pillow()
+    if image_module is None:
+        raise RuntimeError("optimizing images requires Pillow")
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        result: dict[str, object] = {"image": False, "width": None, "variants": []}
+        try:
+            with image_module.open(source) as image:
+                result = _encode(image_module, image, source, tmp_dir, widths)
+        except (OSError, ValueError, image_module.DecompressionBombError):
+            # Not an image Pillow can encode. The empty entry is cached all
+            # the same, so it is not tried again.
+            pass
+        with open(os.path.join(tmp_dir, _RESULT_NAME), "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another build cached the same image first.
+            pass
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+
+def _encode(
+    image_module: ModuleType,
+    image: Any,
+    source: str,
+    directory: str,
+    widths: tuple[int, ...],
+) -> dict[str, object]:
+    extension = os.path.splitext(source)[1].lower()
+    if getattr(image, "is_animated", False):
+        # Variants would only hold the first frame.
+        return {"image": False, "width": None, "variants": []}
+    image.load()
+    kept = extension == ".png" and _reencode_png(image, source, directory)
+    save_format = _SAVE_FORMATS[extension]
+    oriented = _variant_base(image, save_format)
+    options = dict(_VARIANT_OPTIONS[save_format])
+    if image.info.get("icc_profile"):
+        options["icc_profile"] = image.info["icc_profile"]
+    variants = []
+    for width in sorted(widths):
+        if width >= oriented.width:
+            break
+        height = max(1, round(oriented.height * width / oriented.width))
+        variant = oriented.resize((width, height), image_module.Resampling.LANCZOS)
+        variant.save(
+            os.path.join(directory, f"{width}w{extension}"),
+            format=save_format,
+            **options,
+        )
+        variants.append(width)
+    return {"image": kept, "width": oriented.width, "variants": variants}
+
+
+def _reencode_png(image: Any, source: str, directory: str) -> bool:
+    # Re-encode a PNG losslessly into the entry, keeping it only if smaller
+    if image.format != "PNG":
+        return False
+    path = os.path.join(directory, "image.png")
+    image.save(path, format="PNG", optimize=True)
+    if os.path.getsize(path) < os.path.getsize(source):
+        return True
+    os.unlink(path)
+    return False
+
+
+def _variant_base(image: Any, save_format: str) -> Any:
+    # The image as displayed, in a mode its variants can be saved in
+    oriented = load_image_ops().exif_transpose(image)
+    if oriented.mode in ("1", "P") or (
+        save_format == "JPEG" and oriented.mode not in ("L", "RGB", "CMYK")
+    ):
+        oriented = oriented.convert("RGB" if save_format == "JPEG" else "RGBA")
+    return oriented
+
+
+def image_srcsets(directory: str) -> dict[str, str]:
+    """
+    Map the URL of every image with variants in an output directory to its srcset.
+
+    Images are keyed by the URL pages use for them, which for fingerprinted
+    assets is the URL of their source. Each srcset lists the variants and
+    the image itself with their widths.
+
+    :param directory: The output directory images were optimized in.
+    :return: Mapping of root-relative URL to srcset attribute value.
+    """
+    assets = BuildManifest.load(directory, ASSET_MANIFEST_NAME)
+    manifest = BuildManifest.load(directory, IMAGE_MANIFEST_NAME)
+    srcsets = {}
+    for key, entry in sorted(manifest.pages.items()):
+        asset = assets.pages.get(key)
+        if asset is None or not entry.get("variants"):
+            continue
+        candidates = [
+            f"/{variant_path(key, int(width))} {width}w"
+            for width in entry["variants"].split(",")
+        ]
+        candidates.append(f"/{key} {entry['width']}w")
+        srcsets[f"/{asset.get('source', key)}"] = ", ".join(candidates)
+    return srcsets
+
+
+def add_srcsets(node: HTMLNode, srcsets: Mapping[str, str]) -> None:
+    """
+    Give every image in a tree that has variants a srcset prop.
+
+    The browser then downloads the smallest variant that fills the image's
+    width on screen.
+
+    :param node: The root of the tree; it is updated in place.
+    :param srcsets: Mapping of image URL to srcset attribute value.
+    """
+    # Walked with a stack, as iter_html is, so deep trees cannot hit the
+    # recursion limit
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "img":
+            srcset = srcsets.get(node.props.get("src", ""))
+            if srcset is not None and "srcset" not in node.props:
+                node.props = FrozenProps({**node.props, "srcset": srcset})
+        stack.extend(node.children)
@@ -0,0 +1,165 @@
+import os
+import struct
+from collections.abc import Mapping
+from typing import BinaryIO
+
+from src.build_manifest import BuildManifest
+from src.htmlnode import FrozenProps, HTMLNode
+
+# Static files whose dimensions are read and recorded.
+IMAGE_SUFFIXES = frozenset({".gif", ".jpeg", ".jpg", ".png", ".webp"})
+
+# JPEG start-of-frame markers, which carry the dimensions. C4, C8 and CC
+# share the range but are other segment types.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# JPEG markers that stand alone, without a length or payload.
+_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+# EXIF orientations that rotate the image a quarter turn.
+_TRANSPOSED = frozenset({5, 6, 7, 8})
+
+ImageSize = tuple[int, int]
+
+
+def is_image(path: str) -> bool:
+    """
+    Check whether a file is an image whose dimensions are recorded.
+
+    :param path: The path of the file.
+    :return: True for PNG, JPEG, GIF and WebP files.
+    """
+    return os.path.splitext(path)[1].lower() in IMAGE_SUFFIXES
+
+
+def read_image_size(path: str) -> ImageSize | None:
+    """
+    Read the intrinsic dimensions of an image from its header.
+
+    Only the first bytes are read for PNG, GIF and WebP. For JPEG the
+    segments before the frame header are skipped over without reading them,
+    except an EXIF segment, whose orientation can swap width and height as
+    browsers display the image. Nothing is decoded.
+
+    :param path: The path of the image.
+    :return: (width, height) in pixels, or None if the format is unknown or
+        the header is truncated.
+    """
+    with open(path, "rb") as f:
+        head = f.read(30)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                return _jpeg_size(f)
+        except struct.error:
+            pass
+    return None
+
+
+def _webp_size(head: bytes) -> ImageSize | None:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20:21] == b"\x2f":
+        (bits,) = struct.unpack("<I", head[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _jpeg_size(f: BinaryIO) -> ImageSize | None:
+    transposed = False
+    while True:
+        if f.read(1) != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE_MARKERS:
+            continue
+        (length,) = struct.unpack(">H", f.read(2))
+        if length < 2:
+            return None
+        if code in _SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            return (height, width) if transposed else (width, height)
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan: no frame header before the data.
+            return None
+        if code == 0xE1:
+            transposed = _exif_orientation(f.read(length - 2)) in _TRANSPOSED
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _exif_orientation(segment: bytes) -> int | None:
+    if not segment.startswith(b"Exif\0\0"):
+        return None
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None
+    try:
+        (ifd,) = struct.unpack(f"{order}I", tiff[4:8])
+        (count,) = struct.unpack(f"{order}H", tiff[ifd : ifd + 2])
+        for offset in range(ifd + 2, ifd + 2 + count * 12, 12):
+            tag, _, _, value = struct.unpack(f"{order}HHIH", tiff[offset : offset + 10])
+            if tag == 0x0112:
+                return int(value)
+    except struct.error:
+        pass
+    return None
+
+
+def image_sizes(manifest: BuildManifest) -> dict[str, ImageSize]:
+    """
+    Map the URL of every image recorded in an asset manifest to its size.
+
+    Images are keyed by the URL pages use for them, which for fingerprinted
+    assets is the URL of their source.
+
+    :param manifest: The asset manifest of an output directory.
+    :return: Mapping of root-relative URL to (width, height).
+    """
+    return {
+        f"/{entry.get('source', key)}": (int(entry["width"]), int(entry["height"]))
+        for key, entry in sorted(manifest.pages.items())
+        if entry.get("width") and entry.get("height")
+    }
+
+
+def add_image_sizes(node: HTMLNode, sizes: Mapping[str, ImageSize]) -> None:
+    """
+    Give every image in a tree whose size is known width and height props.
+
+    The browser can then reserve the space of each image before it loads.
+
+    :param node: The root of the tree; it is updated in place.
+    :param sizes: Mapping of image URL to (width, height).
+    """
+    # Walked with a stack, as iter_html is, so deep trees cannot hit the
+    # recursion limit
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "img":
+            size = sizes.get(node.props.get("src", ""))
+            if size is not None and "width" not in node.props:
+                width, height = size
+                node.props = FrozenProps(
+                    {**node.props, "width": str(width), "height": str(height)}
+                )
+        stack.extend(node.children)
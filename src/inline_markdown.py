@@ -1,5 +1,5 @@
-import re
-
+from src.block_markdown import iter_block_lines
+from src.inline_scanner import iter_link_spans, scan_inline
 from src.textnode import TextNode, TextType
 
 
@@ -37,8 +37,7 @@ def extract_markdown_images(text: str) -> list[tuple[str, str]]:
     :param text: The markdown text containing image URLs.
     :return: A list of image URLs found in the text.
     """
-    pattern = r"!\[(.*?)\]\((.*?)\)"
-    return re.findall(pattern, text)
+    return [(alt, url) for _, _, alt, url in iter_link_spans(text, "![")]
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
@@ -48,8 +47,7 @@ def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     :param text: The markdown text containing links.
     :return: A list of links found in the text.
     """
-    pattern = r"\[(.*?)\]\((.*?)\)"
-    return re.findall(pattern, text)
+    return [(label, url) for _, _, label, url in iter_link_spans(text, "[")]
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
@@ -59,21 +57,7 @@ def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
     :param old_nodes: List of TextNode objects to be split.
     :return: A list of new TextNode objects with images.
     """
-    new_nodes = []
-    for node in old_nodes:
-        parts = extract_markdown_images(node.text)
-        if not parts:
-            new_nodes.append(node)
-            continue
-
-        text_parts = re.split(r"!\[.*?\]\(.*?\)", node.text)
-        for i, part in enumerate(text_parts):
-            if part.strip():
-                new_nodes.append(TextNode(part, TextType.TEXT))
-            if i < len(parts):
-                image_text, url = parts[i]
-                new_nodes.append(TextNode(image_text, TextType.IMAGE, url))
-    return new_nodes
+    return _split_nodes_links(old_nodes, "![", TextType.IMAGE)
 
 
 def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
@@ -83,20 +67,26 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     :param old_nodes: List of TextNode objects to be split.
     :return: A list of new TextNode objects with links.
     """
+    return _split_nodes_links(old_nodes, "[", TextType.LINK)
+
+
+def _split_nodes_links(
+    old_nodes: list[TextNode], opener: str, text_type: TextType
+) -> list[TextNode]:
     new_nodes = []
     for node in old_nodes:
-        parts = extract_markdown_links(node.text)
-        if not parts:
+        matched = False
+        text_start = 0
+        for start, end, label, url in iter_link_spans(node.text, opener):
+            if node.text[text_start:start].strip():
+                new_nodes.append(TextNode(node.text[text_start:start], TextType.TEXT))
+            new_nodes.append(TextNode(label, text_type, url))
+            matched = True
+            text_start = end
+        if not matched:
             new_nodes.append(node)
-            continue
-
-        text_parts = re.split(r"\[.*?\]\(.*?\)", node.text)
-        for i, part in enumerate(text_parts):
-            if part.strip():
-                new_nodes.append(TextNode(part, TextType.TEXT))
-            if i < len(parts):
-                link_text, url = parts[i]
-                new_nodes.append(TextNode(link_text, TextType.LINK, url))
+        elif node.text[text_start:].strip():
+            new_nodes.append(TextNode(node.text[text_start:], TextType.TEXT))
     return new_nodes
 
 
@@ -104,21 +94,12 @@ def text_to_textnodes(text: str) -> list[TextNode]:
     """
     Convert a plain text string into a list of TextNode objects.
 
+    The text is tokenized by a single linear-time scan; see scan_inline.
+
     :param text: The plain text to convert.
     :return: A list of TextNode objects with appropriate TextType and URLs.
     """
-    nodes = [TextNode(text, TextType.TEXT)]
-    delimiter_map = {
-        "**": TextType.BOLD,
-        "_": TextType.ITALIC,
-        "`": TextType.CODE,
-    }
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    for delimiter, text_type in delimiter_map.items():
-        nodes = split_nodes_delimiter(nodes, delimiter, text_type)
-
-    return nodes
+    return scan_inline(text)
 
 
 def markdown_to_blocks(markdown: str) -> list[str]:
@@ -127,19 +108,4 @@ def markdown_to_blocks(markdown: str) -> list[str]:
     :param markdown: The markdown text to convert.
     :return: A list of block strings.
     """
-    blocks = []
-    lines = markdown.split("\n")
-    current_block: list[str] = []
-
-    for line in lines:
-        if not line.strip():
-            if current_block:
-                blocks.append("\n".join(current_block))
-                current_block = []
-        else:
-            current_block.append(line.strip())
-
-    if current_block:
-        blocks.append("\n".join(current_block))
-
-    return blocks
+    return ["\n".join(block) for block in iter_block_lines(markdown.split("\n"))]
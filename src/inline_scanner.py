@@ -0,0 +1,171 @@
+import re
+from collections.abc import Iterator
+
+from src.textnode import TextNode, TextType
+
+DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+_DELIMITER_PATTERN = re.compile(r"\*\*|_|`")
+
+
+class _Finder:
+    """
+    Memoised forward search over a single string.
+
+    Every query remembers where its match was found, so a later query starting
+    at or before that match is answered without rescanning. As long as the
+    scanner only moves forward, each needle walks the text at most once.
+
+    :param text: The string to search.
+    """
+
+    def __init__(self, text: str):
+        self._text = text
+        self._cache: dict[str, tuple[int, int]] = {}
+        self._pattern_cache: tuple[int, re.Match[str] | None] = (len(text) + 1, None)
+
+    def find(self, needle: str, start: int) -> int:
+        """
+        Find the first occurrence of a needle at or after start.
+
+        :param needle: The substring to search for.
+        :param start: The index to search from.
+        :return: The index of the match, or -1 if there is none.
+        """
+        searched_from, found = self._cache.get(needle, (len(self._text) + 1, -1))
+        if searched_from <= start and (found == -1 or found >= start):
+            return found
+        found = self._text.find(needle, start)
+        self._cache[needle] = (start, found)
+        return found
+
+    def next_delimiter(self, start: int) -> re.Match[str] | None:
+        """
+        Find the first emphasis or code delimiter at or after start.
+
+        :param start: The index to search from.
+        :return: The match for the delimiter, or None if there is none.
+        """
+        searched_from, match = self._pattern_cache
+        if searched_from <= start and (match is None or match.start() >= start):
+            return match
+        match = _DELIMITER_PATTERN.search(self._text, start)
+        self._pattern_cache = (start, match)
+        return match
+
+
+def iter_link_spans(text: str, opener: str) -> Iterator[tuple[int, int, str, str]]:
+    r"""
+    Find markdown links or images in a single left-to-right pass.
+
+    Matches the same non-overlapping spans as re.finditer with the pattern
+    re.escape(opener) + r"(.*?)\]\((.*?)\)": the label ends at the first "](",
+    the URL at the next ")", and neither may cross a newline. Unlike the
+    regex, which rescans to the end of the line from every unmatched opener,
+    each needle is searched for at most once across the whole text.
+
+    :param text: The markdown text to search.
+    :param opener: "[" for links or "![" for images.
+    :return: An iterator of (start, end, label, url) tuples.
+    """
+    finder = _Finder(text)
+    start = finder.find(opener, 0)
+    while start != -1:
+        label_start = start + len(opener)
+        label_end = finder.find("](", label_start)
+        if label_end == -1:
+            return
+        url_end = finder.find(")", label_end + 2)
+        if url_end == -1:
+            return
+        newline = finder.find("\n", start)
+        if newline == -1 or newline > url_end:
+            label = text[label_start:label_end]
+            yield start, url_end + 1, label, text[label_end + 2 : url_end]
+            start = finder.find(opener, url_end + 1)
+        else:
+            start = finder.find(opener, start + 1)
+
+
+def _next_link(
+    finder: _Finder, text: str, start: int
+) -> tuple[int, int, TextNode] | None:
+    """
+    Find the first complete markdown image or link at or after start.
+
+    Matches the same spans as iter_link_spans: the label ends at the first
+    "](", the URL at the next ")", and neither may cross a newline.
+
+    :return: The span of the match and its TextNode, or None.
+    """
+    bracket = finder.find("[", start)
+    while bracket != -1:
+        label_end = finder.find("](", bracket + 1)
+        if label_end == -1:
+            return None
+        url_end = finder.find(")", label_end + 2)
+        if url_end == -1:
+            return None
+        newline = finder.find("\n", bracket)
+        if newline == -1 or newline > url_end:
+            label = text[bracket + 1 : label_end]
+            url = text[label_end + 2 : url_end]
+            if bracket > start and text[bracket - 1] == "!":
+                return bracket - 1, url_end + 1, TextNode(label, TextType.IMAGE, url)
+            return bracket, url_end + 1, TextNode(label, TextType.LINK, url)
+        bracket = finder.find("[", bracket + 1)
+    return None
+
+
+def scan_inline(text: str) -> list[TextNode]:
+    """
+    Split inline markdown into TextNodes in a single left-to-right pass.
+
+    Images and links take precedence over emphasis, so a delimiter only pairs
+    with a closing delimiter that comes before the next image or link. An
+    unpaired delimiter is kept as literal text, and whitespace-only text
+    between markup is dropped, matching the split_nodes_* functions.
+
+    :param text: The inline markdown to scan.
+    :return: A list of TextNode objects.
+    """
+    finder = _Finder(text)
+    nodes = []
+    text_start = 0
+    cursor = 0
+    link = _next_link(finder, text, 0)
+    while True:
+        if link is not None and link[0] < cursor:
+            link = _next_link(finder, text, cursor)
+        delimiter = finder.next_delimiter(cursor)
+        if link is not None and (delimiter is None or link[0] <= delimiter.start()):
+            link_start, link_end, link_node = link
+            if text[text_start:link_start].strip():
+                nodes.append(TextNode(text[text_start:link_start], TextType.TEXT))
+            nodes.append(link_node)
+            text_start = cursor = link_end
+            continue
+        if delimiter is None:
+            break
+
+        token = delimiter.group()
+        limit = link[0] if link is not None else len(text)
+        close = finder.find(token, delimiter.end())
+        if close == -1 or close + len(token) > limit:
+            cursor = delimiter.start() + 1
+            continue
+        if text[text_start : delimiter.start()].strip():
+            nodes.append(TextNode(text[text_start : delimiter.start()], TextType.TEXT))
+        if text[delimiter.end() : close].strip():
+            nodes.append(TextNode(text[delimiter.end() : close], DELIMITERS[token]))
+        text_start = cursor = close + len(token)
+
+    # Text with no markup is kept whole, even if empty, as text_to_textnodes
+    # always kept it.
+    if not text_start or text[text_start:].strip():
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
+    return nodes
@@ -0,0 +1,167 @@
+import os
+import queue
+import threading
+from collections.abc import Callable
+from urllib.parse import quote, unquote
+
+# Path of the Server-Sent Events endpoint, relative to the site's base path.
+EVENTS_PATH = "__livereload"
+
+_CLIENT_SCRIPT = """<script>
+(() => {
+  const page = encodeURIComponent(location.pathname);
+  const events = new EventSource("%s?page=" + page);
+  events.onmessage = (event) => {
+    if (!event.data.endsWith(".css")) {
+      location.reload();
+      return;
+    }
+    for (const link of document.querySelectorAll('link[rel="stylesheet"]')) {
+      const url = new URL(link.href);
+      if (url.pathname === event.data) {
+        url.searchParams.set("livereload", Date.now());
+        link.href = url.href;
+      }
+    }
+  };
+})();
+</script>
+"""
+
+WriteListener = Callable[[str], None]
+
+_write_listeners: list[WriteListener] = []
+
+
+def add_write_listener(listener: WriteListener) -> None:
+    """
+    Call a function with the path of every file the build writes.
+
+    :param listener: Called with the path of each written file.
+    """
+    _write_listeners.append(listener)
+
+
+def remove_write_listener(listener: WriteListener) -> None:
+    """
+    Stop calling a function added with add_write_listener.
+
+    :param listener: The listener to remove.
+    """
+    _write_listeners.remove(listener)
+
+
+def clear_write_listeners() -> None:
+    """
+    Remove every write listener, e.g. in a worker process.
+    """
+    _write_listeners.clear()
+
+
+def notify_written(path: str) -> None:
+    """
+    Tell the write listeners that the build finished writing a file.
+
+    :param path: The path of the written file.
+    """
+    for listener in list(_write_listeners):
+        listener(path)
+
+
+class ChangeBroker:
+    """
+    Fan out changed output URLs to the browsers that need them.
+
+    Each browser subscribes with the page it shows. A changed page only goes
+    to browsers showing it, while changed assets go to every browser, since
+    any page may use them. Pages are matched by their decoded paths, and
+    changed URLs are sent percent-encoded, as browsers report their paths.
+
+    :param output_dir: The directory the build writes the site to.
+    :param basepath: The base path the site is served from.
+    :param keepalive: Seconds between keepalive comments on an idle stream.
+    """
+
+    def __init__(self, output_dir: str, basepath: str = "/", keepalive: float = 15.0):
+        self.output_dir = output_dir
+        self.basepath = basepath
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._subscribers: dict[queue.SimpleQueue[str], str] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        """The number of queues currently subscribed."""
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, page: str) -> queue.SimpleQueue[str]:
+        """
+        Start receiving the changes relevant to a page.
+
+        :param page: The URL path of the page shown in the browser, which may
+            be percent-encoded.
+        :return: A queue the changed URLs are put on.
+        """
+        events: queue.SimpleQueue[str] = queue.SimpleQueue()
+        with self._lock:
+            self._subscribers[events] = _page_key(unquote(page))
+        return events
+
+    def unsubscribe(self, events: queue.SimpleQueue[str]) -> None:
+        """
+        Stop receiving changes on a queue returned by subscribe.
+
+        :param events: The queue to stop filling.
+        """
+        with self._lock:
+            del self._subscribers[events]
+
+    def publish(self, url: str) -> None:
+        """
+        Send a changed URL to the subscribers it concerns.
+
+        :param url: The decoded URL path of the changed output.
+        """
+        page = _page_key(url) if url.endswith(".html") else None
+        # Leave alone what browsers leave alone in location.pathname.
+        encoded = quote(url, safe="/!$&'()*+,;=:@[]^|~")
+        with self._lock:
+            for events, subscribed_page in self._subscribers.items():
+                if page is None or page == subscribed_page:
+                    events.put(encoded)
+
+    def file_written(self, path: str) -> None:
+        """
+        Publish the URL of a file written into the output directory.
+
+        Files outside the output directory are ignored, so this can be used
+        directly as a write listener.
+
+        :param path: The path of the written file.
+        """
+        relative_path = os.path.relpath(
+            os.path.abspath(path), os.path.abspath(self.output_dir)
+        )
+        if relative_path.startswith(".."):
+            return
+        self.publish(self.basepath + relative_path.replace(os.sep, "/"))
+
+
+def inject_client(html: bytes, basepath: str = "/") -> bytes:
+    """
+    Add the live-reload client to an HTML page, just before </body>.
+
+    :param html: The page.
+    :param basepath: The base path the site is served from.
+    :return: The page with the client script added.
+    """
+    script = (_CLIENT_SCRIPT % (basepath + EVENTS_PATH)).encode("utf-8")
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + script
+    return html[:index] + script + html[index:]
+
+
+def _page_key(url: str) -> str:
+    return url.removesuffix("index.html")
@@ -1,15 +1,324 @@
+import argparse
 import os
 import shutil
-import sys
+import threading
+from dataclasses import replace
 
-from src.generate_content import generate_pages_recursive
+from src.asset_sync import ASSET_MANIFEST_NAME, SyncResult, sync_directory
+from src.build_manifest import BuildManifest
+from src.build_trace import (
+    slowest_pages,
+    span,
+    start_tracing,
+    stop_tracing,
+    write_trace,
+)
+from src.dev_server import DevSite, serve
+from src.fingerprint import HEADERS_NAME, asset_urls, write_headers
+from src.generate_content import (
+    RENDERER_VERSION,
+    RenderOptions,
+    generate_pages_recursive,
+)
+from src.image_optimize import (
+    DEFAULT_CACHE_DIR,
+    image_srcsets,
+    load_pillow,
+    optimize_images,
+)
+from src.image_size import image_sizes
+from src.live_reload import ChangeBroker, add_write_listener
+from src.output_swap import prepare_staging, swap_directories
+from src.parse_cache import DEFAULT_MAX_BYTES, ParseCache
+from src.precompress import discard_sidecars, load_brotli, precompress_directory
+from src.publish_delta import (
+    DELTA_NAME,
+    PUBLISH_MANIFEST_NAME,
+    PublishDelta,
+    compute_delta,
+    scan_outputs,
+    write_delta,
+)
+from src.watch import watch_site
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the static site into docs/.")
+    parser.add_argument(
+        "basepath",
+        nargs="?",
+        default="/",
+        help="Base path prepended to root-relative URLs (default: /).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rebuild pages whose inputs changed since the last build, "
+        "starting from the previous build kept beside docs/.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes generating pages and optimizing images, "
+        "and of threads copying and compressing files (0: one per CPU). The "
+        "default of 1 keeps every stage of a build on one core.",
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        default=[],
+        type=parse_target,
+        metavar="BASEPATH=DIR",
+        help="Also write the site to DIR with BASEPATH, reusing the same parse.",
+    )
+    parser.add_argument(
+        "--checksum-static",
+        action="store_true",
+        help="Compare static files by content when their mtime changed.",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="Hardlink static files into docs/ instead of copying them.",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Copy stylesheets, scripts, images and fonts to names carrying their "
+        "content hash, point pages at them, and mark them immutable in "
+        "docs/_headers. URLs inside stylesheets are not rewritten.",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Write .gz sidecars, and .br ones if the brotli module is installed, "
+        "next to pages and static text files.",
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="Re-encode PNG images losslessly and give PNG, JPEG and WebP images "
+        "downscaled variants, offered to browsers through srcset. Needs Pillow.",
+    )
+    parser.add_argument(
+        "--image-cache",
+        default=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help="Cache optimized images in DIR, so unchanged images are not encoded "
+        f"again (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild docs/ as content, static or templates change. "
+        "With --serve, browsers reload the pages that were rebuilt.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve the site from its sources, rendering pages on request.",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        metavar="DIR",
+        help="Cache parsed pages in DIR, so unchanged pages are not parsed again, "
+        "e.g. when only the template changed.",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES >> 20,
+        metavar="MB",
+        help="Evict least recently used pages from the parse cache beyond this "
+        f"size (default: {DEFAULT_MAX_BYTES >> 20}).",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a timing trace of the build to PATH in Chrome trace format, "
+        "for chrome://tracing or Perfetto.",
+    )
+    parser.add_argument(
+        "--trace-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of slowest pages listed after a traced build (default: 10).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="Port for --serve (default: 8888).",
+    )
+    args = parser.parse_args(argv)
+    # Targets are keyed by base path, and outputs by directory.
+    basepaths: set[str] = set()
+    directories = {"docs"}
+    for basepath, directory in args.target:
+        if basepath in basepaths:
+            parser.error(f"--target given twice for base path {basepath!r}")
+        if os.path.normpath(directory) in directories:
+            parser.error(f"--target writes to {directory!r} twice")
+        basepaths.add(basepath)
+        directories.add(os.path.normpath(directory))
+    if args.fingerprint and args.watch:
+        # Watch rebuilds write assets under their own names into docs/.
+        parser.error("--fingerprint cannot be combined with --watch")
+    if args.optimize_images and args.watch:
+        # Watch rebuilds copy images over their optimized versions.
+        parser.error("--optimize-images cannot be combined with --watch")
+    return args
+
+
+def parse_target(value: str) -> tuple[str, str]:
+    basepath, separator, directory = value.partition("=")
+    if not separator or not basepath or not directory:
+        raise argparse.ArgumentTypeError(f"expected BASEPATH=DIR, got {value!r}")
+    return basepath, directory
 
 
 def main() -> None:  # pragma: no cover
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    clear_directory("docs")
-    copy_static_to_docs()
-    generate_pages_recursive("content", "template.html", "docs", basepath=basepath)
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    parse_cache = (
+        ParseCache(args.parse_cache, RENDERER_VERSION, args.parse_cache_size << 20)
+        if args.parse_cache
+        else None
+    )
+    options = RenderOptions(basepath=args.basepath, parse_cache=parse_cache)
+    if args.serve:
+        events = None
+        if args.watch:
+            # Rebuild docs/ in the background and push what it writes to browsers.
+            events = ChangeBroker("docs", args.basepath)
+            add_write_listener(events.file_written)
+            threading.Thread(
+                target=watch_site,
+                args=("content", "static", "template.html", "docs", options),
+                kwargs={"jobs": jobs},
+                daemon=True,
+            ).start()
+        site = DevSite("content", "static", "template.html", args.basepath, events)
+        serve(site, port=args.port)
+        return
+    build(args, options, jobs)
+    if args.watch:
+        if args.precompress:
+            add_write_listener(discard_sidecars)
+        watch_site("content", "static", "template.html", "docs", options, jobs=jobs)
+
+
+def build(args: argparse.Namespace, options: RenderOptions, jobs: int) -> None:
+    """
+    Build the site into docs/ and every --target directory.
+
+    Each output is built in a staging directory, which is swapped into place
+    once every output is complete.
+
+    :param args: The parsed command line.
+    :param options: The settings every page is rendered with.
+    :param jobs: Number of worker processes.
+    """
+    targets = dict(args.target)
+    if args.trace:
+        start_tracing()
+    # Build every output into a staging directory and swap it into place at
+    # the end, so docs/ never holds a partial site.
+    staging = {
+        dst: prepare_staging(dst, reuse=args.incremental)
+        for dst in ["docs", *targets.values()]
+    }
+    for stage in staging.values():
+        copy_static_to_docs(
+            clear=False,
+            dst=stage,
+            checksum=args.checksum_static,
+            link=args.link_static,
+            fingerprint=args.fingerprint,
+            jobs=jobs,
+        )
+    srcsets = None
+    if args.optimize_images:
+        if load_pillow() is None:
+            print("Pillow is not installed; leaving images as they are")
+        else:
+            for stage in staging.values():
+                optimize_images(stage, args.image_cache, jobs=jobs)
+            srcsets = image_srcsets(staging["docs"])
+    # Every output holds the same static files, so the same fingerprints and
+    # image attributes.
+    assets = BuildManifest.load(staging["docs"], ASSET_MANIFEST_NAME)
+    urls = asset_urls(assets) if args.fingerprint else None
+    with span("pages"):
+        generate_pages_recursive(
+            "content",
+            "template.html",
+            staging["docs"],
+            replace(
+                options,
+                asset_urls=urls,
+                image_sizes=image_sizes(assets),
+                image_srcsets=srcsets,
+                # Link unchanged pages from the live site, so an empty staging
+                # directory does not rewrite them.
+                previous_builds={stage: dst for dst, stage in staging.items()},
+            ),
+            incremental=args.incremental,
+            jobs=jobs,
+            targets={basepath: staging[dst] for basepath, dst in targets.items()},
+        )
+    if args.precompress:
+        brotli = load_brotli()
+        if brotli is None:
+            print("brotli is not installed; writing gzip sidecars only")
+        for dst, stage in staging.items():
+            precompress_directory(stage, previous=dst, brotli=brotli, jobs=jobs)
+    with span("delta"):
+        for dst, stage in staging.items():
+            report_publish_delta(dst, stage)
+    with span("swap"):
+        for dst, stage in staging.items():
+            swap_directories(stage, dst)
+    if args.trace:
+        report_trace(args.trace, args.trace_top)
+
+
+def report_trace(path: str, limit: int) -> None:
+    events = stop_tracing()
+    write_trace(path, events)
+    print(f"Wrote trace to {path}")
+    slowest = slowest_pages(events, limit)
+    if slowest:
+        print(f"Slowest {len(slowest)} page(s):")
+    for page, milliseconds in slowest:
+        print(f"{milliseconds:10.2f} ms  {page}")
+
+
+def report_publish_delta(dest_dir: str, staging: str) -> PublishDelta:
+    """
+    Work out what publishing a staged build changes, and write it beside it.
+
+    :param dest_dir: The output directory holding the live site.
+    :param staging: The directory holding the new build.
+    :return: The files the build added, changed and removed.
+    """
+    # The live site is only read: the staged record replaces its record when
+    # the build is swapped in.
+    live = (
+        scan_outputs(dest_dir, save=False)
+        if os.path.isdir(dest_dir)
+        else BuildManifest(os.path.join(dest_dir, PUBLISH_MANIFEST_NAME))
+    )
+    delta = compute_delta(live, scan_outputs(staging, linked_from=live))
+    write_delta(os.path.join(staging, DELTA_NAME), delta)
+    print(
+        f"{dest_dir}: {len(delta.added)} added, {len(delta.changed)} changed, "
+        f"{len(delta.removed)} removed (see {os.path.join(dest_dir, DELTA_NAME)})"
+    )
+    return delta
 
 
 def clear_directory(directory: str) -> None:
@@ -22,25 +331,34 @@ def clear_directory(directory: str) -> None:
                 shutil.rmtree(file_path)
 
 
-def copy_directory(src: str, dst: str) -> None:
-    if not os.path.exists(dst):
-        os.makedirs(dst)
-    for item in os.listdir(src):
-        s = os.path.join(src, item)
-        d = os.path.join(dst, item)
-        if os.path.isdir(s):
-            copy_directory(s, d)
-        else:
-            shutil.copy2(s, d)
-            print(f"Copied: {s} -> {d}")
-
-
-def copy_static_to_docs() -> None:
+# The settings are keyword-only, so calls name each of them.
+def copy_static_to_docs(  # pylint: disable=too-many-arguments
+    clear: bool = True,
+    dst: str = "docs",
+    *,
+    checksum: bool = False,
+    link: bool = False,
+    fingerprint: bool = False,
+    jobs: int = 8,
+) -> SyncResult:
     src = "static"
-    dst = "docs"
-    clear_directory(dst)
-    copy_directory(src, dst)
+    if clear:
+        clear_directory(dst)
+    result = sync_directory(
+        src, dst, checksum=checksum, link=link, fingerprint=fingerprint, jobs=jobs
+    )
+    print(
+        f"Synced {src} -> {dst}: {len(result.copied)} copied, "
+        f"{len(result.unchanged)} unchanged, {len(result.removed)} removed"
+    )
+    if fingerprint:
+        write_headers(
+            dst,
+            asset_urls(BuildManifest.load(dst, ASSET_MANIFEST_NAME)),
+            base=os.path.join(src, HEADERS_NAME),
+        )
+    return result
 
 
-if __name__ == "__main__":
+if __name__ == "__main__":  # pragma: no cover
     main()
@@ -1,6 +1,9 @@
-from src.block_markdown import BlockType, block_to_block_type
+from collections.abc import Callable, Iterable
+
+from src.block_markdown import BlockType, iter_blocks
+from src.build_trace import span
 from src.htmlnode import HTMLNode, ParentNode
-from src.inline_markdown import markdown_to_blocks, text_to_textnodes
+from src.inline_markdown import text_to_textnodes
 from src.textnode import TextNode, TextType, text_node_to_html_node
 
 
@@ -11,23 +14,30 @@ def markdown_to_html_node(markdown: str) -> HTMLNode:
     :param markdown: The markdown string to convert.
     :return: An HTMLNode representing the converted markdown.
     """
-    blocks = markdown_to_blocks(markdown)
+    return markdown_lines_to_html_node(markdown.split("\n"))
+
+
+def markdown_lines_to_html_node(lines: Iterable[str]) -> HTMLNode:
+    """
+    Convert markdown lines, e.g. an open file, to an HTMLNode.
+
+    Blocks are split as the lines are read and converted one at a time, so
+    neither the document nor its list of blocks is held in memory. Each
+    block's inline parsing is a span of a build trace; the rest of the parse
+    span is block splitting.
+
+    :param lines: The markdown lines to convert.
+    :return: An HTMLNode representing the converted markdown.
+    """
     parent_node = ParentNode(tag="div", children=[])
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        if block_type == BlockType.PARAGRAPH:
-            parent_node.children.append(handle_paragraph(block))
-        if block_type == BlockType.HEADING:
-            parent_node.children.extend(handle_heading(block))
-        if block_type == BlockType.CODE:
-            parent_node.children.append(handle_code(block))
-        if block_type == BlockType.QUOTE:
-            parent_node.children.append(handle_quote(block))
-        if block_type == BlockType.ORDERED_LIST:
-            parent_node.children.append(handle_ordered_list(block))
-        if block_type == BlockType.UNORDERED_LIST:
-            parent_node.children.append(handle_unordered_list(block))
+    for block_type, block_lines in iter_blocks(lines):
+        block = "\n".join(block_lines)
+        with span("inline"):
+            if block_type == BlockType.HEADING:
+                parent_node.children.extend(handle_heading(block))
+            else:
+                parent_node.children.append(BLOCK_HANDLERS[block_type](block))
 
     return parent_node
 
@@ -97,3 +107,12 @@ def handle_unordered_list(block: str) -> ParentNode:
         list_node = text_node_to_parent_node(text_nodes, tag="li")
         list_nodes.append(list_node)
     return ParentNode(tag="ul", children=list_nodes)
+
+
+BLOCK_HANDLERS: dict[BlockType, Callable[[str], ParentNode]] = {
+    BlockType.PARAGRAPH: handle_paragraph,
+    BlockType.CODE: handle_code,
+    BlockType.QUOTE: handle_quote,
+    BlockType.ORDERED_LIST: handle_ordered_list,
+    BlockType.UNORDERED_LIST: handle_unordered_list,
+}
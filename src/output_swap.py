@@ -0,0 +1,104 @@
+import ctypes
+import ctypes.util
+import os
+import shutil
+import tempfile
+import threading
+
+# renameat2 arguments: resolve paths against the working directory, and
+# exchange the two paths instead of replacing the second.
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def staging_path(dest_dir: str) -> str:
+    """
+    Return the path builds of an output directory are staged in.
+
+    The staging directory is a hidden sibling of the output directory, so it
+    lives on the same filesystem and can be renamed into place.
+
+    :param dest_dir: The output directory.
+    :return: The staging directory path.
+    """
+    parent, name = os.path.split(os.path.normpath(dest_dir))
+    return os.path.join(parent, f".{name}.staging")
+
+
+def prepare_staging(dest_dir: str, reuse: bool = False) -> str:
+    """
+    Get a staging directory ready for a build of an output directory.
+
+    After a swap the staging directory holds the previous build. With reuse,
+    that tree is kept as the base of the next build: its manifests describe
+    exactly what it contains, so an incremental build brings it up to date.
+    Otherwise it is removed in the background and the build starts empty.
+
+    :param dest_dir: The output directory.
+    :param reuse: Keep the previous build as the base of this one.
+    :return: The staging directory path.
+    """
+    staging = staging_path(dest_dir)
+    if os.path.isdir(staging) and not reuse:
+        remove_in_background(staging)
+    os.makedirs(staging, exist_ok=True)
+    return staging
+
+
+def swap_directories(staging: str, dest_dir: str) -> None:
+    """
+    Put a staged build in place of the output directory.
+
+    Where the kernel supports it, the two directories are exchanged in one
+    atomic rename, so readers see either the old or the new tree. Otherwise
+    two renames are used, leaving the output missing for a moment. Either
+    way the previous build ends up in the staging directory.
+
+    :param staging: The directory holding the new build.
+    :param dest_dir: The output directory.
+    """
+    if not os.path.exists(dest_dir):
+        os.rename(staging, dest_dir)
+        return
+    if _exchange(staging, dest_dir):
+        return
+    previous = f"{staging}.previous"
+    os.rename(dest_dir, previous)
+    os.rename(staging, dest_dir)
+    os.rename(previous, staging)
+
+
+def remove_in_background(path: str) -> threading.Thread:
+    """
+    Move a directory out of the way and delete it on another thread.
+
+    The rename is immediate, so path can be recreated straight away. The
+    thread is not a daemon, so the interpreter finishes the delete before it
+    exits.
+
+    :param path: The directory to remove.
+    :return: The thread deleting the directory.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    trash = tempfile.mkdtemp(prefix=f"{name}.trash-", dir=parent)
+    os.rename(path, os.path.join(trash, name))
+    thread = threading.Thread(target=shutil.rmtree, args=(trash,))
+    thread.start()
+    return thread
+
+
+def _exchange(first: str, second: str) -> bool:
+    try:
+        renameat2 = ctypes.CDLL(
+            ctypes.util.find_library("c") or None, use_errno=True
+        ).renameat2
+    except (OSError, AttributeError):
+        return False
+    result = renameat2(
+        _AT_FDCWD,
+        os.fsencode(first),
+        _AT_FDCWD,
+        os.fsencode(second),
+        _RENAME_EXCHANGE,
+    )
+    return not result
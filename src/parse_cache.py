@@ -0,0 +1,129 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+from src.htmlnode import EMPTY_PROPS, FrozenProps, HTMLNode, LeafNode, ParentNode
+from src.markdown_html import markdown_to_html_node
+
+# Default size limit of a parse cache directory.
+DEFAULT_MAX_BYTES = 64 << 20
+
+# A node as stored in the cache: (tag, value, props) for a leaf and
+# (tag, children, props) for a parent, with props as a flat name/value tuple.
+EncodedNode = tuple[str, "str | tuple[EncodedNode, ...]", tuple[str, ...]]
+
+
+class ParseCache:
+    """
+    Parsed markdown trees stored on disk, keyed by source content.
+
+    Each entry is the marshalled tuple encoding of the tree markdown_to_html_node
+    returned for a source, under the hash of the source, the parser version and
+    the interpreter's marshal format. Rebuilding unchanged sources, e.g. after a
+    template edit, then skips parsing. Hits refresh an entry's mtime, and prune
+    evicts the least recently used entries once the cache outgrows its limit.
+
+    Entries are written atomically, so several processes can share a cache.
+
+    :param directory: The directory holding the cache entries.
+    :param version: The parser version; changing it invalidates every entry.
+    :param max_bytes: The size prune shrinks the cache to.
+    """
+
+    def __init__(
+        self, directory: str, version: str, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+
+    def parse(self, markdown: str) -> HTMLNode:
+        """
+        Convert markdown to an HTMLNode, reusing a cached tree if there is one.
+
+        :param markdown: The markdown source of a page.
+        :return: The tree markdown_to_html_node returns for the source.
+        """
+        path = self._path(markdown)
+        try:
+            with open(path, "rb") as f:
+                node = _decode(marshal.loads(f.read()))
+            os.utime(path)
+            return node
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        node = markdown_to_html_node(markdown)
+        try:
+            encoded = marshal.dumps(_encode(node))
+        except (TypeError, ValueError, RecursionError):
+            # Not a tree the parser builds, or nested too deep to encode.
+            return node
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+        return node
+
+    def prune(self) -> list[str]:
+        """
+        Evict least recently used entries until the cache fits its limit.
+
+        :return: The paths of the evicted entries.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        removed = []
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            os.unlink(path)
+            size -= entry_size
+            removed.append(path)
+        return removed
+
+    def _path(self, markdown: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.version, sys.implementation.cache_tag, str(marshal.version)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(markdown.encode())
+        key = digest.hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+
+def _encode(node: HTMLNode) -> EncodedNode:
+    props = tuple(item for pair in node.props.items() for item in pair)
+    # Exact types on purpose: _decode rebuilds plain LeafNode and ParentNode
+    # objects, which a subclass would not round-trip to.
+    if type(node) is LeafNode:  # pylint: disable=unidiomatic-typecheck
+        return node.tag or "", node.value or "", props
+    if type(node) is ParentNode:  # pylint: disable=unidiomatic-typecheck
+        children = tuple(_encode(child) for child in node.children)
+        return node.tag or "", children, props
+    raise TypeError(f"cannot cache {type(node).__name__}")
+
+
+def _decode(encoded: EncodedNode) -> HTMLNode:
+    # Fill the slots directly: going through the constructors takes three
+    # times as long, which would eat most of what skipping the parse saves.
+    tag, content, items = encoded
+    node: HTMLNode
+    if isinstance(content, tuple):
+        node = object.__new__(ParentNode)
+        node.value = None
+        node.children = [_decode(child) for child in content]
+    else:
+        node = object.__new__(LeafNode)
+        node.value = content
+        node.children = []
+    node.tag = tag
+    node.props = FrozenProps(zip(items[::2], items[1::2])) if items else EMPTY_PROPS
+    return node
@@ -0,0 +1,287 @@
+import importlib
+import os
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import NamedTuple
+
+from src.asset_sync import copy_file
+from src.build_manifest import BuildManifest, hash_file
+from src.build_trace import span
+
+# Record of the sidecars written for each file, keyed by the file's path.
+PRECOMPRESS_MANIFEST_NAME = ".precompress.json"
+
+# Files worth compressing: text formats a server sends as-is.
+COMPRESSIBLE_SUFFIXES = frozenset(
+    {".css", ".html", ".js", ".json", ".svg", ".txt", ".xml"}
+)
+
+# Files smaller than this fit in a packet or two either way.
+MIN_SIZE = 256
+
+# A sidecar is only kept if it is at most this fraction of the original.
+MAX_RATIO = 0.9
+
+# Every sidecar suffix this module writes, whether or not brotli is installed.
+SIDECAR_SUFFIXES = (".gz", ".br")
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+Compressor = Callable[[bytes], bytes]
+
+
+class PrecompressResult(NamedTuple):
+    """The sidecar paths a precompress run wrote, reused and removed."""
+
+    compressed: list[str]
+    reused: list[str]
+    removed: list[str]
+
+
+def load_brotli() -> ModuleType | None:
+    """
+    Import the optional brotli module.
+
+    :return: The module, or None if it is not installed.
+    """
+    try:
+        return importlib.import_module("brotli")
+    except ImportError:
+        return None
+
+
+def gzip_compress(data: bytes) -> bytes:
+    """
+    Compress data into a gzip stream with a zeroed timestamp.
+
+    The timestamp is left out so the same input always gives the same bytes.
+
+    :param data: The data to compress.
+    :return: The gzip stream.
+    """
+    # wbits 31 asks zlib for a gzip header and trailer instead of its own.
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compressors(brotli: ModuleType | None) -> dict[str, Compressor]:
+    """
+    Return the sidecar suffixes to write and the function producing each.
+
+    :param brotli: The brotli module, or None to write gzip sidecars only.
+    :return: Mapping of sidecar suffix to compressor.
+    """
+    available: dict[str, Compressor] = {".gz": gzip_compress}
+    if brotli is not None:
+        available[".br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    return available
+
+
+def precompress_directory(
+    directory: str,
+    previous: str | None = None,
+    brotli: ModuleType | None = None,
+    jobs: int = 8,
+) -> PrecompressResult:
+    """
+    Write compressed sidecars, e.g. page.html.gz, next to compressible files.
+
+    Files are compressed on a thread pool; zlib and brotli release the GIL
+    while they work. A sidecar is only kept if it is meaningfully smaller
+    than its file. Files whose content hash matches what was recorded keep
+    their sidecars, which are taken from this directory or hardlinked from
+    previous, e.g. the live site when building into an empty staging tree.
+    Sidecars of files that are gone are removed.
+
+    :param directory: The output directory to compress files in.
+    :param previous: Another output directory to reuse sidecars from.
+    :param brotli: The brotli module, or None to write gzip sidecars only.
+    :param jobs: Number of threads compressing files.
+    :return: The sidecar paths written, reused and removed.
+    """
+    with span("precompress", path=directory):
+        return _precompress_directory(directory, previous, brotli, jobs)
+
+
+class _PrecompressPlan(NamedTuple):
+    """What a precompress run does with each file of an output directory."""
+
+    # (path, content hash) of every file to compress.
+    pending: list[tuple[str, str]]
+    reused: list[str]
+    keep: set[str]
+
+
+def _precompress_directory(
+    directory: str, previous: str | None, brotli: ModuleType | None, jobs: int
+) -> PrecompressResult:
+    available = compressors(brotli)
+    manifest = BuildManifest.load(directory, PRECOMPRESS_MANIFEST_NAME)
+    sources = [(directory, manifest)]
+    if previous is not None:
+        sources.append(
+            (previous, BuildManifest.load(previous, PRECOMPRESS_MANIFEST_NAME))
+        )
+    plan = _plan_precompress(directory, manifest, sources, available)
+    try:
+        compressed = _compress_pending(plan.pending, manifest, available, jobs)
+        # Drop the sidecars of files that are gone or no longer compressible.
+        removed = []
+        for key in sorted(set(manifest.pages) - plan.keep):
+            del manifest.pages[key]
+            removed.extend(_remove_sidecars(os.path.join(directory, key), keep=[]))
+    finally:
+        manifest.save()
+    return PrecompressResult(compressed, plan.reused, removed)
+
+
+def _plan_precompress(
+    directory: str,
+    manifest: BuildManifest,
+    sources: list[tuple[str, BuildManifest]],
+    available: dict[str, Compressor],
+) -> _PrecompressPlan:
+    # Reuse the sidecars of every file one of the sources, the directory
+    # itself first, compressed from the same bytes.
+    plan = _PrecompressPlan(pending=[], reused=[], keep=set())
+    for path in _compressible_files(directory):
+        key = os.path.relpath(path, directory).replace(os.sep, "/")
+        plan.keep.add(key)
+        digest = hash_file(path)
+        for source, source_manifest in sources:
+            recorded = source_manifest.pages.get(key)
+            if _has_sidecars(recorded, os.path.join(source, key), digest, available):
+                if source != directory:
+                    _link_sidecars(source, directory, key, recorded)
+                    manifest.pages[key] = dict(recorded or {})
+                plan.reused.extend(_sidecars(recorded, path))
+                break
+        else:
+            plan.pending.append((path, digest))
+    return plan
+
+
+def _compress_pending(
+    pending: list[tuple[str, str]],
+    manifest: BuildManifest,
+    available: dict[str, Compressor],
+    jobs: int,
+) -> list[str]:
+    # Compress each file on a thread pool and record what was worth keeping
+    compressed: list[str] = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            (executor.submit(_compress_file, path, available), path, digest)
+            for path, digest in pending
+        ]
+        for future, path, digest in futures:
+            kept = future.result()
+            manifest.record(
+                path,
+                {"sha256": digest}
+                | {suffix: str(suffix in kept) for suffix in available},
+            )
+            compressed.extend(f"{path}{suffix}" for suffix in kept)
+    return compressed
+
+
+def _compressible_files(directory: str) -> list[str]:
+    return [
+        os.path.join(root, file)
+        for root, _, files in os.walk(directory)
+        for file in sorted(files)
+        if _is_compressible(os.path.join(root, file))
+    ]
+
+
+def _link_sidecars(
+    source: str, directory: str, key: str, recorded: dict[str, str] | None
+) -> None:
+    # Hardlink a file's sidecars from another output directory.
+    path = os.path.join(directory, key)
+    sidecars = _sidecars(recorded, path)
+    for sidecar in sidecars:
+        copy_file(
+            os.path.join(source, os.path.relpath(sidecar, directory)),
+            sidecar,
+            link=True,
+        )
+    _remove_sidecars(path, keep=sidecars)
+
+
+def _is_compressible(path: str) -> bool:
+    name = os.path.basename(path)
+    return (
+        not name.startswith(".")
+        and os.path.splitext(name)[1] in COMPRESSIBLE_SUFFIXES
+        and os.path.isfile(path)
+        and os.path.getsize(path) >= MIN_SIZE
+    )
+
+
+def _has_sidecars(
+    recorded: dict[str, str] | None,
+    path: str,
+    digest: str,
+    available: dict[str, Compressor],
+) -> bool:
+    # The file was compressed from the same bytes with the same compressors,
+    # and the sidecars it was worth writing are still there.
+    return (
+        recorded is not None
+        and recorded.get("sha256") == digest
+        and set(recorded) == {"sha256", *available}
+        and all(os.path.isfile(sidecar) for sidecar in _sidecars(recorded, path))
+    )
+
+
+def _sidecars(recorded: dict[str, str] | None, path: str) -> list[str]:
+    return [
+        f"{path}{suffix}"
+        for suffix in SIDECAR_SUFFIXES
+        if (recorded or {}).get(suffix) == "True"
+    ]
+
+
+def _compress_file(path: str, available: dict[str, Compressor]) -> list[str]:
+    with open(path, "rb") as f:
+        data = f.read()
+    kept = []
+    for suffix, compress in available.items():
+        compressed = compress(data)
+        if len(compressed) <= len(data) * MAX_RATIO:
+            # Replace rather than overwrite: the old sidecar may be a
+            # hardlink shared with the live site.
+            sidecar = f"{path}{suffix}"
+            tmp_path = f"{sidecar}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, sidecar)
+            kept.append(suffix)
+    _remove_sidecars(path, keep=[f"{path}{suffix}" for suffix in kept])
+    return kept
+
+
+def _remove_sidecars(path: str, keep: list[str]) -> list[str]:
+    removed = []
+    for suffix in SIDECAR_SUFFIXES:
+        sidecar = f"{path}{suffix}"
+        if sidecar not in keep and os.path.isfile(sidecar):
+            os.unlink(sidecar)
+            removed.append(sidecar)
+    return removed
+
+
+def discard_sidecars(path: str) -> None:
+    """
+    Remove the sidecars of a file that was just rewritten.
+
+    Meant as a write listener while watching, so a server never sends a
+    sidecar that no longer matches its file.
+
+    :param path: The rewritten file.
+    """
+    _remove_sidecars(path, keep=[])
@@ -0,0 +1,123 @@
+import json
+import os
+from typing import NamedTuple
+
+from src.asset_sync import ASSET_MANIFEST_NAME
+from src.build_manifest import MANIFEST_NAME, BuildManifest, hash_file
+from src.image_optimize import IMAGE_MANIFEST_NAME
+from src.precompress import PRECOMPRESS_MANIFEST_NAME
+
+# Record of the content hash of every file in an output directory.
+PUBLISH_MANIFEST_NAME = ".publish.json"
+
+# The files a build added, changed and removed, relative to the live site.
+DELTA_NAME = ".delta.json"
+
+# Build bookkeeping kept at the top of an output directory, never published.
+_UNPUBLISHED = {
+    MANIFEST_NAME,
+    ASSET_MANIFEST_NAME,
+    IMAGE_MANIFEST_NAME,
+    PRECOMPRESS_MANIFEST_NAME,
+    PUBLISH_MANIFEST_NAME,
+    DELTA_NAME,
+}
+
+
+class PublishDelta(NamedTuple):
+    """The published paths a build added, changed and removed."""
+
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+
+
+def scan_outputs(
+    dest_dir: str, linked_from: BuildManifest | None = None, save: bool = True
+) -> BuildManifest:
+    """
+    Record the content hash of every file in an output directory.
+
+    The record is kept in the directory itself. A file whose size, inode,
+    mtime and ctime match its recorded entry keeps its recorded hash, so
+    only files written since the last scan are read. Since builds leave
+    unchanged outputs alone, rescanning a rebuilt site hashes what the build
+    changed rather than the whole site.
+
+    A file hardlinked from the directory linked_from records, such as a page
+    a staged build linked from the live site, keeps the hash recorded there:
+    linking changes its ctime, but not its inode, size or mtime.
+
+    :param dest_dir: The output directory.
+    :param linked_from: The record of a directory dest_dir may share files with.
+    :param save: Write the record into dest_dir; without it, dest_dir is only
+        read.
+    :return: The record, keyed by path relative to dest_dir.
+    """
+    previous = BuildManifest.load(dest_dir, PUBLISH_MANIFEST_NAME)
+    # Hashes of the other directory's files, by the stat they were recorded with.
+    linked = {
+        (entry.get("inode"), entry.get("size"), entry.get("mtime_ns")): entry
+        for entry in (linked_from.pages.values() if linked_from else ())
+    }
+    current = BuildManifest(previous.path)
+    for path in _published_files(dest_dir):
+        stat = os.stat(path)
+        entry = {
+            "size": str(stat.st_size),
+            "inode": str(stat.st_ino),
+            "mtime_ns": str(stat.st_mtime_ns),
+            "ctime_ns": str(stat.st_ctime_ns),
+        }
+        recorded = previous.get(path)
+        if recorded is None or not recorded.items() >= entry.items():
+            recorded = linked.get((entry["inode"], entry["size"], entry["mtime_ns"]))
+        entry["sha256"] = (recorded or {}).get("sha256") or hash_file(path)
+        current.record(path, entry)
+    if save:
+        current.save()
+    return current
+
+
+def _published_files(dest_dir: str) -> list[str]:
+    # Every regular file below dest_dir but the build bookkeeping
+    return [
+        os.path.join(root, file)
+        for root, _, files in os.walk(dest_dir)
+        for file in files
+        if not (root == dest_dir and file in _UNPUBLISHED)
+        and os.path.isfile(os.path.join(root, file))
+    ]
+
+
+def compute_delta(live: BuildManifest, build: BuildManifest) -> PublishDelta:
+    """
+    Compare a new build with the live site by content hash.
+
+    :param live: The record of the site currently published.
+    :param build: The record of the new build.
+    :return: The paths to upload and purge to publish the build.
+    """
+    changed = [
+        path
+        for path in sorted(build.pages.keys() & live.pages.keys())
+        if build.pages[path].get("sha256") != live.pages[path].get("sha256")
+    ]
+    return PublishDelta(
+        added=sorted(build.pages.keys() - live.pages.keys()),
+        changed=changed,
+        removed=sorted(live.pages.keys() - build.pages.keys()),
+    )
+
+
+def write_delta(path: str, delta: PublishDelta) -> None:
+    """
+    Write a delta as JSON, for deploy scripts to upload and purge from.
+
+    :param path: The file to write.
+    :param delta: The delta to write.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(delta._asdict(), f, indent=2)
+    os.replace(tmp_path, path)
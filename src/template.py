@@ -0,0 +1,234 @@
+import hashlib
+import os
+import re
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from typing import NamedTuple
+
+from src.urls import URL_ATTRIBUTES, UrlResolver
+
+TEMPLATE_NAME = "template.html"
+
+_TAG_PATTERN = re.compile(r"\{\{\s*(>)?\s*([\w./-]+)\s*\}\}")
+_URL_ATTRIBUTE_PATTERN = re.compile(
+    r"\b(?:" + "|".join(sorted(URL_ATTRIBUTES)) + r')="([^"]*)"'
+)
+
+SlotValue = str | Callable[[], Iterable[str]]
+
+
+class Slot(NamedTuple):
+    """
+    A named placeholder in a compiled template, such as {{ Content }}.
+
+    :param name: The name of the placeholder.
+    :param text: The placeholder as written in the template.
+    """
+
+    name: str
+    text: str
+
+
+class Url(NamedTuple):
+    """
+    The value of an href or src attribute in a compiled template.
+
+    :param url: The URL as written in the template.
+    """
+
+    url: str
+
+
+Segment = str | Slot | Url
+
+
+class Template:
+    """
+    A template parsed once into static text and named slots.
+
+    :param segments: Static strings, Slots and Urls, in output order.
+    :param dependencies: (path, signature) of the template and every partial
+        it includes, used to tell when the compiled form is stale.
+    :param digest: A hash of the source of the template and its partials.
+    """
+
+    def __init__(
+        self,
+        segments: list[Segment],
+        dependencies: list[tuple[str, tuple[int, int]]],
+        digest: str,
+    ):
+        self.segments = segments
+        self.dependencies = dependencies
+        self.digest = digest
+
+    def iter_render(
+        self,
+        values: Mapping[str, SlotValue],
+        resolve_url: UrlResolver | None = None,
+    ) -> Iterator[str]:
+        """
+        Yield the rendered template as string chunks.
+
+        A slot value is either a string or a callable returning an iterable of
+        chunks, which lets large content be streamed. Slots without a value
+        are rendered as written in the template.
+
+        :param values: The values for the template's slots.
+        :param resolve_url: Optional function applied to href and src values.
+        :return: An iterator over the chunks of the rendered page.
+        """
+        for segment in self.segments:
+            if isinstance(segment, str):
+                yield segment
+                continue
+            if isinstance(segment, Url):
+                yield resolve_url(segment.url) if resolve_url else segment.url
+                continue
+            value = values.get(segment.name)
+            if value is None:
+                yield segment.text
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value()
+
+    def render(
+        self,
+        values: Mapping[str, SlotValue],
+        resolve_url: UrlResolver | None = None,
+    ) -> str:
+        """
+        Render the template to a string.
+
+        :param values: The values for the template's slots.
+        :param resolve_url: Optional function applied to href and src values.
+        :return: The rendered page.
+        """
+        return "".join(self.iter_render(values, resolve_url))
+
+
+def compile_template(template_path: str) -> Template:
+    """
+    Parse a template file and the partials it includes.
+
+    Placeholders are written {{ Name }}. A partial is included with
+    {{> path/to/partial.html }}, relative to the including file, and is
+    inlined at compile time. href and src attribute values are kept as Url
+    segments so they can be resolved at render time.
+
+    :param template_path: Path to the template file.
+    :return: The compiled Template.
+    :raises ValueError: If partials include each other in a cycle.
+    """
+    segments: list[Segment] = []
+    dependencies: list[tuple[str, tuple[int, int]]] = []
+    sources: list[str] = []
+    _compile_into(template_path, segments, dependencies, sources, [])
+    digest = hashlib.sha256("\0".join(sources).encode("utf-8")).hexdigest()
+    return Template(segments, dependencies, digest)
+
+
+def _compile_into(
+    path: str,
+    segments: list[Segment],
+    dependencies: list[tuple[str, tuple[int, int]]],
+    sources: list[str],
+    stack: list[str],
+) -> None:
+    path = os.path.abspath(path)
+    if path in stack:
+        raise ValueError(f"Template partials include each other: {path}")
+    signature = _signature(path)
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    dependencies.append((path, signature))
+    sources.append(source)
+
+    position = 0
+    for match in _TAG_PATTERN.finditer(source):
+        _append_text(segments, source[position : match.start()])
+        position = match.end()
+        is_partial, name = match.groups()
+        if is_partial:
+            partial_path = os.path.join(os.path.dirname(path), name)
+            _compile_into(partial_path, segments, dependencies, sources, [*stack, path])
+        else:
+            segments.append(Slot(name, match.group()))
+    _append_text(segments, source[position:])
+
+
+def _append_text(segments: list[Segment], text: str) -> None:
+    position = 0
+    for match in _URL_ATTRIBUTE_PATTERN.finditer(text):
+        _append_static(segments, text[position : match.start(1)])
+        segments.append(Url(match.group(1)))
+        position = match.end(1)
+    _append_static(segments, text[position:])
+
+
+def _append_static(segments: list[Segment], text: str) -> None:
+    if not text:
+        return
+    if segments and isinstance(segments[-1], str):
+        segments[-1] += text
+    else:
+        segments.append(text)
+
+
+def _signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+_cache: dict[str, Template] = {}
+
+
+def load_template(template_path: str) -> Template:
+    """
+    Return the compiled template for a path, compiling it only when needed.
+
+    Compiled templates are cached per process and recompiled when the
+    template or any partial it includes changes on disk.
+
+    :param template_path: Path to the template file.
+    :return: The compiled Template.
+    """
+    key = os.path.abspath(template_path)
+    template = _cache.get(key)
+    if template is None or not _is_current(template):
+        template = compile_template(key)
+        _cache[key] = template
+    return template
+
+
+def _is_current(template: Template) -> bool:
+    try:
+        return all(
+            _signature(path) == signature for path, signature in template.dependencies
+        )
+    except OSError:
+        return False
+
+
+def find_template(from_path: str, content_root: str, default_path: str) -> str:
+    """
+    Find the template for a page, honouring per-directory overrides.
+
+    A template.html in the page's directory, or the nearest parent directory
+    inside the content root, takes precedence over the default template.
+
+    :param from_path: Path to the markdown file.
+    :param content_root: The root content directory.
+    :param default_path: The template to use when there is no override.
+    :return: The path of the template to render the page with.
+    """
+    root = os.path.abspath(content_root)
+    directory = os.path.dirname(os.path.abspath(from_path))
+    while directory == root or directory.startswith(root + os.sep):
+        candidate = os.path.join(directory, TEMPLATE_NAME)
+        if os.path.isfile(candidate):
+            return candidate
+        if directory == root:
+            break
+        directory = os.path.dirname(directory)
+    return default_path
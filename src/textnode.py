@@ -1,6 +1,6 @@
 from enum import Enum
 
-from src.htmlnode import HTMLNode, LeafNode
+from src.htmlnode import FrozenProps, HTMLNode, LeafNode
 
 
 class TextType(Enum):
@@ -21,6 +21,8 @@ class TextNode:
     Class representing a text node with a type and content.
     """
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(
         self,
         text: str,
@@ -65,12 +67,24 @@ def text_node_to_html_node(node: TextNode) -> HTMLNode:
         case TextType.LINK:
             if not node.url:
                 raise ValueError("Link text nodes must have a URL.")
-            return LeafNode(tag="a", value=node.text, props={"href": node.url})
+            return LeafNode(
+                tag="a", value=node.text, props=FrozenProps({"href": node.url})
+            )
         case TextType.IMAGE:
             if not node.url:
                 raise ValueError("Image text nodes must have a URL.")
             return LeafNode(
-                tag="img", value=node.text, props={"src": node.url, "alt": node.text}
+                tag="img",
+                value=node.text,
+                props=FrozenProps(
+                    {
+                        "src": node.url,
+                        "alt": node.text,
+                        # Let pages render before images below the fold load.
+                        "loading": "lazy",
+                        "decoding": "async",
+                    }
+                ),
             )
         case _:
             raise ValueError(f"Unknown text type: {node.text_type}")
@@ -0,0 +1,76 @@
+from collections.abc import Callable, Mapping
+
+UrlResolver = Callable[[str], str]
+
+# Attributes whose values are URLs and are passed through the resolver.
+URL_ATTRIBUTES = frozenset({"href", "src"})
+
+# Attributes whose values are comma-separated "URL descriptor" candidates,
+# each URL of which is passed through the resolver.
+SRCSET_ATTRIBUTES = frozenset({"srcset"})
+
+
+def basepath_resolver(
+    basepath: str = "/", asset_urls: Mapping[str, str] | None = None
+) -> UrlResolver:
+    """
+    Create a resolver that serves root-relative URLs from a base path.
+
+    "/images/a.png" becomes "/static_site/images/a.png" for a base path of
+    "/static_site/". Absolute, protocol-relative and relative URLs are left
+    alone.
+
+    With asset_urls, root-relative URLs of fingerprinted assets are first
+    replaced by their fingerprinted URLs, keeping any query or fragment, so
+    "/index.css" becomes e.g. "/static_site/index.0123456789.css".
+
+    :param basepath: The base path the site is served from.
+    :param asset_urls: Mapping of asset URL to fingerprinted asset URL.
+    :return: A function mapping a URL to the URL to emit.
+    """
+    if asset_urls:
+        prefix = basepath_resolver(basepath)
+        urls = asset_urls
+
+        def resolve_asset(url: str) -> str:
+            path = url.split("#", 1)[0].split("?", 1)[0]
+            fingerprinted = urls.get(path)
+            if fingerprinted is not None:
+                url = fingerprinted + url[len(path) :]
+            return prefix(url)
+
+        return resolve_asset
+
+    if basepath == "/":
+        return _identity
+
+    def resolve(url: str) -> str:
+        if url.startswith("/") and not url.startswith("//"):
+            return basepath + url[1:]
+        return url
+
+    return resolve
+
+
+def _identity(url: str) -> str:
+    return url
+
+
+def resolve_srcset(srcset: str, resolve_url: UrlResolver) -> str:
+    """
+    Resolve the URL of every candidate in a srcset attribute.
+
+    "/a-480w.png 480w, /a.png 960w" becomes
+    "/static_site/a-480w.png 480w, /static_site/a.png 960w" for a base path of
+    "/static_site/". Candidates are assumed not to contain commas in their
+    URLs, which holds for the srcsets the build writes.
+
+    :param srcset: The attribute value.
+    :param resolve_url: The function mapping a URL to the URL to emit.
+    :return: The attribute value with every URL resolved.
+    """
+    candidates = []
+    for candidate in srcset.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{resolve_url(url)} {descriptor}".rstrip())
+    return ", ".join(candidates)
@@ -0,0 +1,398 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import replace
+
+from src.asset_sync import ASSET_MANIFEST_NAME, sync_directory
+from src.build_manifest import BuildManifest
+from src.generate_content import (
+    RenderOptions,
+    generate_page,
+    generate_pages_recursive,
+)
+from src.image_optimize import image_srcsets
+from src.image_size import image_sizes
+from src.template import find_template, load_template
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """
+    Detect file changes by periodically comparing mtimes and sizes.
+
+    :param paths: Directories to watch recursively, or single files.
+    :param interval: Seconds between scans.
+    """
+
+    def __init__(self, paths: Iterable[str], interval: float = 0.05):
+        self.paths = list(paths)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        """
+        Block until something changes or the timeout expires.
+
+        :param timeout: Maximum number of seconds to wait, or None to wait
+            indefinitely.
+        :return: The paths that were created, modified or deleted.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        """
+        Release the watcher's resources.
+        """
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in self.paths:
+            files = [path] if os.path.isfile(path) else _walk_files(path)
+            for file_path in files:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+
+class InotifyWatcher:
+    """
+    Detect file changes with Linux inotify, without polling.
+
+    Directories are watched recursively, including ones created later. A
+    single file is watched through its parent directory, so editors that
+    save by replacing the file are still noticed.
+
+    :param paths: Directories to watch recursively, or single files.
+    :raises OSError: If inotify is not available.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = list(paths)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: dict[int, str] = {}
+        self._trees: set[str] = set()
+        self._files: dict[str, set[str]] = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                self._add_tree(path)
+            else:
+                directory = os.path.dirname(path) or "."
+                self._files.setdefault(directory, set()).add(os.path.basename(path))
+                self._add_directory(directory)
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        """
+        Block until something changes or the timeout expires.
+
+        :param timeout: Maximum number of seconds to wait, or None to wait
+            indefinitely.
+        :return: The paths that were created, modified or deleted. After a
+            queue overflow every watched path is reported.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        return self._parse(data)
+
+    def close(self) -> None:
+        """
+        Release the watcher's resources.
+        """
+        os.close(self._fd)
+
+    def _parse(self, data: bytes) -> set[str]:
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                return set(self.paths)
+            directory = self._directories.get(wd)
+            if directory is None or mask & _IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            if directory not in self._trees and name not in self._files[directory]:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._add_tree(path)
+            changed.add(path)
+        return changed
+
+    def _add_tree(self, root: str) -> None:
+        for directory, _, _ in os.walk(root):
+            self._trees.add(directory)
+            self._add_directory(directory)
+
+    def _add_directory(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        self._directories[wd] = directory
+
+
+Watcher = InotifyWatcher | PollingWatcher
+
+
+def create_watcher(paths: Iterable[str]) -> Watcher:
+    """
+    Create an inotify watcher, falling back to polling where it is unavailable.
+
+    :param paths: Directories to watch recursively, or single files.
+    :return: A watcher with wait() and close() methods.
+    """
+    paths = list(paths)
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError):
+        return PollingWatcher(paths)
+
+
+def _load_libc() -> ctypes.CDLL:
+    return ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+
+
+def _walk_files(root: str) -> list[str]:
+    return [
+        os.path.join(directory, file)
+        for directory, _, files in os.walk(root)
+        for file in files
+    ]
+
+
+# The settings are keyword-only, so calls name each of them.
+def rebuild_changes(  # pylint: disable=too-many-arguments
+    changes: Iterable[str],
+    content_dir: str,
+    static_dir: str,
+    template_path: str,
+    dest_dir: str,
+    *,
+    options: RenderOptions | None = None,
+    jobs: int = 1,
+) -> None:
+    """
+    Bring the output directory up to date with a set of changed paths.
+
+    A changed markdown file regenerates only its page, and a static change
+    syncs the static directory, which copies only the files that changed. A
+    change to a template or one of its
+    partials rebuilds every page, in parallel when jobs allows it.
+
+    :param changes: Paths reported by a watcher.
+    :param content_dir: Path to the directory containing markdown files.
+    :param static_dir: Path to the directory containing static assets.
+    :param template_path: Path to the default HTML template file.
+    :param dest_dir: Path to the output directory.
+    :param options: The settings pages are rendered with. With a parse cache,
+        a template change does not re-parse every page.
+    :param jobs: Number of worker processes for full rebuilds, and of threads
+        copying static files.
+    """
+    changes = {os.path.abspath(path) for path in changes}
+    template_files = _template_files(template_path)
+    if any(
+        path in template_files or _is_content_template(path, content_dir)
+        for path in changes
+    ):
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            options,
+            jobs=jobs,
+        )
+        changes = {path for path in changes if not _is_under(path, content_dir)}
+
+    for path in sorted(changes):
+        if _is_under(path, content_dir):
+            _sync_page(path, content_dir, template_path, dest_dir, options)
+    if any(_is_under(path, static_dir) for path in changes):
+        _sync_static(static_dir, dest_dir, jobs)
+
+
+# The settings beyond options are keyword-only, so calls name each of them.
+def watch_site(  # pylint: disable=too-many-arguments
+    content_dir: str,
+    static_dir: str,
+    template_path: str,
+    dest_dir: str,
+    options: RenderOptions | None = None,
+    *,
+    jobs: int = 1,
+    debounce: float = 0.05,
+    watcher: Watcher | None = None,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> None:
+    """
+    Watch the site sources and rebuild what changed until stopped.
+
+    Events are debounced: once something changes, further changes are
+    collected until the sources have been quiet for the debounce interval.
+
+    :param content_dir: Path to the directory containing markdown files.
+    :param static_dir: Path to the directory containing static assets.
+    :param template_path: Path to the default HTML template file.
+    :param dest_dir: Path to the output directory.
+    :param options: The settings pages are rendered with. Images are given the
+        sizes and srcsets the last full build recorded in dest_dir.
+    :param jobs: Number of worker processes for full rebuilds.
+    :param debounce: Seconds of quiet to wait for before rebuilding.
+    :param watcher: The watcher to use; one is created by default.
+    :param should_stop: Called between waits; watching ends when it is true.
+    """
+    if watcher is None:
+        watcher = create_watcher(_watched_paths(content_dir, static_dir, template_path))
+    try:
+        while not should_stop():
+            changes = watcher.wait(timeout=0.5)
+            if not changes:
+                continue
+            while batch := watcher.wait(timeout=debounce):
+                changes |= batch
+            started = time.perf_counter()
+            try:
+                rebuild_changes(
+                    changes,
+                    content_dir,
+                    static_dir,
+                    template_path,
+                    dest_dir,
+                    options=_with_image_attributes(options, dest_dir),
+                    jobs=jobs,
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Keep watching: the next save usually fixes the problem.
+                print(f"Rebuild failed: {e!r}")
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"Rebuilt {len(changes)} change(s) in {elapsed:.0f} ms")
+    finally:
+        watcher.close()
+
+
+def _with_image_attributes(
+    options: RenderOptions | None, dest_dir: str
+) -> RenderOptions:
+    # Rebuilt pages give their images the attributes the pages of the last
+    # full build have, as recorded beside its output.
+    assets = BuildManifest.load(dest_dir, ASSET_MANIFEST_NAME)
+    return replace(
+        options or RenderOptions(),
+        image_sizes=image_sizes(assets),
+        image_srcsets=image_srcsets(dest_dir),
+    )
+
+
+def _watched_paths(content_dir: str, static_dir: str, template_path: str) -> list[str]:
+    return [content_dir, static_dir, *sorted(_template_files(template_path))]
+
+
+def _template_files(template_path: str) -> set[str]:
+    return {path for path, _ in load_template(template_path).dependencies}
+
+
+def _is_under(path: str, directory: str) -> bool:
+    directory = os.path.abspath(directory)
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def _is_content_template(path: str, content_dir: str) -> bool:
+    return _is_under(path, content_dir) and path.endswith(".html")
+
+
+def _sync_page(
+    path: str,
+    content_dir: str,
+    template_path: str,
+    dest_dir: str,
+    options: RenderOptions | None,
+) -> None:
+    relative_path = os.path.relpath(path, os.path.abspath(content_dir))
+    if os.path.isdir(path):
+        for from_path in _walk_files(path):
+            _sync_page(from_path, content_dir, template_path, dest_dir, options)
+        return
+    if not path.endswith(".md"):
+        if not os.path.exists(path):
+            _remove_pages(os.path.join(dest_dir, relative_path), path)
+        return
+    dest_path = os.path.join(dest_dir, relative_path.replace(".md", ".html"))
+    if os.path.exists(path):
+        page_template = find_template(path, content_dir, template_path)
+        generate_page(path, page_template, dest_path, options=options)
+    elif os.path.exists(dest_path):
+        os.unlink(dest_path)
+        print(f"Removed {dest_path}")
+
+
+def _remove_pages(dest_path: str, source_path: str) -> None:
+    """
+    Remove the pages generated from a content directory that was deleted.
+    """
+    if not os.path.isdir(dest_path):
+        return
+    for output in _walk_files(dest_path):
+        relative_path = os.path.relpath(output, dest_path)
+        source = os.path.join(source_path, relative_path)
+        if output.endswith(".html") and not os.path.exists(source[:-5] + ".md"):
+            os.unlink(output)
+            print(f"Removed {output}")
+
+
+def _sync_static(static_dir: str, dest_dir: str, jobs: int) -> None:
+    # Sync the whole directory, as full builds do: only what changed is
+    # copied, copies replace files hardlinked by --link-static rather than
+    # writing through them, and the asset manifest stays current. Assets keep
+    # the names the last full build gave them.
+    assets = BuildManifest.load(dest_dir, ASSET_MANIFEST_NAME)
+    fingerprint = any("source" in entry for entry in assets.pages.values())
+    result = sync_directory(static_dir, dest_dir, jobs=jobs, fingerprint=fingerprint)
+    for path in result.copied:
+        print(f"Copied: {path}")
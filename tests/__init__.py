@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Base class providing a temporary directory, removed after each test."""
+
+    def setUp(self):
+        # enterContext exits the directory as a cleanup, which pylint misses.
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.root = self.enterContext(directory)
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def write(self, name, content, mtime_ns=None):
+        """
+        Write a text file, creating its directory.
+
+        :param name: The path of the file, relative to the temporary directory.
+        :param content: The text to write.
+        :param mtime_ns: Give the file this mtime, in nanoseconds.
+        :return: The path of the file.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def read(self, *parts):
+        with open(self.path(*parts), encoding="utf-8") as f:
+            return f.read()
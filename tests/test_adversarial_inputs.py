@@ -0,0 +1,155 @@
+"""
+Fuzz and performance tests for markdown written to hit worst cases.
+
+Each parser is run on inputs that grow by FACTOR and must slow down roughly
+linearly. A quadratic pass slows down by FACTOR squared, far beyond the slack
+allowed here, so one hostile post cannot stall a build.
+"""
+
+import random
+import re
+import time
+import unittest
+
+from src.block_markdown import block_to_block_type
+from src.inline_markdown import (
+    extract_markdown_images,
+    extract_markdown_links,
+    markdown_to_blocks,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from src.inline_scanner import iter_link_spans
+from src.markdown_html import markdown_to_html_node
+from src.textnode import TextNode, TextType
+
+SIZE = 2_000
+FACTOR = 16
+# Allowed slowdown beyond linear, for timer noise and cache effects.
+SLACK = 4
+
+# Inline markdown repeating a fragment that never completes a link, image or
+# delimiter pair, or completes one only at the very end.
+INLINE_CORPUS = {
+    "open brackets": lambda n: "[" * n,
+    "open images": lambda n: "![" * n,
+    "labels without urls": lambda n: "[a]" * n,
+    "urls without close": lambda n: "[a](" * n,
+    "nested images": lambda n: "![" * n + "x" + "](" * n + ")",
+    "close brackets": lambda n: "](" * n,
+    "unclosed bold": lambda n: "**a " * n,
+    "asterisk run": lambda n: "*" * n,
+    "underscore run": lambda n: "_" * n,
+    "mixed delimiters": lambda n: "_`*" * n,
+    "link per line": lambda n: "[a\n](b)" * n,
+}
+
+# Whole documents of many tiny or one enormous block.
+DOCUMENT_CORPUS = {
+    "blank lines": lambda n: "\n" * n * 4,
+    "tiny blocks": lambda n: "a\n\n" * n,
+    "one long block": lambda n: "line\n" * n,
+    "unordered list": lambda n: "- [a](" * n,
+    "ordered list digits": lambda n: "1" * n * 4 + ". item",
+    "heading hashes": lambda n: "#" * n * 4,
+    "quote": lambda n: "> ![" * n,
+}
+
+
+def best_time(function, argument, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class TestLinearTime(unittest.TestCase):
+    """Parse time must grow linearly with input size on adversarial input."""
+
+    def assert_linear(self, function, make_input):
+        small = best_time(function, make_input(SIZE))
+        large = best_time(function, make_input(SIZE * FACTOR))
+        self.assertLess(large, max(small, 1e-4) * FACTOR * SLACK)
+
+    def test_inline_parsers(self):
+        parsers = {
+            "text_to_textnodes": text_to_textnodes,
+            "extract_markdown_images": extract_markdown_images,
+            "extract_markdown_links": extract_markdown_links,
+            "split_nodes_image": lambda text: split_nodes_image(
+                [TextNode(text, TextType.TEXT)]
+            ),
+            "split_nodes_link": lambda text: split_nodes_link(
+                [TextNode(text, TextType.TEXT)]
+            ),
+            "split_nodes_delimiter": lambda text: split_nodes_delimiter(
+                [TextNode(text, TextType.TEXT)], "**", TextType.BOLD
+            ),
+        }
+        for parser_name, parser in parsers.items():
+            for input_name, make_input in INLINE_CORPUS.items():
+                with self.subTest(parser=parser_name, input=input_name):
+                    self.assert_linear(parser, make_input)
+
+    def test_block_parsers(self):
+        parsers = {
+            "markdown_to_blocks": markdown_to_blocks,
+            "block_to_block_type": block_to_block_type,
+            "markdown_to_html_node": markdown_to_html_node,
+        }
+        for parser_name, parser in parsers.items():
+            for input_name, make_input in DOCUMENT_CORPUS.items():
+                with self.subTest(parser=parser_name, input=input_name):
+                    self.assert_linear(parser, make_input)
+
+
+class TestLinkSpansFuzz(unittest.TestCase):
+    """iter_link_spans must find exactly what the regexes it replaced found."""
+
+    ALPHABET = "[[]]()!!a \n"
+
+    def random_texts(self, count=5_000, max_length=16):
+        rng = random.Random(0)
+        for _ in range(count):
+            length = rng.randint(0, max_length)
+            yield "".join(rng.choice(self.ALPHABET) for _ in range(length))
+
+    def test_matches_regex(self):
+        for opener in ("[", "!["):
+            pattern = re.compile(re.escape(opener) + r"(.*?)\]\((.*?)\)")
+            for text in self.random_texts():
+                expected = [
+                    (match.start(), match.end(), *match.groups())
+                    for match in pattern.finditer(text)
+                ]
+                with self.subTest(opener=opener, text=text):
+                    self.assertEqual(list(iter_link_spans(text, opener)), expected)
+
+    def test_split_nodes_match_regex_split(self):
+        for text in self.random_texts(count=2_000):
+            node = TextNode(text, TextType.TEXT)
+            for split, pattern, text_type in (
+                (split_nodes_image, r"!\[.*?\]\(.*?\)", TextType.IMAGE),
+                (split_nodes_link, r"\[.*?\]\(.*?\)", TextType.LINK),
+            ):
+                captures = re.findall(pattern.replace(".*?", "(.*?)"), text)
+                if not captures:
+                    expected = [node]
+                else:
+                    expected = []
+                    for i, part in enumerate(re.split(pattern, text)):
+                        if part.strip():
+                            expected.append(TextNode(part, TextType.TEXT))
+                        if i < len(captures):
+                            label, url = captures[i]
+                            expected.append(TextNode(label, text_type, url))
+                with self.subTest(split=split.__name__, text=text):
+                    self.assertEqual(split([node]), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import os
+import unittest
+from unittest import mock
+
+from src import asset_sync
+from src.asset_sync import (
+    ASSET_MANIFEST_NAME,
+    copy_file,
+    sync_directory,
+)
+from src.build_manifest import BuildManifest, hash_file
+from src.fingerprint import asset_urls, fingerprinted_path
+from src.image_size import image_sizes
+from tests import TempDirTestCase
+
+
+class AssetSyncTestCase(TempDirTestCase):
+    """Base class providing source and output directories."""
+
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.root, "static")
+        self.dst = os.path.join(self.root, "docs")
+        self.write("static/index.css", "body {}")
+        self.write("static/images/a.png", "png")
+
+    def out(self, *parts):
+        return os.path.join(self.dst, *parts)
+
+
+class TestSyncDirectory(AssetSyncTestCase):
+    """Unit tests for sync_directory."""
+
+    def test_first_sync_copies_everything_with_metadata(self):
+        result = sync_directory(self.src, self.dst)
+        self.assertEqual(
+            sorted(result.copied), [self.out("images", "a.png"), self.out("index.css")]
+        )
+        self.assertEqual(result.unchanged, [])
+        self.assertEqual(self.read("docs/images/a.png"), "png")
+        self.assertEqual(
+            os.stat(self.out("index.css")).st_mtime_ns,
+            os.stat(os.path.join(self.src, "index.css")).st_mtime_ns,
+        )
+        self.assertTrue(os.path.isfile(self.out(ASSET_MANIFEST_NAME)))
+
+    def test_second_sync_copies_only_changes(self):
+        sync_directory(self.src, self.dst)
+        self.write("static/index.css", "body { color: red }")
+        with mock.patch.object(asset_sync, "copy_file", wraps=copy_file) as copy_mock:
+            result = sync_directory(self.src, self.dst)
+        copy_mock.assert_called_once()
+        self.assertEqual(result.copied, [self.out("index.css")])
+        self.assertEqual(result.unchanged, [self.out("images", "a.png")])
+        self.assertEqual(self.read("docs/index.css"), "body { color: red }")
+
+    def test_missing_output_is_copied_again(self):
+        sync_directory(self.src, self.dst)
+        os.remove(self.out("index.css"))
+        self.assertEqual(
+            sync_directory(self.src, self.dst).copied, [self.out("index.css")]
+        )
+
+    def test_mtime_change_copies_unless_checksum_matches(self):
+        sync_directory(self.src, self.dst, checksum=True)
+        self.write("static/index.css", "body {}", mtime_ns=10**18)
+        result = sync_directory(self.src, self.dst, checksum=True)
+        self.assertEqual(result.copied, [])
+        result = sync_directory(self.src, self.dst, checksum=True)
+        self.assertEqual(result.copied, [])
+
+        self.write("static/index.css", "body {!}", mtime_ns=10**18 + 1)
+        self.write("static/images/a.png", "png", mtime_ns=10**18 + 1)
+        result = sync_directory(self.src, self.dst)
+        self.assertEqual(
+            sorted(result.copied), [self.out("images", "a.png"), self.out("index.css")]
+        )
+
+    def test_stale_assets_are_removed_and_pages_kept(self):
+        sync_directory(self.src, self.dst)
+        page = self.write("docs/images/index.html", "<p>page</p>")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        result = sync_directory(self.src, self.dst)
+        self.assertEqual(result.removed, [self.out("images", "a.png")])
+        self.assertFalse(os.path.exists(self.out("images", "a.png")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_hardlinks(self):
+        sync_directory(self.src, self.dst, link=True)
+        self.assertTrue(
+            os.path.samefile(self.out("index.css"), os.path.join(self.src, "index.css"))
+        )
+
+    def test_failed_copy_keeps_earlier_results(self):
+        with mock.patch.object(
+            asset_sync, "copy_file", side_effect=[None, OSError("disk full")]
+        ):
+            with self.assertRaises(OSError):
+                sync_directory(self.src, self.dst, jobs=1)
+        manifest = BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)
+        self.assertEqual(list(manifest.pages), ["index.css"])
+
+
+class TestFingerprint(AssetSyncTestCase):
+    """Unit tests for sync_directory with fingerprint."""
+
+    def setUp(self):
+        super().setUp()
+        self.write("static/robots.txt", "robots")
+        self.css = fingerprinted_path(
+            self.out("index.css"), hash_file(os.path.join(self.src, "index.css"))
+        )
+        self.png = fingerprinted_path(
+            self.out("images", "a.png"),
+            hash_file(os.path.join(self.src, "images", "a.png")),
+        )
+
+    def test_assets_are_copied_to_hashed_names(self):
+        result = sync_directory(self.src, self.dst, fingerprint=True)
+        self.assertEqual(
+            sorted(result.copied), sorted([self.png, self.css, self.out("robots.txt")])
+        )
+        self.assertEqual(
+            asset_urls(BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)),
+            {
+                "/images/a.png": "/" + os.path.relpath(self.png, self.dst),
+                "/index.css": "/" + os.path.relpath(self.css, self.dst),
+            },
+        )
+
+    def test_unchanged_assets_are_not_hashed_again(self):
+        sync_directory(self.src, self.dst, fingerprint=True)
+        with mock.patch.object(asset_sync, "hash_file") as hash_mock:
+            result = sync_directory(self.src, self.dst, fingerprint=True)
+        hash_mock.assert_not_called()
+        self.assertEqual(result.copied, [])
+
+    def test_changed_asset_gets_a_new_name(self):
+        sync_directory(self.src, self.dst, fingerprint=True)
+        self.write("static/index.css", "body { margin: 0 }")
+        result = sync_directory(self.src, self.dst, fingerprint=True)
+        (copied,) = result.copied
+        self.assertNotEqual(copied, self.css)
+        self.assertEqual(result.removed, [self.css])
+        self.assertFalse(os.path.exists(self.css))
+
+    def test_turning_fingerprints_off_restores_plain_names(self):
+        sync_directory(self.src, self.dst, fingerprint=True)
+        result = sync_directory(self.src, self.dst)
+        self.assertEqual(sorted(result.removed), sorted([self.png, self.css]))
+        self.assertEqual(self.read("docs/index.css"), "body {}")
+        self.assertEqual(
+            asset_urls(BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)), {}
+        )
+
+
+class TestImageSizes(AssetSyncTestCase):
+    """Unit tests for the image sizes sync_directory records."""
+
+    PNG = b"\x89PNG\r\n\x1a\n\0\0\0\x0dIHDR\0\0\x02\x80\0\0\x01\xe0"
+
+    def setUp(self):
+        super().setUp()
+        with open(os.path.join(self.src, "images", "b.png"), "wb") as f:
+            f.write(self.PNG)
+
+    def test_sizes_are_recorded_and_reused(self):
+        sync_directory(self.src, self.dst)
+        manifest = BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)
+        self.assertEqual(image_sizes(manifest), {"/images/b.png": (640, 480)})
+
+        with mock.patch.object(asset_sync, "read_image_size") as read_mock:
+            sync_directory(self.src, self.dst)
+        read_mock.assert_not_called()
+        manifest = BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)
+        self.assertEqual(image_sizes(manifest), {"/images/b.png": (640, 480)})
+
+    def test_fingerprinted_images_are_keyed_by_source(self):
+        sync_directory(self.src, self.dst, fingerprint=True)
+        manifest = BuildManifest.load(self.dst, ASSET_MANIFEST_NAME)
+        self.assertEqual(image_sizes(manifest), {"/images/b.png": (640, 480)})
+
+
+class TestCopyFile(AssetSyncTestCase):
+    """Unit tests for the copy fallbacks in copy_file."""
+
+    def test_copy_does_not_write_through_hardlinks(self):
+        source = os.path.join(self.src, "index.css")
+        copy_file(source, self.out("index.css"), link=True)
+        other = self.write("static/other.css", "other")
+        copy_file(other, self.out("index.css"))
+        self.assertEqual(self.read("static/index.css"), "body {}")
+        self.assertEqual(self.read("docs/index.css"), "other")
+
+    def test_link_falls_back_to_copy(self):
+        with mock.patch.object(asset_sync.os, "link", side_effect=OSError):
+            copy_file(os.path.join(self.src, "index.css"), self.out("index.css"), True)
+        self.assertEqual(self.read("docs/index.css"), "body {}")
+
+    def test_failed_copy_leaves_no_temporary_file(self):
+        source = os.path.join(self.src, "index.css")
+        with mock.patch.object(asset_sync.shutil, "copystat", side_effect=OSError):
+            with self.assertRaises(OSError):
+                copy_file(source, self.out("index.css"))
+        self.assertEqual(os.listdir(self.dst), [])
+
+    def test_reflink_then_copy_file_range_then_userspace(self):
+        source = os.path.join(self.src, "index.css")
+        with mock.patch.object(asset_sync.fcntl, "ioctl", return_value=0):
+            with mock.patch.object(asset_sync.os, "copy_file_range") as range_mock:
+                copy_file(source, self.out("cloned.css"))
+        range_mock.assert_not_called()
+
+        with mock.patch.object(asset_sync.fcntl, "ioctl", side_effect=OSError):
+            copy_file(source, self.out("ranged.css"))
+            with mock.patch.object(
+                asset_sync.os, "copy_file_range", side_effect=OSError
+            ):
+                copy_file(source, self.out("copied.css"))
+        self.assertEqual(self.read("docs/ranged.css"), "body {}")
+        self.assertEqual(self.read("docs/copied.css"), "body {}")
+        self.assertEqual(
+            sorted(os.listdir(self.dst)), ["cloned.css", "copied.css", "ranged.css"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
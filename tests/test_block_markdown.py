@@ -1,6 +1,12 @@
+import io
 import unittest
 
-from src.block_markdown import BlockType, block_to_block_type
+from src.block_markdown import (
+    BlockType,
+    block_to_block_type,
+    iter_block_lines,
+    iter_blocks,
+)
 
 
 class TestBlockToBlockType(unittest.TestCase):
@@ -40,5 +46,49 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type(""), BlockType.PARAGRAPH)
 
 
+class TestIterBlocks(unittest.TestCase):
+    """Test cases for the streaming block parser."""
+
+    def test_iter_block_lines_strips_and_splits(self):
+        lines = ["\n", "  First line \n", "Second line\n", "   \n", "Other\n"]
+        self.assertEqual(
+            list(iter_block_lines(lines)),
+            [["First line", "Second line"], ["Other"]],
+        )
+
+    def test_iter_blocks_from_file(self):
+        md = io.StringIO(
+            "# Title\n\nSome *text*\n\n```\ncode\n```\n\n> quote\n\n"
+            "1. one\n2. two\n\n- item\n"
+        )
+        self.assertEqual(
+            list(iter_blocks(md)),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.PARAGRAPH, ["Some *text*"]),
+                (BlockType.CODE, ["```", "code", "```"]),
+                (BlockType.QUOTE, ["> quote"]),
+                (BlockType.ORDERED_LIST, ["1. one", "2. two"]),
+                (BlockType.UNORDERED_LIST, ["- item"]),
+            ],
+        )
+
+    def test_iter_blocks_matches_block_to_block_type(self):
+        for block in ("1.\nsecond line", "1.", "#\nx", "-\nx", "12. item"):
+            lines = block.split("\n")
+            ((block_type, _),) = iter_blocks(lines)
+            self.assertEqual(block_type, block_to_block_type(block), block)
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "First block"
+            yield ""
+            raise AssertionError("read past the first block")
+
+        block_type, block_lines = next(iter_blocks(lines()))
+        self.assertEqual(block_type, BlockType.PARAGRAPH)
+        self.assertEqual(block_lines, ["First block"])
+
+
 if __name__ == "__main__":
     unittest.main()
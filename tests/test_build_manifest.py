@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+
+from src.build_manifest import MANIFEST_NAME, BuildManifest, hash_file
+from tests import TempDirTestCase
+
+
+class TestHashFile(unittest.TestCase):
+    """Unit tests for the hash_file function."""
+
+    def test_hash_file_matches_sha256(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "page.md")
+            with open(path, "wb") as f:
+                f.write(b"# Title\n" * 10000)
+            expected = hashlib.sha256(b"# Title\n" * 10000).hexdigest()
+            self.assertEqual(hash_file(path), expected)
+
+
+class TestBuildManifest(TempDirTestCase):
+    """Unit tests for the BuildManifest class."""
+
+    def setUp(self):
+        super().setUp()
+        self.entry = {"source": "page.md", "source_hash": "abc"}
+
+    def _touch(self, *parts):
+        return self.write(os.path.join(*parts), "<p>page</p>")
+
+    def test_load_missing_manifest_is_empty(self):
+        manifest = BuildManifest.load(self.root)
+        self.assertEqual(manifest.pages, {})
+        self.assertEqual(manifest.path, os.path.join(self.root, MANIFEST_NAME))
+
+    def test_load_corrupt_manifest_is_empty(self):
+        with open(os.path.join(self.root, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertEqual(BuildManifest.load(self.root).pages, {})
+
+    def test_save_and_load_round_trip(self):
+        dest_path = self._touch("blog", "page.html")
+        manifest = BuildManifest.load(self.root)
+        manifest.record(dest_path, self.entry)
+        manifest.save()
+
+        with open(manifest.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"pages": {"blog/page.html": self.entry}})
+        self.assertTrue(BuildManifest.load(self.root).is_fresh(dest_path, self.entry))
+
+    def test_is_fresh_requires_matching_entry(self):
+        dest_path = self._touch("page.html")
+        manifest = BuildManifest.load(self.root)
+        manifest.record(dest_path, self.entry)
+        self.assertFalse(
+            manifest.is_fresh(dest_path, {**self.entry, "source_hash": "x"})
+        )
+
+    def test_is_fresh_requires_output_file(self):
+        dest_path = os.path.join(self.root, "page.html")
+        manifest = BuildManifest.load(self.root)
+        manifest.record(dest_path, self.entry)
+        self.assertFalse(manifest.is_fresh(dest_path, self.entry))
+
+    def test_prune_removes_only_orphaned_outputs(self):
+        kept = self._touch("index.html")
+        orphan = self._touch("blog", "old", "index.html")
+        unrelated = self._touch("index.css")
+        manifest = BuildManifest.load(self.root)
+        manifest.record(kept, self.entry)
+        manifest.record(orphan, self.entry)
+
+        removed = manifest.prune({kept})
+
+        self.assertEqual(removed, [orphan])
+        self.assertTrue(os.path.exists(kept))
+        self.assertTrue(os.path.exists(unrelated))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+        self.assertEqual(list(manifest.pages), ["index.html"])
+
+    def test_prune_keeps_shared_directories_and_forgets_missing_outputs(self):
+        orphan = self._touch("blog", "old.html")
+        sibling = self._touch("blog", "new.html")
+        missing = os.path.join(self.root, "gone.html")
+        manifest = BuildManifest.load(self.root)
+        manifest.record(orphan, self.entry)
+        manifest.record(missing, self.entry)
+
+        self.assertEqual(manifest.prune(set()), [orphan, missing])
+        self.assertTrue(os.path.exists(sibling))
+        self.assertEqual(manifest.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.build_trace import (
+    PAGE_SPAN,
+    add_events,
+    is_tracing,
+    slowest_pages,
+    span,
+    start_tracing,
+    stop_tracing,
+    take_events,
+    write_trace,
+)
+
+
+class TestSpans(unittest.TestCase):
+    """Unit tests for recording spans."""
+
+    def tearDown(self):
+        stop_tracing()
+
+    def test_spans_are_free_when_tracing_is_off(self):
+        self.assertFalse(is_tracing())
+        self.assertIs(span("parse"), span("render", path="x"))
+        with span("parse"):
+            pass
+        self.assertEqual(stop_tracing(), [])
+
+    def test_spans_are_complete_events(self):
+        start_tracing()
+        self.assertTrue(is_tracing())
+        with span(PAGE_SPAN, path="content/index.md"):
+            with span("parse"):
+                pass
+        events = stop_tracing()
+        self.assertFalse(is_tracing())
+        self.assertEqual(len(events), 2)
+        parse, page = events[0], events[1]
+        self.assertEqual(
+            (parse["name"], parse["ph"], parse["args"]), ("parse", "X", {})
+        )
+        self.assertEqual(page["args"], {"path": "content/index.md"})
+        self.assertEqual(page["pid"], os.getpid())
+        self.assertLessEqual(page["ts"], parse["ts"])
+        self.assertGreaterEqual(page["dur"], parse["dur"])
+
+    def test_span_ending_after_tracing_stopped_is_dropped(self):
+        start_tracing()
+        with span("parse"):
+            stop_tracing()
+        self.assertEqual(stop_tracing(), [])
+
+    def test_take_and_add_events(self):
+        self.assertEqual(take_events(), [])
+        add_events([{"name": "ignored"}])
+        start_tracing()
+        with span("parse"):
+            pass
+        taken = take_events()
+        self.assertEqual([event["name"] for event in taken], ["parse"])
+        self.assertEqual(take_events(), [])
+        add_events(taken)
+        self.assertEqual(stop_tracing(), taken)
+
+
+class TestTraceOutput(unittest.TestCase):
+    """Unit tests for writing and summarising traces."""
+
+    events = [
+        {"name": PAGE_SPAN, "dur": 2000.0, "args": {"path": "a.md"}},
+        {"name": "parse", "dur": 9000.0, "args": {}},
+        {"name": PAGE_SPAN, "dur": 5000.0, "args": {"path": "b.md"}},
+        {"name": PAGE_SPAN, "dur": 1000.0, "args": {"path": "c.md"}},
+    ]
+
+    def test_write_trace(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            write_trace(path, self.events)
+            with open(path, encoding="utf-8") as f:
+                trace = json.load(f)
+        self.assertEqual(trace["traceEvents"], self.events)
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+
+    def test_slowest_pages(self):
+        self.assertEqual(slowest_pages(self.events, 2), [("b.md", 5.0), ("a.md", 2.0)])
+        self.assertEqual(len(slowest_pages(self.events)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+import os
+import socket
+import struct
+import threading
+import unittest
+from http import HTTPStatus
+from unittest import mock
+
+from src import dev_server
+from src.dev_server import DevSite, StaticImageSizes, make_handler
+from src.live_reload import ChangeBroker
+from tests import TempDirTestCase
+
+
+class DevSiteTestCase(TempDirTestCase):
+    """
+    Base class providing a small site in a temporary directory, and requests
+    to it over a connected socket pair.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.template = self.write("template.html", "<title>{{ Title }}</title>")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post\n\n[a](/a.html)")
+        self.write("static/index.css", "0123456789")
+        self.site = DevSite(
+            os.path.join(self.root, "content"),
+            os.path.join(self.root, "static"),
+            self.template,
+        )
+
+    def connect(self):
+        server_socket, client_socket = socket.socketpair()
+        handler = make_handler(self.site)
+
+        def serve():
+            with server_socket:
+                handler(server_socket, ("", 0), mock.Mock())
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        return client_socket, thread
+
+    def request(self, raw):
+        client_socket, thread = self.connect()
+        with client_socket:
+            client_socket.sendall(raw)
+            client_socket.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := client_socket.recv(4096):
+                chunks.append(chunk)
+        thread.join()
+        return b"".join(chunks)
+
+
+class TestDevSitePages(DevSiteTestCase):
+    """Unit tests for on-demand page rendering."""
+
+    def test_index_and_html_paths_render_markdown(self):
+        response = self.site.respond("/", {})
+        self.assertEqual(response.status, HTTPStatus.OK)
+        self.assertEqual(response.body, b"<title>Home</title>")
+        self.assertEqual(response.headers["Content-Type"], "text/html; charset=utf-8")
+        response = self.site.respond("/blog/post.html?x=1", {})
+        self.assertEqual(response.body, b"<title>Post</title>")
+
+    def test_directory_without_slash_redirects(self):
+        self.write("content/blog/index.md", "# Blog")
+        response = self.site.respond("/blog", {})
+        self.assertEqual(response.status, HTTPStatus.MOVED_PERMANENTLY)
+        self.assertEqual(response.headers["Location"], "/blog/")
+
+    def test_redirect_keeps_the_encoded_path_and_query(self):
+        self.write("content/日本/index.md", "# Japan")
+        response = self.site.respond("/%E6%97%A5%E6%9C%AC?x=1", {})
+        self.assertEqual(response.headers["Location"], "/%E6%97%A5%E6%9C%AC/?x=1")
+        with mock.patch("sys.stderr"):
+            raw = self.request(b"GET /%E6%97%A5%E6%9C%AC HTTP/1.1\r\n\r\n")
+        self.assertTrue(raw.startswith(b"HTTP/1.1 301"))
+        self.assertIn(b"Location: /%E6%97%A5%E6%9C%AC/\r\n", raw)
+
+    def test_page_is_cached_until_source_changes(self):
+        with mock.patch.object(
+            dev_server, "render_page", wraps=dev_server.render_page
+        ) as render_mock:
+            first = self.site.respond("/", {})
+            self.assertEqual(self.site.respond("/", {}), first)
+            self.assertEqual(render_mock.call_count, 1)
+
+            self.write("content/index.md", "# Welcome home")
+            self.assertEqual(
+                self.site.respond("/", {}).body, b"<title>Welcome home</title>"
+            )
+            self.write("template.html", "<h1>{{ Title }}</h1>")
+            self.assertEqual(self.site.respond("/", {}).body, b"<h1>Welcome home</h1>")
+            self.assertEqual(render_mock.call_count, 3)
+
+    def write_png(self, width, height):
+        path = os.path.join(self.root, "static", "images", "a.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(
+                b"\x89PNG\r\n\x1a\n\0\0\0\x0dIHDR" + struct.pack(">II", width, height)
+            )
+        return path
+
+    def test_images_get_the_size_of_their_static_file(self):
+        self.write("template.html", "{{ Content }}")
+        self.write(
+            "content/index.md",
+            "# Home\n\n![a](/images/a.png) ![b](/../template.html) ![c](/index.css)",
+        )
+        image = '<img src="/images/a.png" alt="a" loading="lazy" decoding="async"'
+        self.assertIn(image + "/>", self.site.respond("/", {}).body.decode())
+
+        self.write_png(640, 480)
+        self.assertIn(
+            image + ' width="640" height="480"/>',
+            self.site.respond("/", {}).body.decode(),
+        )
+        os.utime(self.write_png(320, 240), ns=(1, 1))
+        self.assertIn(
+            image + ' width="320" height="240"/>',
+            self.site.respond("/", {}).body.decode(),
+        )
+
+    def test_image_sizes_remember_the_files_looked_up(self):
+        path = self.write_png(640, 480)
+        sizes = StaticImageSizes(os.path.join(self.root, "static"))
+
+        self.assertEqual(sizes.get("/images/a.png"), (640, 480))
+        self.assertIsNone(sizes.get("/images/b.png"))
+
+        self.assertEqual(len(sizes), 1)
+        self.assertEqual(dict(sizes), {"/images/a.png": (640, 480)})
+        self.assertEqual(
+            sizes.signatures,
+            {
+                path: (os.stat(path).st_mtime_ns, os.stat(path).st_size),
+                os.path.join(self.root, "static", "images", "b.png"): None,
+            },
+        )
+
+    def test_etag_gives_not_modified(self):
+        etag = self.site.respond("/", {}).headers["ETag"]
+        response = self.site.respond("/", {"If-None-Match": f'"other", W/{etag}'})
+        self.assertEqual(response.status, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.body, b"")
+        response = self.site.respond("/", {"If-None-Match": '"other"'})
+        self.assertEqual(response.status, HTTPStatus.OK)
+
+    def test_basepath_is_stripped_and_applied(self):
+        site = DevSite(
+            self.site.content_dir, self.site.static_dir, self.template, "/docs/"
+        )
+        self.write("template.html", "{{ Content }}")
+        response = site.respond("/docs/blog/post.html", {})
+        self.assertIn(b'href="/docs/a.html"', response.body)
+        self.assertEqual(site.respond("/blog/post.html", {}).status, 404)
+
+    def test_missing_and_escaping_paths_are_not_found(self):
+        for target in ("/missing.html", "/missing.css", "/../template.html", "/blog/"):
+            self.assertEqual(self.site.respond(target, {}).status, 404, target)
+
+
+class TestDevSiteStatic(DevSiteTestCase):
+    """Unit tests for static files with validators and ranges."""
+
+    def test_static_file(self):
+        response = self.site.respond("/index.css", {})
+        self.assertEqual(response.status, HTTPStatus.OK)
+        self.assertEqual(response.body, b"0123456789")
+        self.assertEqual(response.headers["Content-Type"], "text/css")
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+        etag = response.headers["ETag"]
+        response = self.site.respond("/index.css", {"If-None-Match": "*"})
+        self.assertEqual(response.status, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_unknown_type_is_octet_stream(self):
+        self.write("static/data.unknownext", "x")
+        response = self.site.respond("/data.unknownext", {})
+        self.assertEqual(response.headers["Content-Type"], "application/octet-stream")
+
+    def test_ranges(self):
+        cases = {
+            "bytes=2-4": (b"234", "bytes 2-4/10"),
+            "bytes=7-": (b"789", "bytes 7-9/10"),
+            "bytes=-2": (b"89", "bytes 8-9/10"),
+            "bytes=-20": (b"0123456789", "bytes 0-9/10"),
+            "bytes=8-100": (b"89", "bytes 8-9/10"),
+        }
+        for header, (body, content_range) in cases.items():
+            response = self.site.respond("/index.css", {"Range": header})
+            self.assertEqual(response.status, HTTPStatus.PARTIAL_CONTENT, header)
+            self.assertEqual(response.body, body, header)
+            self.assertEqual(response.headers["Content-Range"], content_range)
+
+    def test_unsatisfiable_range(self):
+        for header in ("bytes=10-", "bytes=5-2"):
+            response = self.site.respond("/index.css", {"Range": header})
+            self.assertEqual(
+                response.status, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            )
+            self.assertEqual(response.headers["Content-Range"], "bytes */10")
+
+    def test_unsupported_ranges_serve_everything(self):
+        for header in ("bytes=-", "bytes=0-1,3-4", "items=0-1"):
+            response = self.site.respond("/index.css", {"Range": header})
+            self.assertEqual(response.status, HTTPStatus.OK, header)
+            self.assertEqual(response.body, b"0123456789")
+
+
+class TestHandler(DevSiteTestCase):
+    """Tests for the HTTP handler."""
+
+    def test_get_and_head(self):
+        with mock.patch("sys.stderr"):
+            response = self.request(
+                b"GET /index.css HTTP/1.1\r\nrange: bytes=0-1\r\n\r\n"
+                b"HEAD / HTTP/1.1\r\nConnection: close\r\n\r\n"
+            )
+        first, second = response.split(b"HTTP/1.1 200", 1)
+        self.assertTrue(first.startswith(b"HTTP/1.1 206 Partial Content\r\n"))
+        self.assertIn(b"Content-Length: 2\r\n", first)
+        self.assertTrue(first.endswith(b"\r\n\r\n01"))
+        self.assertIn(b"Content-Length: 19\r\n", second)
+        self.assertTrue(second.endswith(b"\r\n\r\n"))
+
+    def test_errors_are_reported(self):
+        self.write("content/index.md", "no title")
+        with mock.patch("sys.stderr"):
+            response = self.request(b"GET / HTTP/1.1\r\nConnection: close\r\n\r\n")
+        self.assertTrue(response.startswith(b"HTTP/1.1 500 Internal Server Error"))
+        self.assertIn(b"No H1 header found", response)
+
+
+class TestLiveReload(DevSiteTestCase):
+    """Tests for the live-reload client and event stream."""
+
+    def setUp(self):
+        super().setUp()
+        self.events = ChangeBroker("docs", keepalive=0.01)
+        self.site.events = self.events
+
+    def test_pages_include_client(self):
+        self.assertIn(b"/__livereload?page=", self.site.respond("/", {}).body)
+
+    def test_event_stream(self):
+        client_socket, thread = self.connect()
+        with mock.patch("sys.stderr"), client_socket:
+            client_socket.sendall(b"GET /__livereload?page=/blog/ HTTP/1.1\r\n\r\n")
+            received = b""
+            while b"\r\n\r\n" not in received:
+                received += client_socket.recv(4096)
+            self.events.publish("/index.html")
+            self.events.publish("/blog/index.html")
+            while b"\n\n" not in received.rsplit(b"data: ", 1)[-1]:
+                received += client_socket.recv(4096)
+        thread.join()
+        self.assertTrue(received.startswith(b"HTTP/1.1 200 OK\r\n"))
+        self.assertIn(b"Content-Type: text/event-stream\r\n", received)
+        self.assertIn(b"data: /blog/index.html\n\n", received)
+        self.assertNotIn(b"data: /index.html", received)
+        self.assertEqual(self.events.subscriber_count, 0)
+
+    def test_event_stream_needs_live_reload(self):
+        self.site.events = None
+        with mock.patch("sys.stderr"):
+            response = self.request(
+                b"GET /__livereload HTTP/1.1\r\nConnection: close\r\n\r\n"
+            )
+        self.assertTrue(response.startswith(b"HTTP/1.1 404"))
+
+
+if __name__ == "__main__":
+    unittest.main()
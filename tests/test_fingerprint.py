@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from src.build_manifest import BuildManifest
+from src.fingerprint import (
+    HEADERS_NAME,
+    IMMUTABLE,
+    asset_urls,
+    fingerprinted_path,
+    is_fingerprinted,
+    write_headers,
+)
+from tests import TempDirTestCase
+
+
+class TestFingerprintNames(unittest.TestCase):
+    """Unit tests for choosing and naming fingerprinted assets."""
+
+    def test_is_fingerprinted(self):
+        for path in ("index.css", "images/A.PNG", "app.js", "font.woff2"):
+            self.assertTrue(is_fingerprinted(path), path)
+        for path in ("robots.txt", "favicon.ico", "CNAME", "_headers"):
+            self.assertFalse(is_fingerprinted(path), path)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(
+            fingerprinted_path("images/a.png", "0123456789abcdef"),
+            "images/a.0123456789.png",
+        )
+        self.assertEqual(
+            fingerprinted_path("LICENSE", "abcdef0123456"), "LICENSE.abcdef0123"
+        )
+
+    def test_asset_urls(self):
+        manifest = BuildManifest(
+            "docs/.assets.json",
+            {
+                "index.0123456789.css": {"source": "index.css"},
+                "robots.txt": {"size": "6"},
+            },
+        )
+        self.assertEqual(asset_urls(manifest), {"/index.css": "/index.0123456789.css"})
+
+
+class TestWriteHeaders(TempDirTestCase):
+    """Unit tests for write_headers."""
+
+    def setUp(self):
+        super().setUp()
+        self.base = self.path("static", HEADERS_NAME)
+
+    def test_marks_fingerprinted_assets_immutable(self):
+        write_headers(
+            self.root, {"/b.css": "/b.1.css", "/a.css": "/a.2.css"}, self.base
+        )
+        self.assertEqual(
+            self.read(HEADERS_NAME),
+            f"/a.2.css\n  {IMMUTABLE}\n/b.1.css\n  {IMMUTABLE}\n",
+        )
+
+    def test_keeps_static_rules_without_writing_through_links(self):
+        self.write(self.base, "/*\n  X-Frame-Options: DENY\n\n")
+        os.link(self.base, self.path(HEADERS_NAME))
+        write_headers(self.root, {"/a.css": "/a.1.css"}, self.base)
+        self.assertEqual(
+            self.read(HEADERS_NAME),
+            f"/*\n  X-Frame-Options: DENY\n/a.1.css\n  {IMMUTABLE}\n",
+        )
+        self.assertEqual(self.read(self.base), "/*\n  X-Frame-Options: DENY\n\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,26 @@
 import os
+import sys
 import tempfile
 import unittest
 from unittest import mock
 
 import pytest
 
-from src.generate_content import extract_title, generate_page, generate_pages_recursive
+from src import generate_content, parse_cache
+from src.build_trace import PAGE_SPAN, start_tracing, stop_tracing
+from src.generate_content import (
+    RENDERER_VERSION,
+    RenderOptions,
+    extract_title,
+    find_pages,
+    generate_page,
+    generate_pages_recursive,
+    render_page,
+)
+from src.htmlnode import LeafNode, ParentNode
+from src.live_reload import add_write_listener, remove_write_listener
+from src.parse_cache import ParseCache
+from src.template import load_template
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -60,19 +75,30 @@ class DummyHtmlNode:
     def __init__(self, html):
         self._html = html
 
-    def to_html(self):
+    def to_html(self, _resolve_url=None):
         return self._html
 
+    def iter_html(self, _resolve_url=None):
+        yield self._html
+
     def __str__(self):
         return self._html
 
 
-@mock.patch("src.generate_content.markdown_to_html_node")
-@mock.patch("src.generate_content.extract_title")
-def test_generate_page_creates_html_file(mock_extract_title, mock_md_to_html):
+def _parses_to(node):
+    # Stand in for the parser, reading the lines it is given as the parser does
+    def parse(lines):
+        for _ in lines:
+            pass
+        return node
+
+    return parse
+
+
+@mock.patch("src.generate_content.markdown_lines_to_html_node")
+def test_generate_page_creates_html_file(mock_md_to_html):
     # Setup dummy return values
-    mock_extract_title.return_value = "Test Title"
-    mock_md_to_html.return_value = DummyHtmlNode("<p>Test HTML</p>")
+    mock_md_to_html.side_effect = _parses_to(DummyHtmlNode("<p>Test HTML</p>"))
 
     # Create temp files for markdown and template
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -100,11 +126,9 @@ def test_generate_page_creates_html_file(mock_extract_title, mock_md_to_html):
         assert "<p>Test HTML</p>" in output
 
 
-@mock.patch("src.generate_content.markdown_to_html_node")
-@mock.patch("src.generate_content.extract_title")
-def test_generate_page_creates_parent_dirs(mock_extract_title, mock_md_to_html):
-    mock_extract_title.return_value = "Dir Title"
-    mock_md_to_html.return_value = DummyHtmlNode("<p>Dir HTML</p>")
+@mock.patch("src.generate_content.markdown_lines_to_html_node")
+def test_generate_page_creates_parent_dirs(mock_md_to_html):
+    mock_md_to_html.side_effect = _parses_to(DummyHtmlNode("<p>Dir HTML</p>"))
 
     with tempfile.TemporaryDirectory() as tmpdir:
         md_path = os.path.join(tmpdir, "a.md")
@@ -125,11 +149,9 @@ def test_generate_page_creates_parent_dirs(mock_extract_title, mock_md_to_html):
         assert os.path.exists(dest_path)
 
 
-@mock.patch("src.generate_content.markdown_to_html_node")
-@mock.patch("src.generate_content.extract_title")
-def test_generate_page_replaces_both_placeholders(mock_extract_title, mock_md_to_html):
-    mock_extract_title.return_value = "Placeholder Title"
-    mock_md_to_html.return_value = DummyHtmlNode("<div>HTML</div>")
+@mock.patch("src.generate_content.markdown_lines_to_html_node")
+def test_generate_page_replaces_both_placeholders(mock_md_to_html):
+    mock_md_to_html.side_effect = _parses_to(DummyHtmlNode("<div>HTML</div>"))
 
     with tempfile.TemporaryDirectory() as tmpdir:
         md_path = os.path.join(tmpdir, "c.md")
@@ -149,6 +171,47 @@ def test_generate_page_replaces_both_placeholders(mock_extract_title, mock_md_to
         assert content == "Placeholder Title -- <div>HTML</div>"
 
 
+def test_render_page_gives_images_their_sizes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "{{ Content }}")
+        template = load_template(template_path)
+    markdown = "# Home\n\n![a](/a.png)"
+
+    assert render_page(markdown, template) == (
+        '<div><h1>Home</h1><p><img src="/a.png" alt="a" loading="lazy" '
+        'decoding="async"/></p></div>'
+    )
+    assert render_page(
+        markdown,
+        template,
+        RenderOptions(basepath="/site/", image_sizes={"/a.png": (640, 480)}),
+    ) == (
+        '<div><h1>Home</h1><p><img src="/site/a.png" alt="a" loading="lazy" '
+        'decoding="async" width="640" height="480"/></p></div>'
+    )
+
+
+def test_generate_page_finds_the_title_while_parsing():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        md_path = os.path.join(tmpdir, "page.md")
+        tpl_path = os.path.join(tmpdir, "template.html")
+        dest_path = os.path.join(tmpdir, "page.html")
+        _write(md_path, "## Intro\n\n# Late Title\n\n# Second")
+        _write(tpl_path, "{{ Title }}|{{ Content }}")
+
+        generate_page(md_path, tpl_path, dest_path)
+
+        with open(dest_path, encoding="utf-8") as f:
+            assert f.read() == (
+                "Late Title|<div><h2>Intro</h2><h1>Late Title</h1><h1>Second</h1></div>"
+            )
+
+        _write(md_path, "## No title\n\nBody")
+        with pytest.raises(ValueError):
+            generate_page(md_path, tpl_path, dest_path)
+
+
 @mock.patch("src.generate_content.generate_page")
 def test_generate_pages_recursive_single_file(mock_generate_page):
 
@@ -230,6 +293,707 @@ def test_generate_pages_recursive_ignores_non_md(mock_generate_page):
         assert dest_path == os.path.join(dest_dir, "file.html")
 
 
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_generate_pages_recursive_incremental_skips_unchanged_pages():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        dest_dir = os.path.join(tmpdir, "docs")
+        _write(os.path.join(content_dir, "a.md"), "# A\n\nFirst page")
+        _write(os.path.join(content_dir, "blog", "b.md"), "# B\n\nSecond page")
+        _write(template_path, "{{ Title }} {{ Content }}")
+
+        generate_pages_recursive(content_dir, template_path, dest_dir, incremental=True)
+        with mock.patch("src.generate_content.generate_page") as mock_generate_page:
+            generate_pages_recursive(
+                content_dir, template_path, dest_dir, incremental=True
+            )
+            mock_generate_page.assert_not_called()
+
+            _write(os.path.join(content_dir, "a.md"), "# A\n\nEdited page")
+            generate_pages_recursive(
+                content_dir, template_path, dest_dir, incremental=True
+            )
+            mock_generate_page.assert_called_once()
+            assert mock_generate_page.call_args[0][2] == os.path.join(
+                dest_dir, "a.html"
+            )
+
+
+def test_generate_pages_recursive_incremental_rebuilds_on_template_or_basepath():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        dest_dir = os.path.join(tmpdir, "docs")
+        _write(os.path.join(content_dir, "a.md"), "# A\n\nFirst page")
+        _write(template_path, "{{ Title }} {{ Content }}")
+        generate_pages_recursive(content_dir, template_path, dest_dir, incremental=True)
+
+        with mock.patch("src.generate_content.generate_page") as mock_generate_page:
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                dest_dir,
+                RenderOptions(basepath="/site/"),
+                incremental=True,
+            )
+            _write(template_path, "<html>{{ Title }} {{ Content }}</html>")
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                dest_dir,
+                RenderOptions(basepath="/site/"),
+                incremental=True,
+            )
+            assert mock_generate_page.call_count == 2
+
+
+def test_generate_pages_recursive_incremental_removes_orphans():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        dest_dir = os.path.join(tmpdir, "docs")
+        _write(os.path.join(content_dir, "a.md"), "# A\n\nFirst page")
+        _write(os.path.join(content_dir, "old", "b.md"), "# B\n\nSecond page")
+        _write(os.path.join(dest_dir, "index.css"), "body {}")
+        _write(template_path, "{{ Title }} {{ Content }}")
+        generate_pages_recursive(content_dir, template_path, dest_dir, incremental=True)
+
+        os.unlink(os.path.join(content_dir, "old", "b.md"))
+        generate_pages_recursive(content_dir, template_path, dest_dir, incremental=True)
+
+        assert os.path.exists(os.path.join(dest_dir, "a.html"))
+        assert os.path.exists(os.path.join(dest_dir, "index.css"))
+        assert not os.path.exists(os.path.join(dest_dir, "old"))
+
+
+def test_find_pages_is_sorted():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        for name in ("b.md", "a.md", os.path.join("sub", "c.md"), "notes.txt"):
+            _write(os.path.join(content_dir, name), "# Title")
+
+        pages = find_pages(content_dir, "docs")
+
+        assert pages == [
+            (os.path.join(content_dir, "a.md"), os.path.join("docs", "a.html")),
+            (os.path.join(content_dir, "b.md"), os.path.join("docs", "b.html")),
+            (
+                os.path.join(content_dir, "sub", "c.md"),
+                os.path.join("docs", "sub", "c.html"),
+            ),
+        ]
+
+
+def test_generate_pages_recursive_parallel_matches_serial():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, '<a href="/">{{ Title }}</a> {{ Content }}')
+        for i in range(6):
+            body = "Some **bold** text.\n\n" * (i * 50 + 1)
+            _write(
+                os.path.join(content_dir, f"dir{i % 2}", f"p{i}.md"),
+                f"# P{i}\n\n{body}",
+            )
+
+        serial_dir = os.path.join(tmpdir, "serial")
+        parallel_dir = os.path.join(tmpdir, "parallel")
+        options = RenderOptions(basepath="/site/")
+        generate_pages_recursive(content_dir, template_path, serial_dir, options)
+        generate_pages_recursive(
+            content_dir, template_path, parallel_dir, options, jobs=3
+        )
+
+        for _, serial_path in find_pages(content_dir, serial_dir):
+            parallel_path = os.path.join(
+                parallel_dir, os.path.relpath(serial_path, serial_dir)
+            )
+            with open(serial_path, encoding="utf-8") as f:
+                expected = f.read()
+            with open(parallel_path, encoding="utf-8") as f:
+                assert f.read() == expected
+
+
+def test_generate_pages_recursive_parallel_collects_errors_in_order():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        dest_dir = os.path.join(tmpdir, "docs")
+        _write(template_path, "{{ Title }} {{ Content }}")
+        _write(os.path.join(content_dir, "a.md"), "no title here")
+        _write(os.path.join(content_dir, "b.md"), "# B\n\nFine")
+        _write(os.path.join(content_dir, "c.md"), "no title either")
+
+        with pytest.raises(ExceptionGroup) as excinfo:
+            generate_pages_recursive(
+                content_dir, template_path, dest_dir, incremental=True, jobs=2
+            )
+
+        errors = excinfo.value.exceptions
+        assert len(errors) == 2
+        assert errors[0].__notes__ == [
+            f"while generating {os.path.join(content_dir, 'a.md')}"
+        ]
+        assert errors[1].__notes__ == [
+            f"while generating {os.path.join(content_dir, 'c.md')}"
+        ]
+        assert os.path.exists(os.path.join(dest_dir, "b.html"))
+        with mock.patch("src.generate_content.generate_page") as mock_generate_page:
+            _write(os.path.join(content_dir, "a.md"), "# A\n\nFixed")
+            _write(os.path.join(content_dir, "c.md"), "# C\n\nFixed")
+            generate_pages_recursive(
+                content_dir, template_path, dest_dir, incremental=True
+            )
+            assert mock_generate_page.call_count == 2
+
+
+def test_generate_pages_recursive_uses_directory_template():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        dest_dir = os.path.join(tmpdir, "docs")
+        _write(template_path, "page: {{ Title }}")
+        _write(os.path.join(content_dir, "blog", "template.html"), "post: {{ Title }}")
+        _write(os.path.join(content_dir, "index.md"), "# Home")
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post")
+
+        generate_pages_recursive(content_dir, template_path, dest_dir)
+
+        with open(os.path.join(dest_dir, "index.html"), encoding="utf-8") as f:
+            assert f.read() == "page: Home"
+        with open(os.path.join(dest_dir, "blog", "post.html"), encoding="utf-8") as f:
+            assert f.read() == "post: Post"
+
+
+def test_generate_page_resolves_urls_only_in_attributes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        md_path = os.path.join(tmpdir, "page.md")
+        tpl_path = os.path.join(tmpdir, "template.html")
+        dest_path = os.path.join(tmpdir, "out", "page.html")
+        _write(
+            md_path,
+            "# Title\n\n[Home](/) and ![cat](/images/cat.png)\n\n"
+            '```\n<a href="/literal">x</a>\n```',
+        )
+        _write(tpl_path, '<link href="/index.css" />{{ Content }}')
+
+        generate_page(md_path, tpl_path, dest_path, RenderOptions(basepath="/site/"))
+
+        with open(dest_path, encoding="utf-8") as f:
+            output = f.read()
+        assert '<link href="/site/index.css" />' in output
+        assert '<a href="/site/">Home</a>' in output
+        assert (
+            '<img src="/site/images/cat.png" alt="cat" loading="lazy" '
+            'decoding="async"/>' in output
+        )
+        assert '<a href="/literal">x</a>' in output
+
+
+def test_generate_pages_recursive_writes_every_target_from_one_parse():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        prod_dir = os.path.join(tmpdir, "docs")
+        preview_dir = os.path.join(tmpdir, "preview")
+        _write(template_path, '<link href="/index.css" />{{ Content }}')
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post\n\n[Home](/)")
+
+        with mock.patch(
+            "src.generate_content.markdown_lines_to_html_node",
+            wraps=generate_content.markdown_lines_to_html_node,
+        ) as mock_md_to_html:
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                prod_dir,
+                RenderOptions(basepath="/static_site/"),
+                incremental=True,
+                targets={"/": preview_dir},
+            )
+            assert mock_md_to_html.call_count == 1
+
+        with open(os.path.join(prod_dir, "blog", "post.html"), encoding="utf-8") as f:
+            prod = f.read()
+        with open(
+            os.path.join(preview_dir, "blog", "post.html"), encoding="utf-8"
+        ) as f:
+            preview = f.read()
+        assert 'href="/static_site/index.css"' in prod
+        assert 'href="/static_site/">Home' in prod
+        assert 'href="/index.css"' in preview
+        assert 'href="/">Home' in preview
+
+        with mock.patch("src.generate_content.generate_page") as mock_generate_page:
+            os.unlink(os.path.join(preview_dir, "blog", "post.html"))
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                prod_dir,
+                RenderOptions(basepath="/static_site/"),
+                incremental=True,
+                targets={"/": preview_dir},
+            )
+            mock_generate_page.assert_called_once()
+            assert mock_generate_page.call_args[0][2] == os.path.join(
+                preview_dir, "blog", "post.html"
+            )
+            assert mock_generate_page.call_args[1] == {
+                "options": RenderOptions(basepath="/"),
+                "variants": {},
+            }
+
+
 if __name__ == "__main__":
     unittest.main()
     pytest.main([__file__])
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_pages_recursive_notifies_write_listeners(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "{{ Content }}")
+        _write(os.path.join(content_dir, "index.md"), "# Home")
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post")
+
+        written: list[str] = []
+        add_write_listener(written.append)
+        try:
+            generate_pages_recursive(content_dir, template_path, dest_dir, jobs=jobs)
+            first = sorted(written)
+            written.clear()
+            _write(os.path.join(content_dir, "index.md"), "# Home again")
+            generate_pages_recursive(content_dir, template_path, dest_dir, jobs=jobs)
+        finally:
+            remove_write_listener(written.append)
+
+        assert first == [
+            os.path.join(dest_dir, "blog", "post.html"),
+            os.path.join(dest_dir, "index.html"),
+        ]
+        # Only the page whose output changed was written again.
+        assert written == [os.path.join(dest_dir, "index.html")]
+
+
+@pytest.mark.parametrize(
+    "old, chunks",
+    [
+        (None, ["<p>", "new", "</p>"]),
+        ("<p>old</p>", ["<p>", "new", "</p>"]),
+        ("<p>new</p>", ["<p>", "new", "</p>", "<p>more</p>"]),
+        ("<p>new</p><p>more</p>", ["<p>", "new", "</p>"]),
+        ("<p>né</p>", ["<p>", "ne", "</p>"]),
+        ("", ["caf\u00e9"]),
+        ("<p>old</p>", []),
+        ("a" * 50_000 + "b" * 70_000, ["a" * 40_000] * 3),
+        ("a" * 120_000 + "b", ["a" * 40_000] * 3),
+    ],
+)
+def test_write_if_changed_writes_new_text(old, chunks):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "page.html")
+        if old is not None:
+            _write(path, old)
+
+        assert generate_content.write_if_changed(path, iter(chunks))
+
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == "".join(chunks)
+
+
+def test_write_if_changed_leaves_identical_file_alone():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "page.html")
+        _write(path, "<p>café</p>")
+        os.utime(path, ns=(1, 1))
+
+        assert not generate_content.write_if_changed(path, ["<p>", "café", "</p>"])
+
+        assert os.stat(path).st_mtime_ns == 1
+
+
+@pytest.mark.parametrize(
+    "chunks", [["<p>new</p>"], ["<p>old</p>", "<p>more</p>"], ["<p>o"]]
+)
+def test_write_if_changed_replaces_hardlinked_file(chunks):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "page.html")
+        other = os.path.join(tmpdir, "other.html")
+        _write(other, "<p>old</p>")
+        os.link(other, path)
+
+        assert generate_content.write_if_changed(path, iter(chunks))
+
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == "".join(chunks)
+        with open(other, encoding="utf-8") as f:
+            assert f.read() == "<p>old</p>"
+
+
+def test_write_if_changed_links_identical_previous_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "page.html")
+        previous = os.path.join(tmpdir, "previous.html")
+        _write(previous, "<p>café</p>")
+        os.utime(previous, ns=(1, 1))
+
+        assert not generate_content.write_if_changed(
+            path, ["<p>", "café", "</p>"], previous=previous
+        )
+
+        assert os.path.samefile(path, previous)
+        assert os.stat(path).st_mtime_ns == 1
+
+
+@pytest.mark.parametrize("previous_text", [None, "<p>old</p>", "<p>new</p><p>"])
+def test_write_if_changed_writes_text_differing_from_previous(previous_text):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "page.html")
+        previous = os.path.join(tmpdir, "previous.html")
+        if previous_text is not None:
+            _write(previous, previous_text)
+
+        assert generate_content.write_if_changed(
+            path, ["<p>", "new", "</p>"], previous=previous
+        )
+
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == "<p>new</p>"
+        if previous_text is not None:
+            assert not os.path.samefile(path, previous)
+            with open(previous, encoding="utf-8") as f:
+                assert f.read() == previous_text
+
+
+def test_pages_are_linked_only_from_the_build_holding_them():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        live = os.path.join(tmpdir, "docs")
+        staging = os.path.join(tmpdir, "staging")
+        _write(template_path, "{{ Title }}")
+        _write(os.path.join(content_dir, "index.md"), "# Home")
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post")
+        generate_pages_recursive(content_dir, template_path, live)
+
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            staging,
+            RenderOptions(
+                previous_builds={
+                    os.path.join(tmpdir, "other"): live,
+                    os.path.join(staging, "blog"): os.path.join(live, "blog"),
+                }
+            ),
+        )
+
+        assert os.path.samefile(
+            os.path.join(staging, "blog", "post.html"),
+            os.path.join(live, "blog", "post.html"),
+        )
+        assert not os.path.samefile(
+            os.path.join(staging, "index.html"), os.path.join(live, "index.html")
+        )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_full_build_into_empty_staging_keeps_unchanged_pages(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        live = os.path.join(tmpdir, "docs")
+        staging = os.path.join(tmpdir, "staging")
+        _write(template_path, "{{ Title }}: {{ Content }}")
+        _write(os.path.join(content_dir, "index.md"), "# Home")
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post")
+        generate_pages_recursive(content_dir, template_path, live)
+        os.utime(os.path.join(live, "index.html"), ns=(1, 1))
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Edited")
+
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            staging,
+            RenderOptions(previous_builds={staging: live}),
+            jobs=jobs,
+        )
+
+        assert os.stat(os.path.join(staging, "index.html")).st_mtime_ns == 1
+        with open(os.path.join(staging, "blog", "post.html"), encoding="utf-8") as f:
+            assert f.read().startswith("Edited")
+        with open(os.path.join(live, "blog", "post.html"), encoding="utf-8") as f:
+            assert f.read().startswith("Post")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_pages_recursive_traces_every_page(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "{{ Content }}")
+        _write(os.path.join(content_dir, "index.md"), "# Home")
+        _write(os.path.join(content_dir, "blog", "post.md"), "# Post")
+
+        start_tracing()
+        try:
+            generate_pages_recursive(
+                content_dir, template_path, os.path.join(tmpdir, "docs"), jobs=jobs
+            )
+        finally:
+            events = stop_tracing()
+
+    pages = [event for event in events if event["name"] == PAGE_SPAN]
+    assert sorted(event["args"]["path"] for event in pages) == [
+        os.path.join(content_dir, "blog", "post.md"),
+        os.path.join(content_dir, "index.md"),
+    ]
+    stages = {event["name"] for event in events}
+    assert stages == {
+        PAGE_SPAN,
+        "template",
+        "parse",
+        "inline",
+        "render",
+    }
+    assert (os.getpid() in {event["pid"] for event in pages}) == (jobs == 1)
+
+
+def test_worker_returns_its_spans_with_the_page():
+    # Pool workers run these in other processes, out of coverage's sight.
+    # pylint: disable=protected-access
+    with tempfile.TemporaryDirectory() as tmpdir:
+        template_path = os.path.join(tmpdir, "template.html")
+        from_path = os.path.join(tmpdir, "index.md")
+        _write(template_path, "{{ Content }}")
+        _write(from_path, "# Home")
+        outputs = [("/", os.path.join(tmpdir, "index.html"))]
+
+        generate_content._init_worker(False, RenderOptions())
+        assert generate_content._generate_page_in_worker(
+            from_path, template_path, outputs
+        ) == ([outputs[0][1]], [])
+        generate_content._init_worker(True, RenderOptions())
+        try:
+            written, events = generate_content._generate_page_in_worker(
+                from_path, template_path, outputs
+            )
+        finally:
+            stop_tracing()
+
+    assert not written
+    assert events[-1]["name"] == PAGE_SPAN
+
+
+def test_generate_pages_recursive_reuses_cached_parses():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "<main>{{ Content }}</main>")
+        _write(os.path.join(content_dir, "index.md"), "# Home\n\n[a](/a)")
+        cache = ParseCache(os.path.join(tmpdir, "cache"), RENDERER_VERSION)
+
+        generate_pages_recursive(
+            content_dir, template_path, dest_dir, RenderOptions(parse_cache=cache)
+        )
+        _write(template_path, "<article>{{ Content }}</article>")
+        with mock.patch.object(parse_cache, "markdown_to_html_node") as parse_mock:
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                dest_dir,
+                RenderOptions(basepath="/site/", parse_cache=cache),
+            )
+        parse_mock.assert_not_called()
+
+        with open(os.path.join(dest_dir, "index.html"), encoding="utf-8") as f:
+            assert f.read() == (
+                '<article><div><h1>Home</h1><p><a href="/site/a">a</a></p></div>'
+                "</article>"
+            )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_pages_recursive_links_fingerprinted_assets(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, '<link href="/index.css">{{ Content }}')
+        _write(os.path.join(content_dir, "a.md"), "# A\n\n![a](/a.png) [b](/b.png)")
+        _write(os.path.join(content_dir, "b.md"), "# B")
+        urls = {"/index.css": "/index.1.css", "/a.png": "/a.1.png"}
+
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            RenderOptions(basepath="/site/", asset_urls=urls),
+            jobs=jobs,
+        )
+
+        with open(os.path.join(dest_dir, "a.html"), encoding="utf-8") as f:
+            assert f.read() == (
+                '<link href="/site/index.1.css"><div><h1>A</h1><p>'
+                '<img src="/site/a.1.png" alt="a" loading="lazy" decoding="async"/>'
+                '<a href="/site/b.png">b</a></p></div>'
+            )
+
+
+def test_generate_pages_recursive_incremental_rebuilds_on_asset_change():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, '<link href="/index.css">{{ Content }}')
+        _write(os.path.join(content_dir, "a.md"), "# A")
+        urls = {"/index.css": "/index.1.css"}
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            RenderOptions(asset_urls=urls),
+            incremental=True,
+        )
+
+        with mock.patch("src.generate_content.generate_page") as mock_generate_page:
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                dest_dir,
+                RenderOptions(asset_urls=urls),
+                incremental=True,
+            )
+            mock_generate_page.assert_not_called()
+            generate_pages_recursive(
+                content_dir,
+                template_path,
+                dest_dir,
+                RenderOptions(asset_urls={"/index.css": "/index.2.css"}),
+                incremental=True,
+            )
+            mock_generate_page.assert_called_once()
+
+
+def test_worker_renders_with_the_asset_urls_it_was_started_with():
+    # Pool workers run these in other processes, out of coverage's sight.
+    # pylint: disable=protected-access
+    with tempfile.TemporaryDirectory() as tmpdir:
+        template_path = os.path.join(tmpdir, "template.html")
+        from_path = os.path.join(tmpdir, "index.md")
+        _write(template_path, '<link href="/index.css">')
+        _write(from_path, "# Home")
+        outputs = [("/", os.path.join(tmpdir, "index.html"))]
+
+        generate_content._init_worker(
+            False,
+            RenderOptions(
+                asset_urls={"/index.css": "/index.1.css"},
+                image_sizes={"/a.png": (1, 2)},
+                image_srcsets={"/a.png": "/a-1w.png 1w"},
+            ),
+        )
+        try:
+            generate_content._generate_page_in_worker(from_path, template_path, outputs)
+        finally:
+            generate_content._init_worker(False, RenderOptions())
+
+        with open(outputs[0][1], encoding="utf-8") as f:
+            assert f.read() == '<link href="/index.1.css">'
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_pages_recursive_gives_images_their_sizes(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "{{ Content }}")
+        _write(os.path.join(content_dir, "a.md"), "# A\n\n![a](/a.png) ![b](/b.png)")
+        _write(os.path.join(content_dir, "b.md"), "# B")
+
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            RenderOptions(image_sizes={"/a.png": (640, 480)}),
+            jobs=jobs,
+        )
+
+        with open(os.path.join(dest_dir, "a.html"), encoding="utf-8") as f:
+            assert f.read() == (
+                '<div><h1>A</h1><p><img src="/a.png" alt="a" loading="lazy" '
+                'decoding="async" width="640" height="480"/><img src="/b.png" '
+                'alt="b" loading="lazy" decoding="async"/></p></div>'
+            )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_pages_recursive_gives_images_their_srcsets(jobs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        content_dir = os.path.join(tmpdir, "content")
+        dest_dir = os.path.join(tmpdir, "docs")
+        template_path = os.path.join(tmpdir, "template.html")
+        _write(template_path, "{{ Content }}")
+        _write(os.path.join(content_dir, "a.md"), "# A\n\n![a](/a.png)")
+        _write(os.path.join(content_dir, "b.md"), "# B")
+
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            RenderOptions(
+                basepath="/site/",
+                image_srcsets={"/a.png": "/a-480w.png 480w, /a.png 960w"},
+            ),
+            jobs=jobs,
+        )
+
+        with open(os.path.join(dest_dir, "a.html"), encoding="utf-8") as f:
+            assert f.read() == (
+                '<div><h1>A</h1><p><img src="/site/a.png" alt="a" loading="lazy" '
+                'decoding="async" srcset="/site/a-480w.png 480w, /site/a.png 960w"/>'
+                "</p></div>"
+            )
+
+
+def test_generate_page_gives_images_in_deep_trees_their_sizes_and_srcsets():
+    depth = sys.getrecursionlimit() * 5
+    node = ParentNode("blockquote", [LeafNode("img", "", {"src": "/a.png"})])
+    for _ in range(depth - 1):
+        node = ParentNode("blockquote", [node])
+    with tempfile.TemporaryDirectory() as tmpdir:
+        md_path = os.path.join(tmpdir, "page.md")
+        tpl_path = os.path.join(tmpdir, "template.html")
+        dest_path = os.path.join(tmpdir, "page.html")
+        _write(md_path, "# Deep")
+        _write(tpl_path, "{{ Content }}")
+
+        with mock.patch.object(
+            generate_content, "markdown_lines_to_html_node", _parses_to(node)
+        ):
+            generate_page(
+                md_path,
+                tpl_path,
+                dest_path,
+                RenderOptions(
+                    image_sizes={"/a.png": (640, 480)},
+                    image_srcsets={"/a.png": "/a-480w.png 480w, /a.png 640w"},
+                ),
+            )
+
+        with open(dest_path, encoding="utf-8") as f:
+            assert f.read() == (
+                "<blockquote>" * depth + '<img src="/a.png" width="640" height="480" '
+                'srcset="/a-480w.png 480w, /a.png 640w"/>' + "</blockquote>" * depth
+            )
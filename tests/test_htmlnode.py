@@ -1,6 +1,9 @@
+import io
+import operator
+import sys
 import unittest
 
-from src.htmlnode import HTMLNode, LeafNode, ParentNode
+from src.htmlnode import EMPTY_PROPS, FrozenProps, HTMLNode, LeafNode, ParentNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -168,3 +171,121 @@ class TestLeafNodeNoTag(unittest.TestCase):
     def test_leaf_to_html_regular_tag(self):
         node = LeafNode("em", "emphasized")
         self.assertEqual(node.to_html(), "<em>emphasized</em>")
+
+
+class TestStreamingHTML(unittest.TestCase):
+    """Unit tests for iter_html and write_html."""
+
+    def setUp(self) -> None:
+        self.node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("", "Hello "), LeafNode("b", "world")]),
+                LeafNode("img", "", props={"src": "/a.png", "alt": "a"}),
+            ],
+        )
+
+    def test_iter_html_joins_to_to_html(self) -> None:
+        chunks = list(self.node.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), self.node.to_html())
+
+    def test_write_html(self) -> None:
+        fp = io.StringIO()
+        self.node.write_html(fp)
+        self.assertEqual(
+            fp.getvalue(),
+            '<div><p>Hello <b>world</b></p><img src="/a.png" alt="a"/></div>',
+        )
+
+    def test_iter_html_validates_parent(self) -> None:
+        with self.assertRaises(ValueError):
+            next(ParentNode("div", []).iter_html())
+
+    def test_resolve_url_applies_to_url_attributes(self) -> None:
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", props={"href": "/", "title": "/"}),
+                LeafNode("img", "", props={"src": "/a.png", "alt": "/"}),
+                LeafNode("code", 'href="/x"'),
+            ],
+        )
+        self.assertEqual(
+            node.to_html(lambda url: "/site" + url),
+            '<p><a href="/site/" title="/">home</a><img src="/site/a.png" alt="/"/>'
+            '<code>href="/x"</code></p>',
+        )
+
+    def test_resolve_url_applies_to_srcset_candidates(self) -> None:
+        node = LeafNode(
+            "img", "", props={"src": "/a.png", "srcset": "/a-480w.png 480w, /a.png"}
+        )
+        self.assertEqual(
+            node.to_html(lambda url: "/site" + url),
+            '<img src="/site/a.png" srcset="/site/a-480w.png 480w, /site/a.png"/>',
+        )
+
+    def test_deep_nesting_does_not_recurse(self) -> None:
+        depth = sys.getrecursionlimit() * 5
+        node = ParentNode("blockquote", [LeafNode("", "x")])
+        for _ in range(depth - 1):
+            node = ParentNode("blockquote", [node])
+        html = node.to_html()
+        self.assertEqual(html, "<blockquote>" * depth + "x" + "</blockquote>" * depth)
+
+    def test_iter_html_with_custom_child_nodes(self) -> None:
+        class Raw(HTMLNode):
+            """A node writing its value as-is, without the HTMLNode helpers."""
+
+            __slots__ = ()
+
+            def to_html(self, resolve_url=None) -> str:
+                return self.value or ""
+
+        node = ParentNode("div", [ParentNode("p", [Raw(value="<hr>")]), Raw(value="!")])
+        self.assertEqual(node.to_html(), "<div><p><hr></p>!</div>")
+
+    def test_invalid_nested_parent_raises(self) -> None:
+        node = ParentNode("div", [LeafNode("b", "x"), ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_iter_html_not_implemented(self) -> None:
+        with self.assertRaises(NotImplementedError):
+            list(HTMLNode(tag="div").iter_html())
+
+
+class TestCompactNodes(unittest.TestCase):
+    """Unit tests for slotted nodes and FrozenProps."""
+
+    def test_nodes_have_no_instance_dict(self) -> None:
+        for node in (HTMLNode("div"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_nodes_without_props_share_empty_props(self) -> None:
+        first = LeafNode("b", "x")
+        second = ParentNode("p", [first], props={})
+        self.assertIs(first.props, EMPTY_PROPS)
+        self.assertIs(second.props, EMPTY_PROPS)
+        self.assertEqual(repr(HTMLNode("div")).split("props=")[1], "{})")
+
+    def test_frozen_props_mapping(self) -> None:
+        props = FrozenProps({"href": "/", "title": "Home"})
+        self.assertEqual(props["title"], "Home")
+        self.assertEqual(list(props), ["href", "title"])
+        self.assertEqual(len(props), 2)
+        self.assertEqual(props, {"href": "/", "title": "Home"})
+        self.assertEqual(
+            hash(props), hash(FrozenProps([("title", "Home"), ("href", "/")]))
+        )
+        self.assertEqual(repr(props), "{'href': '/', 'title': 'Home'}")
+        self.assertRaises(KeyError, operator.getitem, props, "src")
+        self.assertRaises(TypeError, operator.setitem, props, "href", "/x")
+
+    def test_frozen_props_render_like_dict(self) -> None:
+        frozen = LeafNode(
+            "a", "x", props=FrozenProps({"href": "/", "target": "_blank"})
+        )
+        plain = LeafNode("a", "x", props={"href": "/", "target": "_blank"})
+        self.assertEqual(frozen.to_html(), plain.to_html())
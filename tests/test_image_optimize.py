@@ -0,0 +1,498 @@
+import json
+import os
+import shutil
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType, SimpleNamespace
+from typing import cast
+from unittest import mock
+
+from src import image_optimize
+from src.asset_sync import sync_directory
+from src.build_manifest import BuildManifest
+from src.htmlnode import LeafNode, ParentNode
+from src.image_optimize import (
+    IMAGE_MANIFEST_NAME,
+    add_srcsets,
+    image_srcsets,
+    is_optimizable,
+    load_image_ops,
+    load_pillow,
+    optimize_images,
+    variant_path,
+)
+from tests import TempDirTestCase
+
+
+class FakeImage:
+    """
+    Stands in for a Pillow image. Its file holds its attributes as JSON on
+    the first line, and padding standing for pixel data a re-encode drops.
+    """
+
+    def __init__(self, width, height, **attributes):
+        self.width = width
+        self.height = height
+        self.mode = attributes.get("mode", "RGB")
+        self.format = attributes.get("image_format", "PNG")
+        self.info = attributes.get("info", {})
+        self.orientation = attributes.get("orientation", 1)
+        self.frames = attributes.get("frames", 1)
+
+    @property
+    def is_animated(self):
+        return self.frames > 1
+
+    @classmethod
+    def open(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.loads(f.readline()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def load(self):
+        return None
+
+    def save(self, path, image_format=None, padding=0, **options):
+        image_format = options.pop("format", image_format or self.format)
+        info = (
+            {"icc_profile": options["icc_profile"]} if "icc_profile" in options else {}
+        )
+        attributes = {
+            "width": self.width,
+            "height": self.height,
+            "mode": self.mode,
+            "image_format": image_format,
+            "info": info or self.info,
+            "orientation": self.orientation,
+            "frames": self.frames,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(attributes) + "\n" + "x" * padding)
+
+    def resize(self, size, resample):
+        assert resample == FAKE_PILLOW.Resampling.LANCZOS
+        return FakeImage(*size, mode=self.mode, info=self.info)
+
+    def convert(self, mode):
+        return FakeImage(self.width, self.height, mode=mode, info=self.info)
+
+
+def _exif_transpose(image):
+    # Orientations 5 to 8 turn the image a quarter.
+    if image.orientation < 5:
+        return image
+    return FakeImage(image.height, image.width, mode=image.mode, info=image.info)
+
+
+class _DecompressionBombError(Exception):
+    pass
+
+
+# Stand in for the PIL.Image and PIL.ImageOps modules of Pillow, which is an
+# optional dependency.
+FAKE_PILLOW = cast(
+    ModuleType,
+    SimpleNamespace(
+        open=FakeImage.open,
+        DecompressionBombError=_DecompressionBombError,
+        Resampling=SimpleNamespace(LANCZOS="lanczos"),
+    ),
+)
+FAKE_IMAGE_OPS = cast(ModuleType, SimpleNamespace(exif_transpose=_exif_transpose))
+
+
+class OptimizeTestCase(TempDirTestCase):
+    """Base class providing static images synced into an output directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(
+            mock.patch.object(image_optimize, "load_pillow", return_value=FAKE_PILLOW)
+        )
+        self.enterContext(
+            mock.patch.object(
+                image_optimize, "load_image_ops", return_value=FAKE_IMAGE_OPS
+            )
+        )
+        self.static = self.path("static")
+        self.docs = self.path("docs")
+        self.cache = self.path("cache")
+        # Stored with padding, so a lossless re-encode is smaller.
+        self.image("wide.png", FakeImage(1000, 500), padding=1000)
+        self.image(
+            "photo.jpg", FakeImage(1200, 1000, image_format="JPEG", orientation=6)
+        )
+        self.image("small.webp", FakeImage(300, 200, image_format="WEBP"))
+        self.write("static/index.css", "body {}")
+        self.sync()
+
+    def image(self, name, image, padding=0):
+        path = self.static_path(f"images/{name}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.save(path, padding=padding)
+        return path
+
+    def static_path(self, relative_path):
+        return os.path.join(self.static, relative_path)
+
+    def out(self, relative_path, directory=None):
+        return os.path.join(directory or self.docs, relative_path)
+
+    def sync(self, **kwargs):
+        sync_directory(self.static, self.docs, **kwargs)
+
+    def optimize(self, directory=None, **kwargs):
+        return optimize_images(directory or self.docs, self.cache, **kwargs)
+
+    def variants(self, directory=None):
+        directory = directory or self.docs
+        return sorted(
+            os.path.relpath(os.path.join(root, file), directory)
+            for root, _, files in os.walk(directory)
+            for file in files
+            if "-" in file
+        )
+
+    def size(self, relative_path):
+        image = FakeImage.open(self.out(relative_path))
+        return image.width, image.height
+
+
+class TestOptimizeImages(OptimizeTestCase):
+    """Unit tests for re-encoding images and writing their variants."""
+
+    def test_reencodes_png_and_writes_variants(self):
+        original_size = os.path.getsize(self.out("images/wide.png"))
+
+        result = self.optimize()
+
+        self.assertEqual(
+            result.optimized,
+            [
+                self.out("images/photo.jpg"),
+                self.out("images/small.webp"),
+                self.out("images/wide.png"),
+            ],
+        )
+        self.assertLess(os.path.getsize(self.out("images/wide.png")), original_size)
+        self.assertEqual(self.size("images/wide.png"), (1000, 500))
+        self.assertEqual(
+            self.variants(),
+            [
+                "images/photo-480w.jpg",
+                "images/photo-960w.jpg",
+                "images/wide-480w.png",
+                "images/wide-960w.png",
+            ],
+        )
+        self.assertEqual(self.size("images/wide-480w.png"), (480, 240))
+
+    def test_png_that_does_not_shrink_keeps_its_bytes(self):
+        self.image("tight.png", FakeImage(600, 400))
+        # Not a PNG at all, so not re-encoded as one.
+        self.image("misnamed.png", FakeImage(600, 400, image_format="JPEG"), 1000)
+        self.sync()
+        originals = {}
+        for name in ("tight.png", "misnamed.png"):
+            with open(self.out(f"images/{name}"), encoding="utf-8") as f:
+                originals[name] = f.read()
+
+        self.optimize()
+
+        for name, original in originals.items():
+            with open(self.out(f"images/{name}"), encoding="utf-8") as f:
+                self.assertEqual(f.read(), original)
+        self.assertIn("images/tight-480w.png", self.variants())
+
+    def test_jpeg_keeps_its_bytes_and_variants_follow_its_orientation(self):
+        with open(self.static_path("images/photo.jpg"), encoding="utf-8") as f:
+            original = f.read()
+
+        self.optimize()
+
+        with open(self.out("images/photo.jpg"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), original)
+        # Displayed a quarter turn from how it is stored: 1000 wide, 1200 high.
+        self.assertEqual(self.size("images/photo-480w.jpg"), (480, 576))
+
+    def test_unchanged_images_are_not_hashed_or_encoded(self):
+        self.optimize()
+        with (
+            mock.patch.object(image_optimize, "hash_file") as hash_mock,
+            mock.patch.object(image_optimize, "_optimize_image") as optimize_mock,
+        ):
+            result = self.optimize()
+        hash_mock.assert_not_called()
+        optimize_mock.assert_not_called()
+        self.assertEqual(result.optimized, [])
+        self.assertEqual(len(result.reused), 3)
+
+    def test_cached_results_are_linked_into_other_builds(self):
+        self.optimize()
+        other = self.path("other")
+        sync_directory(self.static, other)
+
+        with mock.patch.object(image_optimize, "_optimize_image") as optimize_mock:
+            result = self.optimize(other)
+
+        optimize_mock.assert_not_called()
+        self.assertEqual(result.optimized, [])
+        self.assertEqual(self.variants(other), self.variants())
+        for path in ("images/wide.png", "images/wide-480w.png"):
+            self.assertTrue(
+                os.path.samefile(self.out(path), self.out(path, directory=other))
+            )
+
+    def test_resynced_image_is_placed_from_cache(self):
+        self.optimize()
+        optimized_size = os.path.getsize(self.out("images/wide.png"))
+        os.unlink(self.out("images/wide.png"))
+        self.sync()
+
+        with mock.patch.object(image_optimize, "_optimize_image") as optimize_mock:
+            result = self.optimize()
+
+        optimize_mock.assert_not_called()
+        self.assertIn(self.out("images/wide.png"), result.reused)
+        self.assertEqual(os.path.getsize(self.out("images/wide.png")), optimized_size)
+
+    def test_changed_settings_replace_stale_variants(self):
+        self.optimize()
+        result = self.optimize(widths=(640,))
+        self.assertEqual(len(result.optimized), 3)
+        self.assertIn(self.out("images/wide-480w.png"), result.removed)
+        self.assertEqual(
+            self.variants(), ["images/photo-640w.jpg", "images/wide-640w.png"]
+        )
+
+    def test_variants_of_removed_images_are_removed(self):
+        self.optimize()
+        os.unlink(self.static_path("images/wide.png"))
+        self.sync()
+
+        result = self.optimize()
+
+        self.assertEqual(
+            result.removed,
+            [self.out("images/wide-480w.png"), self.out("images/wide-960w.png")],
+        )
+        self.assertNotIn(
+            "images/wide.png",
+            BuildManifest.load(self.docs, IMAGE_MANIFEST_NAME).pages,
+        )
+
+    def test_linked_static_files_are_not_written_through(self):
+        with open(self.static_path("images/wide.png"), encoding="utf-8") as f:
+            original = f.read()
+        shutil.rmtree(self.docs)
+        self.sync(link=True)
+        self.assertTrue(
+            os.path.samefile(
+                self.static_path("images/wide.png"), self.out("images/wide.png")
+            )
+        )
+
+        self.optimize()
+
+        with open(self.static_path("images/wide.png"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), original)
+
+    def test_images_are_encoded_in_a_pool(self):
+        # Threads share the stand-in Pillow, which worker processes would not.
+        with mock.patch.object(
+            image_optimize, "ProcessPoolExecutor", ThreadPoolExecutor
+        ):
+            result = self.optimize(jobs=2)
+        self.assertEqual(len(result.optimized), 3)
+        self.assertEqual(len(self.variants()), 4)
+
+    def test_unreadable_and_animated_images_are_left_alone(self):
+        with open(self.static_path("images/broken.png"), "w", encoding="utf-8") as f:
+            f.write("not an image")
+        self.image("animated.webp", FakeImage(600, 400, frames=2))
+        self.sync()
+
+        self.optimize()
+        os.unlink(self.out("images/broken.png"))
+        self.sync()
+        with mock.patch.object(image_optimize, "_optimize_image") as optimize_mock:
+            self.optimize()
+
+        optimize_mock.assert_not_called()
+        self.assertNotIn("images/broken-480w.png", self.variants())
+        self.assertNotIn("images/animated-480w.webp", self.variants())
+        with open(self.out("images/broken.png"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "not an image")
+
+    def test_palette_and_transparent_images_are_converted_for_variants(self):
+        self.image("palette.png", FakeImage(800, 400, mode="P"))
+        self.image("palette.jpg", FakeImage(800, 400, mode="P"))
+        self.image("alpha.jpg", FakeImage(800, 400, mode="RGBA", image_format="JPEG"))
+        self.sync()
+
+        self.optimize()
+
+        for name, mode in (
+            ("palette-480w.png", "RGBA"),
+            ("palette-480w.jpg", "RGB"),
+            ("alpha-480w.jpg", "RGB"),
+        ):
+            self.assertEqual(FakeImage.open(self.out(f"images/{name}")).mode, mode)
+
+    def test_icc_profile_is_kept_in_variants(self):
+        self.image(
+            "profiled.jpg",
+            FakeImage(800, 400, image_format="JPEG", info={"icc_profile": "profile"}),
+        )
+        self.sync()
+
+        self.optimize()
+
+        variant = FakeImage.open(self.out("images/profiled-480w.jpg"))
+        self.assertEqual(variant.info.get("icc_profile"), "profile")
+
+
+class TestHelpers(OptimizeTestCase):
+    """Unit tests for the cache entries, srcsets and Pillow loading."""
+
+    def test_concurrent_encodes_keep_the_first_entry(self):
+        entry_dir = os.path.join(self.cache, "ab", "abc")
+
+        # Another build caches the same image while this one encodes it.
+        def fill_entry(image):
+            os.makedirs(entry_dir)
+            with open(
+                os.path.join(entry_dir, "result.json"), "w", encoding="utf-8"
+            ) as f:
+                f.write('{"image": false, "width": null, "variants": []}')
+            return image
+
+        image_ops = SimpleNamespace(exif_transpose=fill_entry)
+        with (
+            mock.patch.object(image_optimize, "_entry_dir", return_value=entry_dir),
+            mock.patch.object(image_optimize, "load_image_ops", return_value=image_ops),
+        ):
+            result = self.optimize(widths=(480,))
+
+        self.assertEqual(len(result.optimized), 3)
+        self.assertEqual(os.listdir(entry_dir), ["result.json"])
+        self.assertEqual(os.listdir(os.path.dirname(entry_dir)), ["abc"])
+        self.assertEqual(self.variants(), [])
+
+    def test_encoding_needs_pillow(self):
+        with (
+            mock.patch.object(image_optimize, "load_pillow", return_value=None),
+            self.assertRaises(RuntimeError),
+        ):
+            self.optimize(widths=(640,))
+
+    def test_load_pillow(self):
+        module = object()
+        with mock.patch("importlib.import_module", return_value=module) as import_mock:
+            self.assertIs(load_pillow(), module)
+            self.assertIs(load_image_ops(), module)
+        self.assertEqual(
+            import_mock.call_args_list,
+            [mock.call("PIL.Image"), mock.call("PIL.ImageOps")],
+        )
+        with mock.patch("importlib.import_module", side_effect=ImportError):
+            self.assertIsNone(load_pillow())
+
+    def test_image_srcsets_use_source_urls(self):
+        self.sync(fingerprint=True)
+        self.optimize()
+        srcsets = image_srcsets(self.docs)
+        self.assertEqual(sorted(srcsets), ["/images/photo.jpg", "/images/wide.png"])
+        wide = next(
+            key
+            for key in BuildManifest.load(self.docs, IMAGE_MANIFEST_NAME).pages
+            if key.startswith("images/wide.")
+        )
+        self.assertEqual(
+            srcsets["/images/wide.png"],
+            f"/{variant_path(wide, 480)} 480w, /{variant_path(wide, 960)} 960w, "
+            f"/{wide} 1000w",
+        )
+
+    def test_add_srcsets(self):
+        image = LeafNode("img", "", {"src": "/a.png", "alt": "a"})
+        other = LeafNode("img", "", {"src": "/b.png", "alt": "b"})
+        tree = ParentNode("div", [ParentNode("p", [image]), other])
+
+        add_srcsets(tree, {"/a.png": "/a-480w.png 480w, /a.png 960w"})
+        add_srcsets(tree, {"/a.png": "/other.png 1w"})
+
+        self.assertEqual(
+            image.to_html(),
+            '<img src="/a.png" alt="a" srcset="/a-480w.png 480w, /a.png 960w"/>',
+        )
+        self.assertEqual(other.to_html(), '<img src="/b.png" alt="b"/>')
+
+    def test_paths(self):
+        self.assertEqual(variant_path("images/a.png", 480), "images/a-480w.png")
+        self.assertTrue(is_optimizable("images/A.JPEG"))
+        self.assertFalse(is_optimizable("images/a.gif"))
+
+
+@unittest.skipIf(load_pillow() is None, "Pillow is not installed")
+class TestWithPillow(TempDirTestCase):
+    """Integration tests encoding real images with Pillow, when installed."""
+
+    def setUp(self):
+        super().setUp()
+        self.pillow = cast(ModuleType, load_pillow())
+        self.static = self.path("static")
+        self.docs = self.path("docs")
+        os.makedirs(os.path.join(self.static, "images"))
+
+    def gradient(self, width, height):
+        image = self.pillow
+        vertical = image.linear_gradient("L").resize((width, height))
+        horizontal = vertical.transpose(image.Transpose.ROTATE_90).resize(
+            (width, height)
+        )
+        return image.merge(
+            "RGB", [horizontal, vertical, image.new("L", (width, height))]
+        )
+
+    def optimize(self):
+        sync_directory(self.static, self.docs)
+        return optimize_images(self.docs, self.path("cache"), jobs=2)
+
+    def test_png_is_reencoded_losslessly(self):
+        # Stored without compression, so a lossless re-encode is smaller.
+        self.gradient(1000, 500).save(
+            self.path("static/images/wide.png"), compress_level=0
+        )
+        self.gradient(600, 300).save(self.path("static/images/other.png"))
+
+        result = self.optimize()
+
+        self.assertEqual(len(result.optimized), 2)
+        path = os.path.join(self.docs, "images/wide.png")
+        self.assertLess(
+            os.path.getsize(path), os.path.getsize(self.path("static/images/wide.png"))
+        )
+        with self.pillow.open(path) as optimized:
+            self.assertEqual(optimized.tobytes(), self.gradient(1000, 500).tobytes())
+        with self.pillow.open(os.path.join(self.docs, "images/wide-480w.png")) as v:
+            self.assertEqual(v.size, (480, 240))
+
+    def test_variants_follow_exif_orientation(self):
+        exif = self.pillow.Exif()
+        exif[0x0112] = 6
+        self.gradient(1200, 1000).save(self.path("static/images/photo.jpg"), exif=exif)
+
+        self.optimize()
+
+        with self.pillow.open(os.path.join(self.docs, "images/photo-480w.jpg")) as v:
+            self.assertEqual(v.size, (480, 576))
+
+
+if __name__ == "__main__":
+    unittest.main()
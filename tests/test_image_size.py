@@ -0,0 +1,153 @@
+import struct
+import unittest
+
+from src.build_manifest import BuildManifest
+from src.htmlnode import LeafNode, ParentNode
+from src.image_size import add_image_sizes, image_sizes, is_image, read_image_size
+from tests import TempDirTestCase
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n"
+    + struct.pack(">I", 13)
+    + b"IHDR"
+    + struct.pack(">II", 640, 480)
+)
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0" * 8
+WEBP_LOSSY = (
+    b"RIFF\0\0\0\0WEBPVP8 \0\0\0\0"
+    + b"\0\0\0\x9d\x01\x2a"
+    + struct.pack("<HH", 400, 300)
+)
+WEBP_LOSSLESS = (
+    b"RIFF\0\0\0\0WEBPVP8L\0\0\0\0\x2f"
+    + struct.pack("<I", (400 - 1) | (300 - 1) << 14)
+    + b"\0" * 5
+)
+WEBP_EXTENDED = (
+    b"RIFF\0\0\0\0WEBPVP8X\0\0\0\0\0\0\0\0"
+    + (4000 - 1).to_bytes(3, "little")
+    + (3000 - 1).to_bytes(3, "little")
+)
+
+
+def _segment(marker, payload):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _exif(order, orientation):
+    fmt = "<" if order == b"II" else ">"
+    entry = struct.pack(f"{fmt}HHIHH", 0x0112, 3, 1, orientation, 0)
+    other = struct.pack(f"{fmt}HHII", 0x010F, 2, 4, 0)
+    tiff = order + struct.pack(f"{fmt}HI", 42, 8) + struct.pack(f"{fmt}H", 2)
+    return b"Exif\0\0" + tiff + other + entry
+
+
+def _jpeg(*segments, width=1024, height=768):
+    frame = _segment(0xC0, struct.pack(">BHHB", 8, height, width, 3) + b"\0" * 9)
+    return b"\xff\xd8" + b"".join(segments) + frame + _segment(0xDA, b"\0" * 10)
+
+
+class TestReadImageSize(TempDirTestCase):
+    """Unit tests for read_image_size."""
+
+    def size(self, data):
+        path = self.path("image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return read_image_size(path)
+
+    def test_formats(self):
+        cases = {
+            "png": (PNG, (640, 480)),
+            "gif": (GIF, (32, 16)),
+            "webp lossy": (WEBP_LOSSY, (400, 300)),
+            "webp lossless": (WEBP_LOSSLESS, (400, 300)),
+            "webp extended": (WEBP_EXTENDED, (4000, 3000)),
+            "jpeg": (_jpeg(), (1024, 768)),
+        }
+        for name, (data, expected) in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.size(data), expected)
+
+    def test_jpeg_skips_segments_markers_and_fill_bytes(self):
+        data = _jpeg(
+            _segment(0xE0, b"JFIF\0" + b"\0" * 9),
+            b"\xff\x01",
+            b"\xff\xff",
+            _segment(0xE1, b"http://ns.adobe.com/xap/1.0/\0"),
+            _segment(0xDB, b"\0" * 65),
+        )
+        self.assertEqual(self.size(data), (1024, 768))
+
+    def test_jpeg_exif_orientation_swaps_dimensions(self):
+        for order in (b"II", b"MM"):
+            for orientation, expected in ((1, (1024, 768)), (6, (768, 1024))):
+                with self.subTest(order=order, orientation=orientation):
+                    data = _jpeg(_segment(0xE1, _exif(order, orientation)))
+                    self.assertEqual(self.size(data), expected)
+
+    def test_jpeg_with_broken_exif_keeps_dimensions(self):
+        for exif in (
+            b"Exif\0\0XX",
+            b"Exif\0\0II*\0\xff\0\0\0",
+            _exif(b"II", 6)[:-12],
+            b"Exif\0\0II*\0\x08\0\0\0\x01\0" + struct.pack("<HHII", 0x010F, 2, 4, 0),
+        ):
+            with self.subTest(exif=exif):
+                self.assertEqual(self.size(_jpeg(_segment(0xE1, exif))), (1024, 768))
+
+    def test_unknown_or_truncated_headers(self):
+        for data in (
+            b"",
+            b"not an image",
+            PNG[:20],
+            GIF[:8],
+            b"RIFF\0\0\0\0WEBPVP8Z" + b"\0" * 14,
+            b"\xff\xd8",
+            b"\xff\xd8\xff",
+            b"\xff\xd8\x00",
+            b"\xff\xd8\xff\xe0\x00",
+            b"\xff\xd8\xff\xe0\x00\x01",
+            b"\xff\xd8" + _segment(0xDA, b"\0" * 4),
+            b"\xff\xd8" + _segment(0xE0, b"\0" * 4),
+        ):
+            with self.subTest(data=data):
+                self.assertIsNone(self.size(data))
+
+    def test_is_image(self):
+        self.assertTrue(is_image("images/a.PNG"))
+        self.assertTrue(is_image("photo.jpeg"))
+        self.assertFalse(is_image("index.css"))
+
+
+class TestImageSizes(unittest.TestCase):
+    """Unit tests for image_sizes and add_image_sizes."""
+
+    def test_image_sizes_uses_source_urls(self):
+        manifest = BuildManifest(
+            "docs/.assets.json",
+            {
+                "a.png": {"width": "1", "height": "2"},
+                "b.0123456789.png": {"source": "b.png", "width": "3", "height": "4"},
+                "index.css": {"size": "10"},
+            },
+        )
+        self.assertEqual(image_sizes(manifest), {"/a.png": (1, 2), "/b.png": (3, 4)})
+
+    def test_add_image_sizes(self):
+        known = LeafNode("img", "", {"src": "/a.png", "alt": "a"})
+        unknown = LeafNode("img", "", {"src": "/b.png", "alt": "b"})
+        sized = LeafNode("img", "", {"src": "/a.png", "width": "5"})
+        tree = ParentNode("div", [ParentNode("p", [known, unknown]), sized])
+
+        add_image_sizes(tree, {"/a.png": (640, 480)})
+
+        self.assertEqual(
+            known.to_html(), '<img src="/a.png" alt="a" width="640" height="480"/>'
+        )
+        self.assertEqual(unknown.to_html(), '<img src="/b.png" alt="b"/>')
+        self.assertEqual(sized.to_html(), '<img src="/a.png" width="5"/>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -36,6 +36,22 @@ class TestSplitNodeDelimiter(unittest.TestCase):
         assert new_nodes[4] == TextNode("example", TextType.CODE)
         assert new_nodes[5] == TextNode(" of splitting", TextType.TEXT)
 
+    def test_split_nodes_delimiter_skips_blank_parts(self) -> None:
+        """
+        Test that nodes without the delimiter are kept and blank parts dropped.
+        """
+        old_nodes = [
+            TextNode("plain", TextType.TEXT),
+            TextNode("**bold**", TextType.TEXT),
+        ]
+
+        new_nodes = split_nodes_delimiter(old_nodes, "**", TextType.BOLD)
+
+        assert new_nodes == [
+            TextNode("plain", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+        ]
+
 
 class TestExtractMarkdown(unittest.TestCase):
     """Unit tests for extracting markdown images and links."""
@@ -144,6 +160,16 @@ class TestTextToTextNodes(unittest.TestCase):
             [TextNode("This is a simple sentence.", TextType.TEXT)], nodes
         )
 
+    def test_text_to_textnodes_blank_text(self) -> None:
+        """
+        Test text_to_textnodes keeps empty and whitespace-only text as one node.
+        """
+        for text in ("", "  "):
+            with self.subTest(text=text):
+                self.assertListEqual(
+                    [TextNode(text, TextType.TEXT)], text_to_textnodes(text)
+                )
+
     def test_text_to_textnodes_bold(self) -> None:
         """
         Test text_to_textnodes with bold formatting.
@@ -0,0 +1,99 @@
+import unittest
+
+from src.inline_scanner import scan_inline
+from src.textnode import TextNode, TextType
+
+
+class TestScanInline(unittest.TestCase):
+    """Unit tests for the scan_inline function."""
+
+    def test_plain_text(self) -> None:
+        self.assertListEqual(
+            [TextNode("Just text.", TextType.TEXT)], scan_inline("Just text.")
+        )
+
+    def test_empty_text(self) -> None:
+        self.assertListEqual([TextNode("", TextType.TEXT)], scan_inline(""))
+
+    def test_whitespace_between_markup_is_dropped(self) -> None:
+        self.assertListEqual(
+            [TextNode("a", TextType.BOLD), TextNode("b", TextType.CODE)],
+            scan_inline("**a** `b` "),
+        )
+
+    def test_delimiters_and_links(self) -> None:
+        self.assertListEqual(
+            [
+                TextNode("bold", TextType.BOLD),
+                TextNode(" then ", TextType.TEXT),
+                TextNode("alt", TextType.IMAGE, "/images/a.png"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("home", TextType.LINK, "/"),
+                TextNode("code", TextType.CODE),
+            ],
+            scan_inline("**bold** then ![alt](/images/a.png) and [home](/)`code`"),
+        )
+
+    def test_link_url_keeps_underscores(self) -> None:
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("the docs", TextType.LINK, "https://example.com/a_b_c"),
+            ],
+            scan_inline("see [the docs](https://example.com/a_b_c)"),
+        )
+
+    def test_delimiter_does_not_cross_link(self) -> None:
+        self.assertListEqual(
+            [
+                TextNode("snake_case ", TextType.TEXT),
+                TextNode("x", TextType.LINK, "a_b"),
+            ],
+            scan_inline("snake_case [x](a_b)"),
+        )
+
+    def test_code_span_is_not_reparsed(self) -> None:
+        self.assertListEqual(
+            [TextNode("use ", TextType.TEXT), TextNode("my_var", TextType.CODE)],
+            scan_inline("use `my_var`"),
+        )
+
+    def test_unmatched_delimiters_are_literal(self) -> None:
+        self.assertListEqual(
+            [TextNode("2 ** 3 and a_b", TextType.TEXT)],
+            scan_inline("2 ** 3 and a_b"),
+        )
+
+    def test_incomplete_link_is_literal(self) -> None:
+        self.assertListEqual(
+            [TextNode("[not a link](", TextType.TEXT)], scan_inline("[not a link](")
+        )
+
+    def test_bracket_without_url_is_literal(self) -> None:
+        self.assertListEqual(
+            [TextNode("[a] and [b]", TextType.TEXT)], scan_inline("[a] and [b]")
+        )
+
+    def test_link_does_not_cross_newline(self) -> None:
+        self.assertListEqual(
+            [
+                TextNode("[a\n](b) ", TextType.TEXT),
+                TextNode("c", TextType.LINK, "d"),
+            ],
+            scan_inline("[a\n](b) [c](d)"),
+        )
+
+    def test_label_ends_at_first_bracket_paren(self) -> None:
+        self.assertListEqual(
+            [TextNode("a [b", TextType.LINK, "c")], scan_inline("[a [b](c)")
+        )
+
+    def test_whitespace_only_segments_are_dropped(self) -> None:
+        self.assertListEqual(
+            [TextNode("a", TextType.BOLD), TextNode("b", TextType.ITALIC)],
+            scan_inline("**a** _b_ ** **"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
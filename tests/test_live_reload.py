@@ -0,0 +1,102 @@
+import os
+import queue
+import unittest
+
+from src.live_reload import (
+    ChangeBroker,
+    add_write_listener,
+    clear_write_listeners,
+    inject_client,
+    notify_written,
+    remove_write_listener,
+)
+
+
+class TestWriteListeners(unittest.TestCase):
+    """Unit tests for the build's write notifications."""
+
+    def tearDown(self):
+        clear_write_listeners()
+
+    def test_listeners_are_called_until_removed(self):
+        written: list[str] = []
+        add_write_listener(written.append)
+        notify_written("docs/index.html")
+        remove_write_listener(written.append)
+        notify_written("docs/other.html")
+        self.assertEqual(written, ["docs/index.html"])
+
+    def test_clear_removes_every_listener(self):
+        written: list[str] = []
+        add_write_listener(written.append)
+        clear_write_listeners()
+        notify_written("docs/index.html")
+        self.assertEqual(written, [])
+
+
+class TestChangeBroker(unittest.TestCase):
+    """Unit tests for routing changes to subscribed pages."""
+
+    def drain(self, events):
+        urls = []
+        while True:
+            try:
+                urls.append(events.get_nowait())
+            except queue.Empty:
+                return urls
+
+    def test_pages_only_reach_their_subscribers(self):
+        broker = ChangeBroker("docs")
+        home = broker.subscribe("/")
+        post = broker.subscribe("/blog/post.html")
+        broker.publish("/index.html")
+        broker.publish("/blog/post.html")
+        broker.publish("/index.css")
+        self.assertEqual(self.drain(home), ["/index.html", "/index.css"])
+        self.assertEqual(self.drain(post), ["/blog/post.html", "/index.css"])
+
+    def test_unsubscribed_queues_get_nothing(self):
+        broker = ChangeBroker("docs")
+        events = broker.subscribe("/")
+        self.assertEqual(broker.subscriber_count, 1)
+        broker.unsubscribe(events)
+        self.assertEqual(broker.subscriber_count, 0)
+        broker.publish("/index.css")
+        self.assertEqual(self.drain(events), [])
+
+    def test_file_written_maps_output_paths_to_urls(self):
+        broker = ChangeBroker("docs", "/static_site/")
+        events = broker.subscribe("/static_site/blog/")
+        broker.file_written(os.path.join("docs", "blog", "index.html"))
+        broker.file_written(os.path.join("elsewhere", "index.css"))
+        self.assertEqual(self.drain(events), ["/static_site/blog/index.html"])
+
+    def test_pages_with_reserved_characters_match_encoded_paths(self):
+        broker = ChangeBroker("docs")
+        # As sent by the client: location.pathname is already encoded.
+        events = broker.subscribe("/blog/my%20post.html")
+        broker.file_written(os.path.join("docs", "blog", "my post.html"))
+        broker.file_written(os.path.join("docs", "blog", "other.html"))
+        broker.file_written(os.path.join("docs", "my style.css"))
+        self.assertEqual(
+            self.drain(events), ["/blog/my%20post.html", "/my%20style.css"]
+        )
+
+
+class TestInjectClient(unittest.TestCase):
+    """Unit tests for adding the live-reload client to pages."""
+
+    def test_script_goes_before_closing_body(self):
+        html = inject_client(b"<body><p>x</p></body></html>", "/site/")
+        self.assertTrue(html.startswith(b"<body><p>x</p><script>"))
+        self.assertTrue(html.endswith(b"</script>\n</body></html>"))
+        self.assertIn(b'"/site/__livereload?page="', html)
+
+    def test_script_is_appended_without_body(self):
+        html = inject_client(b"<p>x</p>")
+        self.assertTrue(html.startswith(b"<p>x</p><script>"))
+        self.assertIn(b'"/__livereload?page="', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.build_manifest import hash_file
+from src.build_trace import PAGE_SPAN, span, start_tracing
+from src.generate_content import RenderOptions
+from src.main import (
+    build,
+    clear_directory,
+    copy_static_to_docs,
+    parse_args,
+    parse_target,
+    report_publish_delta,
+    report_trace,
+)
+from src.output_swap import staging_path, swap_directories
+from src.publish_delta import DELTA_NAME, PublishDelta
+from tests import TempDirTestCase
+from tests.test_image_optimize import FAKE_PILLOW
+from tests.test_precompress import FAKE_BROTLI
+
+
+class TestParseArgs(unittest.TestCase):
+    """Unit tests for the command line parsing in main."""
+
+    def test_defaults(self):
+        args = parse_args([])
+        self.assertEqual(args.basepath, "/")
+        self.assertFalse(args.incremental)
+        self.assertEqual(args.jobs, 1)
+        self.assertEqual(args.target, [])
+        self.assertFalse(args.watch)
+        self.assertFalse(args.serve)
+        self.assertEqual(args.port, 8888)
+        self.assertFalse(args.checksum_static)
+        self.assertFalse(args.link_static)
+        self.assertFalse(args.precompress)
+        self.assertFalse(args.fingerprint)
+        self.assertFalse(args.optimize_images)
+        self.assertEqual(args.image_cache, ".image-cache")
+        self.assertIsNone(args.parse_cache)
+        self.assertEqual(args.parse_cache_size, 64)
+        self.assertIsNone(args.trace)
+        self.assertEqual(args.trace_top, 10)
+
+    def test_basepath_and_options(self):
+        args = parse_args(
+            [
+                "/static_site/",
+                "--incremental",
+                "-j",
+                "4",
+                "--target",
+                "/=preview",
+                "--target",
+                "/staging/=staging",
+                "--checksum-static",
+                "--link-static",
+                "--precompress",
+                "--watch",
+                "--serve",
+                "--port",
+                "8000",
+                "--parse-cache",
+                ".cache",
+                "--parse-cache-size",
+                "8",
+                "--trace",
+                "trace.json",
+                "--trace-top",
+                "3",
+            ]
+        )
+        self.assertEqual(args.basepath, "/static_site/")
+        self.assertTrue(args.incremental)
+        self.assertEqual(args.jobs, 4)
+        self.assertEqual(args.target, [("/", "preview"), ("/staging/", "staging")])
+        self.assertTrue(args.watch)
+        self.assertTrue(args.serve)
+        self.assertEqual(args.port, 8000)
+        self.assertTrue(args.checksum_static)
+        self.assertTrue(args.link_static)
+        self.assertTrue(args.precompress)
+        self.assertEqual(args.parse_cache, ".cache")
+        self.assertEqual(args.parse_cache_size, 8)
+        self.assertEqual(args.trace, "trace.json")
+        self.assertEqual(args.trace_top, 3)
+
+    def test_fingerprint(self):
+        self.assertTrue(parse_args(["--fingerprint"]).fingerprint)
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--fingerprint", "--watch"])
+
+    def test_optimize_images(self):
+        args = parse_args(["--optimize-images", "--image-cache", "cache"])
+        self.assertTrue(args.optimize_images)
+        self.assertEqual(args.image_cache, "cache")
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--optimize-images", "--watch"])
+
+    def test_duplicate_targets_are_rejected(self):
+        for targets, message in (
+            (["/=a", "/x/=b", "/=c"], "base path '/'"),
+            (["/=a", "/x/=a/"], "'a/' twice"),
+            (["/=./docs"], "'./docs' twice"),
+        ):
+            with (
+                self.subTest(targets=targets),
+                mock.patch("sys.stderr") as stderr,
+                self.assertRaises(SystemExit),
+            ):
+                parse_args([f"--target={target}" for target in targets])
+            self.assertIn(message, "".join(c.args[0] for c in stderr.write.mock_calls))
+
+    def test_parse_target_rejects_malformed_values(self):
+        for value in ("preview", "=preview", "/="):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_target(value)
+
+
+class TestReportTrace(unittest.TestCase):
+    """Unit tests for writing and summarising the build trace."""
+
+    def test_writes_trace_and_lists_slowest_pages(self):
+        start_tracing()
+        with span(PAGE_SPAN, path="content/index.md"):
+            pass
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            with mock.patch("builtins.print") as print_mock:
+                report_trace(path, 5)
+            self.assertTrue(os.path.isfile(path))
+        lines = [call.args[0] for call in print_mock.call_args_list]
+        self.assertEqual(lines[:2], [f"Wrote trace to {path}", "Slowest 1 page(s):"])
+        self.assertTrue(lines[2].endswith(" ms  content/index.md"))
+
+    def test_untraced_pages_are_not_listed(self):
+        start_tracing()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            with mock.patch("builtins.print") as print_mock:
+                report_trace(path, 5)
+        print_mock.assert_called_once_with(f"Wrote trace to {path}")
+
+
+class TestReportPublishDelta(TempDirTestCase):
+    """Unit tests for comparing a staged build with the live site."""
+
+    def setUp(self):
+        super().setUp()
+        self.docs = self.path("docs")
+        self.staging = self.path(".docs.staging")
+        os.makedirs(self.staging)
+
+    def test_first_build_adds_everything(self):
+        self.write(".docs.staging/index.html", "home")
+        with mock.patch("builtins.print") as print_mock:
+            delta = report_publish_delta(self.docs, self.staging)
+        self.assertEqual(delta, PublishDelta(["index.html"], [], []))
+        self.assertTrue(os.path.isfile(os.path.join(self.staging, DELTA_NAME)))
+        print_mock.assert_called_once_with(
+            f"{self.docs}: 1 added, 0 changed, 0 removed "
+            f"(see {os.path.join(self.docs, DELTA_NAME)})"
+        )
+
+    def test_compares_with_live_site(self):
+        for directory, pages in (
+            (self.docs, {"index.html": "home", "old.html": "old", "a.css": "a"}),
+            (self.staging, {"index.html": "new home", "new.html": "new", "a.css": "a"}),
+        ):
+            for name, content in pages.items():
+                self.write(os.path.join(directory, name), content)
+        with mock.patch("builtins.print"):
+            delta = report_publish_delta(self.docs, self.staging)
+        self.assertEqual(
+            delta, PublishDelta(["new.html"], ["index.html"], ["old.html"])
+        )
+
+
+class WorkingDirTestCase(TempDirTestCase):
+    """Base class running each test in its temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.root)
+
+
+class TestStaticCopy(WorkingDirTestCase):
+    """Unit tests for clearing docs/ and copying static/ into it."""
+
+    def setUp(self):
+        super().setUp()
+        for path in ("static/index.css", "static/images/a.png", "docs/old/page.html"):
+            self.write(path, path)
+        os.symlink("missing", "docs/link")
+
+    def test_clear_directory_removes_everything(self):
+        clear_directory("docs")
+        self.assertEqual(os.listdir("docs"), [])
+        clear_directory("absent")
+
+    def test_clear_directory_leaves_special_files(self):
+        os.mkfifo("docs/pipe")
+        clear_directory("docs")
+        self.assertEqual(os.listdir("docs"), ["pipe"])
+
+    def test_copy_static_to_docs(self):
+        result = copy_static_to_docs()
+        self.assertEqual(
+            sorted(os.listdir("docs")), [".assets.json", "images", "index.css"]
+        )
+        self.assertEqual(len(result.copied), 2)
+        with open("docs/images/a.png", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "static/images/a.png")
+
+    def test_copy_static_with_fingerprints(self):
+        copy_static_to_docs(fingerprint=True)
+        css = [name for name in os.listdir("docs") if name.endswith(".css")]
+        self.assertEqual(len(css), 1)
+        self.assertRegex(css[0], r"^index\.[0-9a-f]{10}\.css$")
+        with open("docs/_headers", encoding="utf-8") as f:
+            self.assertIn(f"/{css[0]}\n", f.read())
+
+    def test_copy_static_without_clearing(self):
+        copy_static_to_docs(clear=False, dst="docs")
+        result = copy_static_to_docs(clear=False, dst="docs", checksum=True, link=True)
+        self.assertEqual(result.copied, [])
+        self.assertEqual(
+            sorted(os.listdir("docs")),
+            [".assets.json", "images", "index.css", "link", "old"],
+        )
+
+
+class TestBuild(WorkingDirTestCase):
+    """End-to-end tests for building a site into staging and swapping it in."""
+
+    def setUp(self):
+        super().setUp()
+        for path, content in (
+            ("content/index.md", "# Home\n\n" + "Compressible text. " * 100),
+            ("content/blog/post.md", "# Post\n\n[Home](/)"),
+            ("static/index.css", "body { color: red; }\n" * 50),
+            ("template.html", "<title>{{ Title }}</title>{{ Content }}"),
+        ):
+            self.write(path, content)
+
+    def build(self, *argv):
+        args = parse_args(list(argv))
+        with mock.patch("builtins.print"):
+            build(args, RenderOptions(basepath=args.basepath), jobs=1)
+
+    def test_outputs_are_finished_in_staging_before_the_swap(self):
+        swapped = []
+
+        def check_staged(stage, dst):
+            self.assertEqual(stage, staging_path(dst))
+            self.assertFalse(os.path.exists(dst))
+            for name in (DELTA_NAME, "index.html", "index.html.gz", "index.css.gz"):
+                self.assertTrue(os.path.isfile(os.path.join(stage, name)), name)
+            swapped.append(dst)
+            swap_directories(stage, dst)
+
+        with (
+            mock.patch("src.main.load_brotli", return_value=None),
+            mock.patch("src.main.swap_directories", side_effect=check_staged),
+        ):
+            self.build("--precompress", "--target", "/preview/=preview")
+
+        self.assertEqual(swapped, ["docs", "preview"])
+        with open("preview/blog/post.html", encoding="utf-8") as f:
+            self.assertIn('href="/preview/"', f.read())
+        self.assertTrue(os.path.isfile(os.path.join("docs", DELTA_NAME)))
+
+    def test_second_full_build_leaves_unchanged_pages_alone(self):
+        with mock.patch("src.main.load_brotli", return_value=FAKE_BROTLI):
+            self.build("--precompress")
+            os.utime("docs/index.html", ns=(0, 0))
+            with open("content/blog/post.md", "a", encoding="utf-8") as f:
+                f.write("\n\nMore.")
+
+            with mock.patch(
+                "src.publish_delta.hash_file", side_effect=hash_file
+            ) as hash_mock:
+                self.build("--precompress")
+
+        # Pages linked from the live site keep the hashes recorded there.
+        hashed = {call.args[0] for call in hash_mock.call_args_list}
+        self.assertIn(os.path.join(staging_path("docs"), "blog", "post.html"), hashed)
+        self.assertNotIn(os.path.join(staging_path("docs"), "index.html"), hashed)
+
+        self.assertEqual(os.stat("docs/index.html").st_mtime_ns, 0)
+        self.assertTrue(os.path.isfile("docs/index.html.br"))
+        with open(os.path.join("docs", DELTA_NAME), encoding="utf-8") as f:
+            self.assertEqual(
+                json.load(f),
+                {"added": [], "changed": ["blog/post.html"], "removed": []},
+            )
+
+    def test_incremental_build_with_images_and_trace(self):
+        with mock.patch("src.main.load_pillow", return_value=None):
+            self.build("--incremental", "--optimize-images")
+        with (
+            mock.patch("src.main.load_pillow", return_value=FAKE_PILLOW),
+            mock.patch("src.image_optimize.load_pillow", return_value=FAKE_PILLOW),
+        ):
+            self.build(
+                "--incremental",
+                "--optimize-images",
+                "--fingerprint",
+                "--trace",
+                "trace.json",
+            )
+        with open("trace.json", encoding="utf-8") as f:
+            self.assertIn('"pages"', f.read())
+        with open("docs/index.html", encoding="utf-8") as f:
+            self.assertIn("Compressible text.", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from src.markdown_html import markdown_to_html_node
+from src.markdown_html import markdown_lines_to_html_node, markdown_to_html_node
 
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
@@ -97,6 +98,11 @@ Some paragraph text.
 <blockquote>A quote</blockquote><ol><li>First</li><li>Second</li></ol></div>",
         )
 
+    def test_lines_match_string(self):
+        md = "# Title\n\nSome **bold** text.\n\n- Item 1\n- Item 2\n"
+        node = markdown_lines_to_html_node(io.StringIO(md))
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+
 
 if __name__ == "__main__":
     unittest.main()
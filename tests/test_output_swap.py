@@ -0,0 +1,91 @@
+import os
+import unittest
+from unittest import mock
+
+from src import output_swap
+from src.output_swap import (
+    prepare_staging,
+    remove_in_background,
+    staging_path,
+    swap_directories,
+)
+from tests import TempDirTestCase
+
+
+class OutputSwapTestCase(TempDirTestCase):
+    """Base class providing an output directory holding a previous build."""
+
+    def setUp(self):
+        super().setUp()
+        self.docs = os.path.join(self.root, "docs")
+        self.write("docs/index.html", "old")
+
+
+class TestStaging(OutputSwapTestCase):
+    """Unit tests for staging_path and prepare_staging."""
+
+    def test_staging_path_is_a_hidden_sibling(self):
+        self.assertEqual(staging_path("docs/"), ".docs.staging")
+        self.assertEqual(
+            staging_path(self.docs), os.path.join(self.root, ".docs.staging")
+        )
+
+    def test_prepare_creates_an_empty_directory(self):
+        staging = prepare_staging(self.docs)
+        self.assertEqual(os.listdir(staging), [])
+
+    def test_prepare_reuses_or_removes_the_previous_build(self):
+        staging = prepare_staging(self.docs)
+        self.write(".docs.staging/index.html", "previous")
+        self.assertEqual(prepare_staging(self.docs, reuse=True), staging)
+        self.assertEqual(self.read(staging, "index.html"), "previous")
+
+        with mock.patch.object(
+            output_swap, "remove_in_background", wraps=remove_in_background
+        ) as remove_mock:
+            prepare_staging(self.docs)
+        remove_mock.assert_called_once_with(staging)
+        self.assertEqual(os.listdir(staging), [])
+
+
+class TestSwapDirectories(OutputSwapTestCase):
+    """Unit tests for swap_directories and remove_in_background."""
+
+    def test_first_build_is_renamed_into_place(self):
+        staging = prepare_staging(os.path.join(self.root, "site"))
+        self.write(".site.staging/index.html", "new")
+        swap_directories(staging, os.path.join(self.root, "site"))
+        self.assertEqual(self.read(self.root, "site", "index.html"), "new")
+        self.assertFalse(os.path.exists(staging))
+
+    def test_swap_keeps_the_previous_build_in_staging(self):
+        staging = prepare_staging(self.docs)
+        self.write(".docs.staging/index.html", "new")
+        swap_directories(staging, self.docs)
+        self.assertEqual(self.read(self.docs, "index.html"), "new")
+        self.assertEqual(self.read(staging, "index.html"), "old")
+
+    def test_swap_falls_back_to_renames(self):
+        staging = prepare_staging(self.docs)
+        self.write(".docs.staging/index.html", "new")
+        with mock.patch.object(output_swap, "_exchange", return_value=False):
+            swap_directories(staging, self.docs)
+        self.assertEqual(self.read(self.docs, "index.html"), "new")
+        self.assertEqual(self.read(staging, "index.html"), "old")
+        self.assertEqual(sorted(os.listdir(self.root)), [".docs.staging", "docs"])
+
+    def test_swap_without_renameat2(self):
+        staging = prepare_staging(self.docs)
+        self.write(".docs.staging/index.html", "new")
+        with mock.patch.object(output_swap.ctypes, "CDLL", side_effect=AttributeError):
+            swap_directories(staging, self.docs)
+        self.assertEqual(self.read(self.docs, "index.html"), "new")
+        self.assertEqual(self.read(staging, "index.html"), "old")
+
+    def test_remove_in_background(self):
+        remove_in_background(self.docs).join()
+        self.assertEqual(os.listdir(self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest import mock
+
+from src import parse_cache
+from src.htmlnode import FrozenProps, HTMLNode
+from src.markdown_html import markdown_to_html_node
+from src.parse_cache import ParseCache
+from tests import TempDirTestCase
+
+MARKDOWN = "# Title\n\nSome **bold** [link](/a) and ![img](/b.png)\n\n- one\n- two"
+
+
+class ParseCacheTestCase(TempDirTestCase):
+    """Base class providing an empty cache directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = self.path("cache")
+        self.cache = ParseCache(self.directory, "1")
+
+    def entries(self):
+        return sorted(
+            os.path.join(root, file)
+            for root, _, files in os.walk(self.directory)
+            for file in files
+        )
+
+
+class TestParse(ParseCacheTestCase):
+    """Unit tests for ParseCache.parse."""
+
+    def test_hit_skips_parsing_and_matches_parse(self):
+        first = self.cache.parse(MARKDOWN)
+        with mock.patch.object(parse_cache, "markdown_to_html_node") as parse_mock:
+            second = self.cache.parse(MARKDOWN)
+        parse_mock.assert_not_called()
+        self.assertEqual(second.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(second.to_html(), first.to_html())
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_hit_keeps_props_compact(self):
+        self.cache.parse(MARKDOWN)
+        (link,) = [
+            node
+            for node in self.cache.parse(MARKDOWN).children[1].children
+            if node.tag == "a"
+        ]
+        self.assertIsInstance(link.props, FrozenProps)
+        self.assertEqual(dict(link.props), {"href": "/a"})
+
+    def test_version_and_source_are_part_of_the_key(self):
+        self.cache.parse(MARKDOWN)
+        ParseCache(self.directory, "2").parse(MARKDOWN)
+        self.cache.parse(MARKDOWN + "!")
+        self.assertEqual(len(self.entries()), 3)
+
+    def test_corrupt_entry_is_parsed_again(self):
+        self.cache.parse(MARKDOWN)
+        (entry,) = self.entries()
+        with open(entry, "wb") as f:
+            f.write(b"\x00garbage")
+        node = self.cache.parse(MARKDOWN)
+        self.assertEqual(node.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(self.cache.parse(MARKDOWN).to_html(), node.to_html())
+
+    def test_unknown_nodes_are_not_cached(self):
+        node = HTMLNode("div")
+        with mock.patch.object(parse_cache, "markdown_to_html_node", return_value=node):
+            self.assertIs(self.cache.parse(MARKDOWN), node)
+        self.assertEqual(self.entries(), [])
+
+
+class TestPrune(ParseCacheTestCase):
+    """Unit tests for ParseCache.prune."""
+
+    def test_least_recently_used_entries_are_evicted(self):
+        entries = {}
+        for age, markdown in enumerate(["# a", "# b", "# c"]):
+            before = set(self.entries())
+            self.cache.parse(markdown)
+            (path,) = set(self.entries()) - before
+            os.utime(path, ns=(age * 10**9, age * 10**9))
+            entries[markdown] = path
+        # A hit makes "# a" the most recently used entry.
+        self.cache.parse("# a")
+        size = os.path.getsize(entries["# c"])
+
+        self.cache.max_bytes = 2 * size
+        self.assertEqual(self.cache.prune(), [entries["# b"]])
+        self.assertEqual(self.cache.prune(), [])
+        self.assertEqual(self.entries(), sorted([entries["# a"], entries["# c"]]))
+
+        self.cache.max_bytes = 0
+        self.assertEqual(len(self.cache.prune()), 2)
+        self.assertEqual(self.entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
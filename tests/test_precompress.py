@@ -0,0 +1,161 @@
+import gzip
+import os
+import unittest
+import zlib
+from types import ModuleType, SimpleNamespace
+from typing import cast
+from unittest import mock
+
+from src import precompress
+from src.build_manifest import BuildManifest
+from src.precompress import (
+    PRECOMPRESS_MANIFEST_NAME,
+    discard_sidecars,
+    gzip_compress,
+    load_brotli,
+    precompress_directory,
+)
+from tests import TempDirTestCase
+
+PAGE = "<p>" + "hello world " * 100 + "</p>"
+
+# Stands in for the brotli module, which is an optional dependency.
+FAKE_BROTLI = cast(
+    ModuleType,
+    SimpleNamespace(compress=lambda data, quality: b"br" + zlib.compress(data)),
+)
+
+
+class PrecompressTestCase(TempDirTestCase):
+    """Base class providing an output directory with a few files."""
+
+    def setUp(self):
+        super().setUp()
+        self.docs = self.path("docs")
+        self.page = os.path.join(self.docs, "blog", "post.html")
+        self.write(self.page, PAGE)
+        self.write(os.path.join(self.docs, "tiny.css"), "body{}")
+        self.write(os.path.join(self.docs, "image.png"), PAGE)
+        self.write(os.path.join(self.docs, ".manifest.json"), PAGE)
+
+    def files(self, directory):
+        return sorted(
+            os.path.relpath(os.path.join(root, file), directory)
+            for root, _, files in os.walk(directory)
+            for file in files
+            if not file.startswith(".")
+        )
+
+
+class TestPrecompressDirectory(PrecompressTestCase):
+    """Unit tests for writing and reusing compressed sidecars."""
+
+    def test_compresses_text_files_worth_compressing(self):
+        result = precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        self.assertEqual(result.compressed, [f"{self.page}.gz", f"{self.page}.br"])
+        self.assertEqual(
+            self.files(self.docs),
+            [
+                "blog/post.html",
+                "blog/post.html.br",
+                "blog/post.html.gz",
+                "image.png",
+                "tiny.css",
+            ],
+        )
+        with gzip.open(f"{self.page}.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), PAGE)
+
+    def test_incompressible_file_gets_no_sidecar(self):
+        self.write(f"{self.page}.gz", "stale")
+        with mock.patch.object(precompress, "MAX_RATIO", 0):
+            result = precompress_directory(self.docs)
+        self.assertEqual(result.compressed, [])
+        self.assertFalse(os.path.exists(f"{self.page}.gz"))
+
+    def test_unchanged_file_reuses_its_sidecars(self):
+        precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        with mock.patch.object(precompress, "gzip_compress") as compress_mock:
+            result = precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        compress_mock.assert_not_called()
+        self.assertEqual(result.reused, [f"{self.page}.gz", f"{self.page}.br"])
+
+    def test_changed_file_or_compressors_compress_again(self):
+        precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        self.assertEqual(len(precompress_directory(self.docs).compressed), 1)
+        self.assertFalse(os.path.exists(f"{self.page}.br"))
+        self.write(self.page, PAGE + PAGE)
+        self.assertEqual(len(precompress_directory(self.docs).compressed), 1)
+        os.unlink(f"{self.page}.gz")
+        self.assertEqual(len(precompress_directory(self.docs).compressed), 1)
+
+    def test_sidecars_of_removed_files_are_removed(self):
+        precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        os.unlink(self.page)
+        result = precompress_directory(self.docs)
+        self.assertEqual(result.removed, [f"{self.page}.gz", f"{self.page}.br"])
+        self.assertEqual(
+            BuildManifest.load(self.docs, PRECOMPRESS_MANIFEST_NAME).pages, {}
+        )
+
+    def test_links_sidecars_from_previous_build(self):
+        precompress_directory(self.docs)
+        staging = self.path(".docs.staging")
+        staged_page = os.path.join(staging, "blog", "post.html")
+        self.write(staged_page, PAGE)
+        self.write(f"{staged_page}.br", "stale")
+
+        with mock.patch.object(precompress, "gzip_compress") as compress_mock:
+            result = precompress_directory(staging, previous=self.docs)
+
+        compress_mock.assert_not_called()
+        self.assertEqual(result.reused, [f"{staged_page}.gz"])
+        self.assertEqual(self.files(staging), ["blog/post.html", "blog/post.html.gz"])
+        self.assertTrue(os.path.samefile(f"{staged_page}.gz", f"{self.page}.gz"))
+        # The staged manifest now records the linked sidecar as its own.
+        with mock.patch.object(precompress, "gzip_compress") as compress_mock:
+            self.assertEqual(
+                precompress_directory(staging).reused, [f"{staged_page}.gz"]
+            )
+
+    def test_rewriting_linked_sidecar_leaves_previous_build_alone(self):
+        precompress_directory(self.docs)
+        staging = self.path(".docs.staging")
+        staged_page = os.path.join(staging, "blog", "post.html")
+        self.write(staged_page, PAGE)
+        precompress_directory(staging, previous=self.docs)
+        self.write(staged_page, PAGE + PAGE)
+
+        precompress_directory(staging, previous=self.docs)
+
+        with gzip.open(f"{self.page}.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), PAGE)
+        with gzip.open(f"{staged_page}.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), PAGE + PAGE)
+
+
+class TestHelpers(PrecompressTestCase):
+    """Unit tests for the compressors and write listener."""
+
+    def test_gzip_is_deterministic(self):
+        self.assertEqual(gzip_compress(b"data"), gzip_compress(b"data"))
+        self.assertEqual(gzip.decompress(gzip_compress(b"data")), b"data")
+
+    def test_load_brotli(self):
+        module = object()
+        with mock.patch("importlib.import_module", return_value=module):
+            self.assertIs(load_brotli(), module)
+        with mock.patch("importlib.import_module", side_effect=ImportError):
+            self.assertIsNone(load_brotli())
+
+    def test_discard_sidecars(self):
+        precompress_directory(self.docs, brotli=FAKE_BROTLI)
+        discard_sidecars(self.page)
+        discard_sidecars(os.path.join(self.docs, "tiny.css"))
+        self.assertEqual(
+            self.files(self.docs), ["blog/post.html", "image.png", "tiny.css"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
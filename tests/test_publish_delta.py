@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src import publish_delta
+from src.build_manifest import BuildManifest
+from src.precompress import PRECOMPRESS_MANIFEST_NAME
+from src.publish_delta import (
+    DELTA_NAME,
+    PUBLISH_MANIFEST_NAME,
+    PublishDelta,
+    compute_delta,
+    scan_outputs,
+    write_delta,
+)
+from tests import TempDirTestCase
+
+
+class TestScanOutputs(TempDirTestCase):
+    """Unit tests for recording the content hash of every output."""
+
+    def setUp(self):
+        super().setUp()
+        self.docs = self.path("docs")
+        self.write(os.path.join(self.docs, "index.html"), "home")
+        self.write(os.path.join(self.docs, "blog", "post.html"), "post")
+        self.write(os.path.join(self.docs, ".assets.json"), "{}")
+        self.write(os.path.join(self.docs, ".images.json"), "{}")
+        os.symlink("missing", os.path.join(self.docs, "link"))
+
+    def test_records_published_files_only(self):
+        record = scan_outputs(self.docs)
+        self.assertEqual(sorted(record.pages), ["blog/post.html", "index.html"])
+        self.assertEqual(
+            BuildManifest.load(self.docs, PUBLISH_MANIFEST_NAME).pages, record.pages
+        )
+
+    def test_ignores_sidecar_manifest(self):
+        self.write(os.path.join(self.docs, PRECOMPRESS_MANIFEST_NAME), "{}")
+        self.write(os.path.join(self.docs, "index.html.gz"), "gzip")
+        record = scan_outputs(self.docs)
+        self.assertEqual(
+            sorted(record.pages), ["blog/post.html", "index.html", "index.html.gz"]
+        )
+
+    def test_rescan_hashes_only_rewritten_files(self):
+        scan_outputs(self.docs)
+        self.write(os.path.join(self.docs, "index.html"), "new home")
+        with mock.patch.object(
+            publish_delta, "hash_file", wraps=publish_delta.hash_file
+        ) as hash_mock:
+            record = scan_outputs(self.docs)
+        hash_mock.assert_called_once_with(os.path.join(self.docs, "index.html"))
+        self.assertEqual(
+            record.pages["blog/post.html"]["sha256"],
+            publish_delta.hash_file(os.path.join(self.docs, "blog", "post.html")),
+        )
+
+    def test_scan_without_saving_leaves_the_directory_alone(self):
+        record = scan_outputs(self.docs, save=False)
+        self.assertEqual(sorted(record.pages), ["blog/post.html", "index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, PUBLISH_MANIFEST_NAME)))
+
+    def test_files_linked_from_another_record_keep_its_hashes(self):
+        live = scan_outputs(self.docs, save=False)
+        staging = self.path("staging")
+        os.makedirs(os.path.join(staging, "blog"))
+        for name in ("index.html", os.path.join("blog", "post.html")):
+            os.link(os.path.join(self.docs, name), os.path.join(staging, name))
+        self.write(os.path.join(staging, "new.html"), "new")
+
+        with mock.patch.object(
+            publish_delta, "hash_file", wraps=publish_delta.hash_file
+        ) as hash_mock:
+            record = scan_outputs(staging, linked_from=live)
+
+        hash_mock.assert_called_once_with(os.path.join(staging, "new.html"))
+        self.assertEqual(
+            record.pages["index.html"]["sha256"], live.pages["index.html"]["sha256"]
+        )
+        self.assertEqual(
+            BuildManifest.load(staging, PUBLISH_MANIFEST_NAME).pages, record.pages
+        )
+
+
+class TestComputeDelta(unittest.TestCase):
+    """Unit tests for comparing a build with the live site."""
+
+    def test_lists_added_changed_and_removed_paths(self):
+        live = BuildManifest(
+            "live",
+            {"a.html": {"sha256": "1"}, "b.html": {"sha256": "2"}, "c.css": {}},
+        )
+        build = BuildManifest(
+            "build",
+            {"a.html": {"sha256": "1"}, "b.html": {"sha256": "3"}, "d.png": {}},
+        )
+        self.assertEqual(
+            compute_delta(live, build),
+            PublishDelta(added=["d.png"], changed=["b.html"], removed=["c.css"]),
+        )
+
+    def test_write_delta(self):
+        delta = PublishDelta(added=["a.html"], changed=[], removed=["b.html"])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, DELTA_NAME)
+            write_delta(path, delta)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f), delta._asdict())
+            self.assertEqual(os.listdir(tmpdir), [DELTA_NAME])
+
+
+if __name__ == "__main__":
+    unittest.main()
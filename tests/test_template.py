@@ -0,0 +1,153 @@
+import os
+import unittest
+from unittest import mock
+
+from src import template as template_module
+from src.template import (
+    Slot,
+    Url,
+    compile_template,
+    find_template,
+    load_template,
+)
+from tests import TempDirTestCase
+
+
+class TestCompileTemplate(TempDirTestCase):
+    """Unit tests for compile_template and Template rendering."""
+
+    def test_segments(self):
+        path = self.write(
+            "t.html", "<title>{{ Title }}</title><main>{{Content}}</main>"
+        )
+        template = compile_template(path)
+        self.assertEqual(
+            template.segments,
+            [
+                "<title>",
+                Slot("Title", "{{ Title }}"),
+                "</title><main>",
+                Slot("Content", "{{Content}}"),
+                "</main>",
+            ],
+        )
+
+    def test_url_attributes_are_resolved(self):
+        path = self.write("t.html", '<link href="/index.css" /><img src="a.png">')
+        template = compile_template(path)
+        self.assertEqual(
+            template.segments,
+            ['<link href="', Url("/index.css"), '" /><img src="', Url("a.png"), '">'],
+        )
+        self.assertEqual(
+            template.render({}, lambda url: url.upper()),
+            '<link href="/INDEX.CSS" /><img src="A.PNG">',
+        )
+        self.assertEqual(
+            template.render({}), '<link href="/index.css" /><img src="a.png">'
+        )
+
+    def test_render_streams_callable_values(self):
+        path = self.write("t.html", "{{ Title }}: {{ Content }}")
+        template = compile_template(path)
+        chunks = list(
+            template.iter_render({"Title": "T", "Content": lambda: iter(["a", "b"])})
+        )
+        self.assertEqual(chunks, ["T", ": ", "a", "b"])
+
+    def test_unknown_slot_is_left_as_written(self):
+        path = self.write("t.html", "{{ Title }} {{ Author }}")
+        self.assertEqual(
+            compile_template(path).render({"Title": "T"}), "T {{ Author }}"
+        )
+
+    def test_partials_are_inlined(self):
+        self.write("partials/head.html", "<head>{{ Title }}</head>")
+        path = self.write(
+            "t.html", "<html>{{> partials/head.html }}{{ Content }}</html>"
+        )
+        template = compile_template(path)
+        self.assertEqual(
+            template.render({"Title": "T", "Content": "C"}),
+            "<html><head>T</head>C</html>",
+        )
+        self.assertEqual(len(template.dependencies), 2)
+
+    def test_partial_cycle_raises(self):
+        self.write("a.html", "{{> b.html }}")
+        self.write("b.html", "{{> a.html }}")
+        with self.assertRaises(ValueError):
+            compile_template(os.path.join(self.root, "a.html"))
+
+    def test_digest_covers_partials(self):
+        self.write("p.html", "one")
+        path = self.write("t.html", "{{> p.html }}")
+        before = compile_template(path).digest
+        self.write("p.html", "two")
+        self.assertNotEqual(compile_template(path).digest, before)
+
+
+class TestLoadTemplate(TempDirTestCase):
+    """Unit tests for the compiled template cache."""
+
+    def test_cached_until_changed(self):
+        path = self.write("t.html", "{{ Title }}")
+        with mock.patch.object(
+            template_module, "compile_template", wraps=compile_template
+        ) as compile_mock:
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            self.assertEqual(compile_mock.call_count, 1)
+
+            self.write("t.html", "<b>{{ Title }}</b>")
+            self.assertEqual(load_template(path).render({"Title": "T"}), "<b>T</b>")
+            self.assertEqual(compile_mock.call_count, 2)
+
+    def test_partial_change_invalidates(self):
+        self.write("p.html", "one")
+        path = self.write("t.html", "{{> p.html }}")
+        self.assertEqual(load_template(path).render({}), "one")
+        self.write("p.html", "three")
+        self.assertEqual(load_template(path).render({}), "three")
+
+    def test_deleted_partial_invalidates(self):
+        partial = self.write("p.html", "one")
+        path = self.write("t.html", "{{> p.html }}")
+        load_template(path)
+        os.remove(partial)
+        with self.assertRaises(OSError):
+            load_template(path)
+
+
+class TestFindTemplate(TempDirTestCase):
+    """Unit tests for per-directory template overrides."""
+
+    def test_default_without_override(self):
+        page = self.write("content/blog/post.md", "# Post")
+        content = os.path.join(self.root, "content")
+        self.assertEqual(find_template(page, content, "template.html"), "template.html")
+
+    def test_nearest_override_wins(self):
+        content = os.path.join(self.root, "content")
+        root_override = self.write("content/template.html", "root")
+        blog_override = self.write("content/blog/template.html", "blog")
+        post = self.write("content/blog/2024/post.md", "# Post")
+        index = self.write("content/index.md", "# Home")
+        self.assertEqual(find_template(post, content, "default"), blog_override)
+        self.assertEqual(find_template(index, content, "default"), root_override)
+
+    def test_ignores_templates_outside_content_root(self):
+        self.write("template.html", "outside")
+        page = self.write("content/page.md", "# Page")
+        content = os.path.join(self.root, "content")
+        self.assertEqual(find_template(page, content, "default"), "default")
+
+    def test_page_outside_content_root_uses_default(self):
+        self.write("content/template.html", "override")
+        page = self.write("drafts/page.md", "# Page")
+        content = os.path.join(self.root, "content")
+        self.assertEqual(find_template(page, content, "default"), "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
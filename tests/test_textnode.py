@@ -27,6 +27,10 @@ class TestTextNode(unittest.TestCase):
         )
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self) -> None:
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_repr(self) -> None:
         node = TextNode("This is a text node", TextType.BOLD, url="https://example.com")
         expected_repr = (
@@ -0,0 +1,46 @@
+import unittest
+
+from src.urls import basepath_resolver, resolve_srcset
+
+
+class TestBasepathResolver(unittest.TestCase):
+    """Unit tests for the basepath_resolver function."""
+
+    def test_root_relative_urls_get_basepath(self):
+        resolve = basepath_resolver("/static_site/")
+        self.assertEqual(resolve("/"), "/static_site/")
+        self.assertEqual(resolve("/images/a.png"), "/static_site/images/a.png")
+
+    def test_other_urls_are_unchanged(self):
+        resolve = basepath_resolver("/static_site/")
+        for url in ("https://example.com/", "//cdn.example.com/a.js", "a.png", "#x"):
+            self.assertEqual(resolve(url), url)
+
+    def test_default_basepath_is_identity(self):
+        self.assertEqual(basepath_resolver()("/images/a.png"), "/images/a.png")
+
+    def test_asset_urls_are_fingerprinted_before_basepath(self):
+        urls = {"/index.css": "/index.0123456789.css"}
+        resolve = basepath_resolver("/static_site/", urls)
+        self.assertEqual(resolve("/index.css"), "/static_site/index.0123456789.css")
+        self.assertEqual(
+            resolve("/index.css?v=1#top"), "/static_site/index.0123456789.css?v=1#top"
+        )
+        self.assertEqual(resolve("/other.css"), "/static_site/other.css")
+        self.assertEqual(basepath_resolver("/", urls)("/index.css"), urls["/index.css"])
+
+
+class TestResolveSrcset(unittest.TestCase):
+    """Unit tests for the resolve_srcset function."""
+
+    def test_every_candidate_is_resolved(self):
+        resolve = basepath_resolver("/static_site/")
+        self.assertEqual(
+            resolve_srcset("/a-480w.png 480w,/a-960w.png  960w, /a.png", resolve),
+            "/static_site/a-480w.png 480w, /static_site/a-960w.png  960w, "
+            "/static_site/a.png",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
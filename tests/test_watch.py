@@ -0,0 +1,318 @@
+import os
+import struct
+import unittest
+from unittest import mock
+
+from src import watch
+from src.asset_sync import ASSET_MANIFEST_NAME, sync_directory
+from src.build_manifest import BuildManifest
+from src.generate_content import RenderOptions
+from src.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    create_watcher,
+    rebuild_changes,
+    watch_site,
+)
+from tests import TempDirTestCase
+
+# Event masks from <sys/inotify.h>.
+IN_MODIFY = 0x00000002
+IN_Q_OVERFLOW = 0x00004000
+
+
+class WatchTestCase(TempDirTestCase):
+    """Base class providing a small site in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post")
+        self.write("static/index.css", "body {}")
+
+    def rebuild(self, *names):
+        paths = [os.path.join(self.root, name) for name in names]
+        rebuild_changes(paths, self.content, self.static, self.template, self.docs)
+
+
+class TestRebuildChanges(WatchTestCase):
+    """Unit tests for the targeted rebuilds in watch mode."""
+
+    def test_markdown_change_regenerates_only_that_page(self):
+        with mock.patch.object(watch, "generate_page") as generate_mock:
+            self.rebuild("content/blog/post.md")
+        generate_mock.assert_called_once_with(
+            os.path.join(self.content, "blog", "post.md"),
+            self.template,
+            os.path.join(self.docs, "blog", "post.html"),
+            options=None,
+        )
+
+    def test_markdown_change_writes_page(self):
+        self.write("content/index.md", "# Welcome")
+        self.rebuild("content/index.md")
+        self.assertEqual(
+            self.read("docs/index.html"), "<h1>Welcome</h1><div><h1>Welcome</h1></div>"
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+
+    def test_deleted_markdown_removes_page(self):
+        self.rebuild("content/index.md")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.rebuild("content/index.md")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_static_change_copies_only_that_file(self):
+        sync_directory(self.static, self.docs)
+        css_inode = os.stat(os.path.join(self.docs, "index.css")).st_ino
+        self.write("static/images/a.png", "png")
+        with mock.patch("builtins.print") as print_mock:
+            self.rebuild("static/images/a.png")
+        print_mock.assert_called_once_with(
+            f"Copied: {os.path.join(self.docs, 'images', 'a.png')}"
+        )
+        self.assertEqual(self.read("docs/images/a.png"), "png")
+        self.assertEqual(
+            os.stat(os.path.join(self.docs, "index.css")).st_ino, css_inode
+        )
+        self.assertIn(
+            "images/a.png", BuildManifest.load(self.docs, ASSET_MANIFEST_NAME).pages
+        )
+
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.rebuild("static/images/a.png")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+
+    def test_static_change_replaces_linked_file(self):
+        sync_directory(self.static, self.docs, link=True)
+        with open(os.path.join(self.static, "index.css"), "a", encoding="utf-8") as f:
+            f.write("p {}")
+        os.utime(os.path.join(self.static, "index.css"), ns=(1, 1))
+
+        self.rebuild("static/index.css")
+
+        self.assertEqual(self.read("docs/index.css"), "body {}p {}")
+        self.assertFalse(
+            os.path.samefile(
+                os.path.join(self.static, "index.css"),
+                os.path.join(self.docs, "index.css"),
+            )
+        )
+
+    def test_static_change_keeps_fingerprinted_names(self):
+        sync_directory(self.static, self.docs, fingerprint=True)
+        self.write("static/index.css", "p {}")
+        self.rebuild("static/index.css")
+        (css,) = [name for name in os.listdir(self.docs) if name.endswith(".css")]
+        self.assertNotEqual(css, "index.css")
+        with open(os.path.join(self.docs, css), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "p {}")
+
+    def test_template_change_rebuilds_every_page(self):
+        with mock.patch.object(watch, "generate_pages_recursive") as rebuild_mock:
+            with mock.patch.object(watch, "generate_page") as generate_mock:
+                self.rebuild("template.html", "content/index.md")
+        rebuild_mock.assert_called_once_with(
+            self.content,
+            self.template,
+            self.docs,
+            None,
+            jobs=1,
+        )
+        generate_mock.assert_not_called()
+
+    def test_directory_template_change_rebuilds_every_page(self):
+        self.write("content/blog/template.html", "<b>{{ Title }}</b>")
+        self.rebuild("content/blog/template.html")
+        self.assertEqual(self.read("docs/blog/post.html"), "<b>Post</b>")
+        self.assertEqual(
+            self.read("docs/index.html"), "<h1>Home</h1><div><h1>Home</h1></div>"
+        )
+
+    def test_deleted_content_directory_removes_its_pages(self):
+        self.rebuild("content/blog/post.md")
+        self.write("docs/blog/image.png", "png")
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        os.rmdir(os.path.join(self.content, "blog"))
+        self.rebuild("content/blog", "content/notes")
+        self.assertEqual(os.listdir(os.path.join(self.docs, "blog")), ["image.png"])
+
+    def test_new_content_directory_generates_its_pages(self):
+        self.write("content/blog/notes.txt", "notes")
+        self.rebuild("content/blog", "content/gone.md")
+        self.assertEqual(os.listdir(os.path.join(self.docs, "blog")), ["post.html"])
+
+    def test_static_directory_changes(self):
+        self.write("static/images/a.png", "png")
+        self.rebuild("static/images")
+        self.assertEqual(self.read("docs/images/a.png"), "png")
+
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        os.rmdir(os.path.join(self.static, "images"))
+        self.rebuild("static/images", "static/missing.css", "other.txt")
+        self.assertEqual(sorted(os.listdir(self.docs)), [".assets.json", "index.css"])
+
+
+class TestWatchers(WatchTestCase):
+    """Unit tests for the file watchers."""
+
+    def test_polling_watcher_reports_changes(self):
+        watcher = PollingWatcher([self.content, self.template], interval=0.01)
+        self.assertEqual(watcher.wait(timeout=0), set())
+        page = self.write("content/new.md", "# New")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(
+            watcher.wait(timeout=1),
+            {page, os.path.join(self.content, "index.md")},
+        )
+
+    def test_polling_watcher_times_out(self):
+        watcher = PollingWatcher([self.content], interval=0.01)
+        self.assertEqual(watcher.wait(timeout=0.02), set())
+        watcher.close()
+
+    def test_polling_watcher_skips_vanished_files(self):
+        missing = os.path.join(self.content, "missing.md")
+        with mock.patch.object(watch, "_walk_files", return_value=[missing]):
+            self.assertEqual(PollingWatcher([self.content]).wait(timeout=0), set())
+
+    def test_create_watcher_falls_back_to_polling(self):
+        with mock.patch.object(watch, "InotifyWatcher", side_effect=OSError):
+            watcher = create_watcher([self.content])
+        self.assertIsInstance(watcher, PollingWatcher)
+
+    def test_inotify_watcher_reports_changes(self):
+        try:
+            watcher = InotifyWatcher([self.content, self.template])
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        try:
+            self.write("other.txt", "ignored")
+            self.assertEqual(watcher.wait(timeout=0.1), set())
+            os.makedirs(os.path.join(self.content, "new"))
+            watcher.wait(timeout=1)
+            page = self.write("content/new/page.md", "# Page")
+            template = self.write("template.html", "{{ Content }}")
+            changes = set()
+            while batch := watcher.wait(timeout=0.1):
+                changes |= batch
+            self.assertEqual(changes, {page, template})
+        finally:
+            watcher.close()
+
+    def test_inotify_setup_errors_raise(self):
+        libc = mock.Mock()
+        libc.inotify_init1.return_value = -1
+        with mock.patch.object(watch, "_load_libc", return_value=libc):
+            with self.assertRaises(OSError):
+                InotifyWatcher([self.content])
+            libc.inotify_init1.return_value = os.open(os.devnull, os.O_RDONLY)
+            libc.inotify_add_watch.return_value = -1
+            with self.assertRaises(OSError):
+                InotifyWatcher([self.content])
+        os.close(libc.inotify_init1.return_value)
+
+    def test_inotify_overflow_and_removed_watches(self):
+        try:
+            watcher = InotifyWatcher([self.content])
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        self.addCleanup(watcher.close)
+        blog = os.path.join(self.content, "blog")
+        os.remove(os.path.join(blog, "post.md"))
+        os.rmdir(blog)
+        changes = set()
+        while batch := watcher.wait(timeout=0.1):
+            changes |= batch
+        self.assertEqual(changes, {blog, os.path.join(blog, "post.md")})
+
+        # Raw inotify events: one for a watch that is gone, then an overflow.
+        unknown = struct.pack("iIII", 1 << 20, IN_MODIFY, 0, 0)
+        overflow = struct.pack("iIII", -1, IN_Q_OVERFLOW, 0, 0)
+        with mock.patch.object(watch.select, "select", return_value=([1], [], [])):
+            with mock.patch.object(watch.os, "read", side_effect=[unknown, overflow]):
+                self.assertEqual(watcher.wait(timeout=0), set())
+                self.assertEqual(watcher.wait(timeout=0), {self.content})
+            with mock.patch.object(watch.os, "read", side_effect=BlockingIOError):
+                self.assertEqual(watcher.wait(timeout=0), set())
+
+    def test_watch_site_keeps_running_after_failed_rebuild(self):
+        watcher = mock.Mock()
+        watcher.wait.side_effect = [{"content/index.md"}, set()]
+        stops = iter([False, True])
+        with mock.patch.object(
+            watch, "create_watcher", return_value=watcher
+        ) as create_mock:
+            with mock.patch.object(
+                watch, "rebuild_changes", side_effect=ValueError("bad")
+            ):
+                watch_site(
+                    self.content,
+                    self.static,
+                    self.template,
+                    self.docs,
+                    should_stop=lambda: next(stops),
+                )
+        create_mock.assert_called_once_with([self.content, self.static, self.template])
+        watcher.close.assert_called_once_with()
+
+    def test_watch_site_debounces_changes(self):
+        watcher = mock.Mock()
+        watcher.wait.side_effect = [
+            set(),
+            {"content/index.md"},
+            {"content/index.md", "static/index.css"},
+            set(),
+        ]
+        stops = iter([False, False, True])
+        with mock.patch.object(watch, "rebuild_changes") as rebuild_mock:
+            watch_site(
+                "content",
+                "static",
+                "template.html",
+                "docs",
+                watcher=watcher,
+                should_stop=lambda: next(stops),
+            )
+        rebuild_mock.assert_called_once_with(
+            {"content/index.md", "static/index.css"},
+            "content",
+            "static",
+            "template.html",
+            "docs",
+            options=RenderOptions(image_sizes={}, image_srcsets={}),
+            jobs=1,
+        )
+        watcher.close.assert_called_once_with()
+
+    def test_watch_rebuilds_keep_image_sizes(self):
+        with open(os.path.join(self.static, "a.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\0\0\0\x0dIHDR" + struct.pack(">II", 640, 480))
+        sync_directory(self.static, self.docs)
+        self.write("content/index.md", "# Home\n\n![a](/a.png)")
+        watcher = mock.Mock()
+        watcher.wait.side_effect = [{os.path.join(self.content, "index.md")}, set()]
+        stops = iter([False, True])
+
+        watch_site(
+            self.content,
+            self.static,
+            self.template,
+            self.docs,
+            watcher=watcher,
+            should_stop=lambda: next(stops),
+        )
+
+        self.assertIn(
+            '<img src="/a.png" alt="a" loading="lazy" decoding="async" '
+            'width="640" height="480"/>',
+            self.read("docs/index.html"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()